@@ -12,15 +12,35 @@ log_message() {
 # Définir les chemins source et destination
 SOURCE="/srv/ServeurDocument/"
 DESTINATION="/mnt/backup/"
+# Dépôt des instantanés : jamais dans $DESTINATION (le miroir --delete l'effacerait), les deux outils
+# refusent d'ailleurs de travailler dans le dossier de l'autre
+SNAPSHOT_STORE="/mnt/backup_instantanes/"
+
+# Outils de sauvegarde (à côté de ce script)
+SCRIPT_DIR="$(dirname "$(readlink -f "$0")")"
+BACKUP_TOOL="$SCRIPT_DIR/backup.py"
+SNAPSHOT_TOOL="$SCRIPT_DIR/backup_snapshots.py"
+
+# Mode de sauvegarde : "miroir" (une seule copie, à jour) ou "instantanes" (un instantané dédupliqué
+# par nuit dans $SNAPSHOT_STORE, conservé $KEEP_DAYS jours)
+BACKUP_MODE="miroir"
+KEEP_DAYS=30
 
 # Démarrage du script de backup
 log_message "Démarrage du script de backup..."
 
-# Étape 1 : Synchroniser les fichiers avec rsync
-log_message "Synchronisation des fichiers de $SOURCE vers $DESTINATION..."
-sudo rsync -avh --delete "$SOURCE" "$DESTINATION" >> "$RSYNC_LOG_FILE" 2>&1
+# Étape 1 : Synchroniser les fichiers (copie en parallèle, seuls les fichiers modifiés sont copiés,
+# le débit de la sauvegarde est ajouté à $LOG_FILE)
+if [ "$BACKUP_MODE" = "instantanes" ]; then
+    log_message "Instantané de $SOURCE dans $SNAPSHOT_STORE..."
+    sudo python3 "$SNAPSHOT_TOOL" create "$SOURCE" "$SNAPSHOT_STORE" --log "$LOG_FILE" >> "$RSYNC_LOG_FILE" 2>&1 \
+        && sudo python3 "$SNAPSHOT_TOOL" prune "$SNAPSHOT_STORE" --keep-days "$KEEP_DAYS" --log "$LOG_FILE" >> "$RSYNC_LOG_FILE" 2>&1
+else
+    log_message "Synchronisation des fichiers de $SOURCE vers $DESTINATION..."
+    sudo python3 "$BACKUP_TOOL" "$SOURCE" "$DESTINATION" --delete --log "$LOG_FILE" >> "$RSYNC_LOG_FILE" 2>&1
+fi
 
-# Vérifier si rsync s'est exécuté correctement
+# Vérifier si la synchronisation s'est exécutée correctement
 if [ $? -eq 0 ]; then
     log_message "Synchronisation terminée avec succès."
 else
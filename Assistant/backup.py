@@ -0,0 +1,465 @@
+# Sauvegarde incrémentale en parallèle, avec sommes de contrôle (remplace rsync -avh --delete).
+# - l'arborescence source est parcourue en parallèle, puis les fichiers sont répartis en lots
+#   (shards) de tailles équilibrées, copiés chacun par un worker
+# - un index persistant (SQLite) garde pour chaque fichier sa taille, sa date de modification, ses droits,
+#   son propriétaire et son empreinte : un fichier inchangé depuis la dernière sauvegarde est ignoré sans
+#   être relu, et si seuls ses droits ou son propriétaire ont changé, ils sont appliqués sans recopie
+# - chaque copie est hachée au vol ; --verify relit la copie pour comparer les empreintes
+# - --delete supprime de la destination ce qui a disparu de la source (grâce à l'index, sans
+#   reparcourir la destination ; elle n'est parcourue qu'à la première exécution)
+# - le débit de chaque exécution est ajouté au journal /var/log/backup.log
+# Utilisation : python3 backup.py SOURCE DESTINATION [--delete] [--workers 8] [--index FICHIER] [--log FICHIER]
+import argparse
+import datetime
+import hashlib
+import os
+import shutil
+import sqlite3
+import stat
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+DEFAULT_LOG = "/var/log/backup.log"
+DEFAULT_WORKERS = min(8, os.cpu_count() or 4)
+
+# Index enregistré par défaut dans la destination (il suit le disque de sauvegarde)
+INDEX_NAME = ".backup_index.sqlite"
+TMP_SUFFIX = ".backup-tmp"
+
+# Taille des blocs lus et hachés
+BUFFER_SIZE = 1 << 20
+
+HASH_ALGORITHM = 'blake2b'
+
+# Code de sortie d'une sauvegarde incomplète (erreurs de parcours ou de copie), le même que rsync
+EXIT_PARTIAL = 23
+
+# Catalogue d'un dépôt d'instantanés (backup_snapshots.py) : un miroir ne doit jamais être écrit dans
+# un dépôt, --delete y effacerait tout l'historique
+SNAPSHOT_CATALOG = "index.sqlite"
+
+# Fichier de la source : chemin relatif, taille, date de modification (ns), mode, cible du lien symbolique,
+# propriétaire et groupe
+FileEntry = namedtuple('FileEntry', ['path', 'size', 'mtime_ns', 'mode', 'link', 'uid', 'gid'])
+
+
+class BackupError(Exception):
+    pass
+
+
+# Index persistant des fichiers sauvegardés
+class FileIndex:
+    def __init__(self, path):
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, mode INTEGER, "
+            "uid INTEGER, gid INTEGER, hash TEXT)")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS dirs (path TEXT PRIMARY KEY)")
+
+    # {chemin: (taille, date, mode, uid, gid, empreinte)}
+    def load_files(self):
+        return {row[0]: row[1:] for row in
+                self.connection.execute("SELECT path, size, mtime_ns, mode, uid, gid, hash FROM files")}
+
+    def load_dirs(self):
+        return {path for (path,) in self.connection.execute("SELECT path FROM dirs")}
+
+    def is_empty(self):
+        return self.connection.execute("SELECT 1 FROM files LIMIT 1").fetchone() is None
+
+    def update_files(self, rows):
+        with self.connection:
+            self.connection.executemany("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def delete_files(self, paths):
+        with self.connection:
+            self.connection.executemany("DELETE FROM files WHERE path = ?", [(path,) for path in paths])
+
+    def replace_dirs(self, dirs):
+        with self.connection:
+            self.connection.execute("DELETE FROM dirs")
+            self.connection.executemany("INSERT INTO dirs VALUES (?)", [(path,) for path in dirs])
+
+    def close(self):
+        self.connection.close()
+
+
+# Fonction pour lire le contenu d'un dossier : (fichiers, sous-dossiers, erreurs), chemins relatifs à la racine
+# Un élément supprimé ou illisible pendant le parcours est signalé dans les erreurs sans arrêter le parcours ;
+# un dossier impossible à lister lève OSError
+def scan_directory(root, current):
+    files = []
+    dirs = []
+    errors = []
+    with os.scandir(os.path.join(root, current)) as entries:
+        for entry in entries:
+            path = os.path.join(current, entry.name) if current else entry.name
+            try:
+                info = entry.stat(follow_symlinks=False)
+                if stat.S_ISDIR(info.st_mode):
+                    dirs.append(path)
+                elif stat.S_ISLNK(info.st_mode):
+                    files.append(FileEntry(path, 0, info.st_mtime_ns, info.st_mode, os.readlink(entry.path),
+                                           info.st_uid, info.st_gid))
+                elif stat.S_ISREG(info.st_mode):
+                    files.append(FileEntry(path, info.st_size, info.st_mtime_ns, info.st_mode, None,
+                                           info.st_uid, info.st_gid))
+            except OSError as e:
+                errors.append((path, str(e)))
+    return files, dirs, errors
+
+
+# Résultat d'un parcours : fichiers, dossiers, erreurs et dossiers qui n'ont pas pu être listés
+# (leur contenu est inconnu : il ne doit pas être supprimé de la destination)
+ScanResult = namedtuple('ScanResult', ['files', 'dirs', 'errors', 'unreadable'])
+
+
+# Fonction pour parcourir un sous-dossier et tout ce qu'il contient
+def scan_subtree(root, relative_dir):
+    result = ScanResult([], [relative_dir] if relative_dir else [], [], [])
+    pending = [relative_dir]
+    while pending:
+        current = pending.pop()
+        try:
+            sub_files, sub_dirs, errors = scan_directory(root, current)
+        except OSError as e:
+            result.errors.append((current, str(e)))
+            result.unreadable.append(current)
+            continue
+        result.files.extend(sub_files)
+        result.dirs.extend(sub_dirs)
+        result.errors.extend(errors)
+        pending.extend(sub_dirs)
+    return result
+
+
+# Fonction pour parcourir la source en parallèle (un worker par dossier de premier niveau)
+# Retourne un ScanResult dont les fichiers sont indexés par chemin ; une source illisible arrête la sauvegarde
+def scan_tree(root, executor):
+    try:
+        files, top_level, errors = scan_directory(root, '')
+    except OSError as e:
+        raise BackupError(f"source illisible : {e}")
+    result = ScanResult({entry.path: entry for entry in files}, [], errors, [])
+    for subtree in executor.map(lambda name: scan_subtree(root, name), top_level):
+        result.files.update((entry.path, entry) for entry in subtree.files)
+        result.dirs.extend(subtree.dirs)
+        result.errors.extend(subtree.errors)
+        result.unreadable.extend(subtree.unreadable)
+    return result
+
+
+# Fonction pour répartir les fichiers en lots de tailles équilibrées (le plus gros fichier
+# va dans le lot le moins chargé)
+def make_shards(entries, count):
+    shards = [[] for _ in range(count)]
+    loads = [0] * count
+    for entry in sorted(entries, key=lambda entry: entry.size, reverse=True):
+        target = loads.index(min(loads))
+        shards[target].append(entry)
+        loads[target] += entry.size
+    return [shard for shard in shards if shard]
+
+
+# Fonction pour calculer l'empreinte d'un fichier
+def file_hash(path):
+    digest = hashlib.new(HASH_ALGORITHM)
+    with open(path, 'rb') as f:
+        while chunk := f.read(BUFFER_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# Fonction pour copier un fichier en calculant son empreinte au passage
+# La copie est écrite à côté puis renommée : la destination n'est jamais à moitié copiée
+def copy_with_hash(source_path, destination_path):
+    digest = hashlib.new(HASH_ALGORITHM)
+    tmp_path = destination_path + TMP_SUFFIX
+    with open(source_path, 'rb') as source, open(tmp_path, 'wb') as destination:
+        while chunk := source.read(BUFFER_SIZE):
+            digest.update(chunk)
+            destination.write(chunk)
+    shutil.copystat(source_path, tmp_path)
+    copy_owner(source_path, tmp_path)
+    os.replace(tmp_path, destination_path)
+    return digest.hexdigest()
+
+
+# Fonction pour conserver le propriétaire (comme rsync -a, seulement possible en root)
+def copy_owner(source_path, destination_path):
+    if os.geteuid() != 0:
+        return
+    info = os.lstat(source_path)
+    os.lchown(destination_path, info.st_uid, info.st_gid)
+
+
+# Fonction pour appliquer les droits et le propriétaire d'un fichier de la source sans recopier son contenu
+# (propriétaire d'abord : chown efface les bits setuid/setgid ; un lien symbolique n'a pas de droits propres)
+def copy_metadata(entry, destination_path):
+    if os.geteuid() == 0:
+        os.lchown(destination_path, entry.uid, entry.gid)
+    if entry.link is None:
+        os.chmod(destination_path, stat.S_IMODE(entry.mode))
+
+
+# Fonction pour supprimer de la destination un élément d'un autre type que dans la source
+# (fichier devenu dossier, ou dossier devenu fichier ou lien) ; True si quelque chose a été supprimé
+def remove_conflicting(destination_path, want_dir):
+    try:
+        info = os.lstat(destination_path)
+    except FileNotFoundError:
+        return False
+    if stat.S_ISDIR(info.st_mode) == want_dir:
+        return False
+    if stat.S_ISDIR(info.st_mode):
+        shutil.rmtree(destination_path)
+    else:
+        os.remove(destination_path)
+    return True
+
+
+# Fonction pour créer les dossiers de la source dans la destination (les plus hauts d'abord)
+# Retourne les erreurs et les chemins de fichiers remplacés par un dossier
+def create_dirs(destination, source_dirs):
+    errors = []
+    replaced = []
+    for path in sorted(source_dirs, key=lambda path: path.count(os.sep)):
+        destination_path = os.path.join(destination, path)
+        try:
+            if remove_conflicting(destination_path, want_dir=True):
+                replaced.append(path)
+            os.makedirs(destination_path, exist_ok=True)
+        except OSError as e:
+            errors.append((path, str(e)))
+    return errors, replaced
+
+
+# Fonction pour recréer un lien symbolique à l'identique (False s'il existait déjà)
+def copy_link(entry, destination_path):
+    if os.path.islink(destination_path) and os.readlink(destination_path) == entry.link:
+        return False
+    if os.path.lexists(destination_path):
+        os.remove(destination_path)
+    os.symlink(entry.link, destination_path)
+    return True
+
+
+# Résultat d'un lot : lignes d'index à écrire, compteurs et erreurs
+ShardResult = namedtuple('ShardResult', ['rows', 'copied', 'skipped', 'updated', 'bytes_copied', 'errors', 'seconds'])
+
+
+# Fonction pour construire la ligne d'index d'un fichier
+def index_row(entry, digest):
+    return entry.path, entry.size, entry.mtime_ns, entry.mode, entry.uid, entry.gid, digest
+
+
+# Fonction pour sauvegarder un lot de fichiers
+def process_shard(shard, source, destination, indexed, verify=False):
+    start = time.perf_counter()
+    rows = []
+    copied = skipped = updated = bytes_copied = 0
+    errors = []
+    for entry in shard:
+        destination_path = os.path.join(destination, entry.path)
+        previous = indexed.get(entry.path)
+        try:
+            # Dossier de la destination devenu fichier ou lien dans la source
+            if remove_conflicting(destination_path, want_dir=False):
+                previous = None
+            if previous and previous[:2] == (entry.size, entry.mtime_ns) and os.path.lexists(destination_path):
+                # Inchangé depuis la dernière sauvegarde : ni lecture, ni copie
+                if previous[2:5] == (entry.mode, entry.uid, entry.gid):
+                    skipped += 1
+                    continue
+                # Contenu inchangé, droits ou propriétaire modifiés (chmod, chown) : pas de recopie
+                copy_metadata(entry, destination_path)
+                updated += 1
+                rows.append(index_row(entry, previous[5]))
+                continue
+            if entry.link is not None:
+                digest = "lien:" + entry.link
+                if not copy_link(entry, destination_path):
+                    skipped += 1
+                    rows.append(index_row(entry, digest))
+                    continue
+            elif previous is None and same_file(os.path.join(source, entry.path), destination_path, entry):
+                # Fichier déjà présent (première exécution sur un miroir rsync) : on le hache sans le recopier
+                digest = file_hash(os.path.join(source, entry.path))
+                copy_metadata(entry, destination_path)
+                skipped += 1
+                rows.append(index_row(entry, digest))
+                continue
+            else:
+                digest = copy_with_hash(os.path.join(source, entry.path), destination_path)
+                if verify and file_hash(destination_path) != digest:
+                    raise OSError("la copie ne correspond pas à la source (somme de contrôle)")
+                bytes_copied += entry.size
+            copied += 1
+            rows.append(index_row(entry, digest))
+        except OSError as e:
+            errors.append((entry.path, str(e)))
+    return ShardResult(rows, copied, skipped, updated, bytes_copied, errors, time.perf_counter() - start)
+
+
+# Fonction pour savoir si la destination contient déjà le fichier (même taille et même date, comme rsync)
+def same_file(source_path, destination_path, entry):
+    try:
+        info = os.lstat(destination_path)
+    except FileNotFoundError:
+        return False
+    return stat.S_ISREG(info.st_mode) and info.st_size == entry.size and info.st_mtime_ns == entry.mtime_ns
+
+
+# Fonction pour savoir si un chemin est dans l'un des dossiers donnés (ou est l'un d'eux)
+def is_under(path, dirs):
+    return any(path == directory or path.startswith(directory + os.sep) for directory in dirs)
+
+
+# Fonction pour supprimer de la destination les fichiers et dossiers disparus de la source
+# Le contenu des dossiers de la source qui n'ont pas pu être listés (unreadable) est conservé
+def delete_removed(destination, source_files, source_dirs, indexed_files, indexed_dirs, full_scan, unreadable=()):
+    removed_files = [path for path in indexed_files if path not in source_files]
+    removed_dirs = [path for path in indexed_dirs if path not in source_dirs]
+    if full_scan:
+        # Première exécution : la destination peut contenir des fichiers inconnus de l'index
+        extra = scan_subtree(destination, '')
+        removed_files = set(removed_files) | {entry.path for entry in extra.files
+                                              if entry.path not in source_files and entry.path != INDEX_NAME
+                                              and not entry.path.startswith(INDEX_NAME)}
+        removed_dirs = set(removed_dirs) | {path for path in extra.dirs if path not in source_dirs}
+    if unreadable:
+        removed_files = [path for path in removed_files if not is_under(path, unreadable)]
+        removed_dirs = [path for path in removed_dirs if not is_under(path, unreadable)]
+    for path in removed_files:
+        try:
+            os.remove(os.path.join(destination, path))
+        except (FileNotFoundError, NotADirectoryError):
+            # Déjà supprimé avec son dossier, ou dossier parent devenu fichier
+            pass
+    # Les dossiers les plus profonds d'abord (un dossier devenu fichier ou lien dans la source est gardé)
+    for path in sorted(removed_dirs, key=len, reverse=True):
+        destination_path = os.path.join(destination, path)
+        if os.path.isdir(destination_path) and not os.path.islink(destination_path):
+            shutil.rmtree(destination_path, ignore_errors=True)
+    return list(removed_files), len(removed_dirs)
+
+
+# Fonction pour refuser une destination qui est un dépôt d'instantanés
+def check_destination(destination):
+    if os.path.exists(os.path.join(destination, SNAPSHOT_CATALOG)) and \
+            os.path.isdir(os.path.join(destination, 'chunks')):
+        raise BackupError(f"{destination} est un dépôt d'instantanés (backup_snapshots.py) : "
+                          f"choisissez une autre destination pour le miroir")
+
+
+# Fonction pour exécuter une sauvegarde et retourner ses statistiques
+def run_backup(source, destination, workers=DEFAULT_WORKERS, index_path=None, delete=False, verify=False):
+    start = time.perf_counter()
+    check_destination(destination)
+    os.makedirs(destination, exist_ok=True)
+    index = FileIndex(index_path or os.path.join(destination, INDEX_NAME))
+    try:
+        full_scan = index.is_empty()
+        indexed_files = index.load_files()
+        indexed_dirs = index.load_dirs()
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            scan = scan_tree(source, executor)
+            source_files, source_dirs = scan.files, scan.dirs
+            scan_seconds = time.perf_counter() - start
+            dir_errors, replaced = create_dirs(destination, source_dirs)
+            # Fichiers remplacés par un dossier : ils ne sont plus dans la destination
+            index.delete_files(replaced)
+            for path in replaced:
+                indexed_files.pop(path, None)
+
+            stats = {'files': len(source_files), 'copied': 0, 'skipped': 0, 'updated': 0, 'bytes_copied': 0,
+                     'errors': scan.errors + dir_errors, 'shards': []}
+            shards = make_shards(list(source_files.values()), workers)
+            futures = [executor.submit(process_shard, shard, source, destination, indexed_files, verify)
+                       for shard in shards]
+            for future in as_completed(futures):
+                result = future.result()
+                # Index mis à jour lot par lot : une sauvegarde interrompue garde ce qui a été copié
+                index.update_files(result.rows)
+                stats['copied'] += result.copied
+                stats['skipped'] += result.skipped
+                stats['updated'] += result.updated
+                stats['bytes_copied'] += result.bytes_copied
+                stats['errors'].extend(result.errors)
+                stats['shards'].append((result.bytes_copied, result.seconds))
+
+        if delete:
+            removed_files, removed_dirs = delete_removed(destination, source_files, set(source_dirs),
+                                                         indexed_files, indexed_dirs, full_scan, scan.unreadable)
+            index.delete_files(removed_files)
+            stats['deleted'] = len(removed_files) + removed_dirs
+        # Les sous-dossiers d'un dossier illisible restent dans l'index jusqu'au prochain parcours complet
+        index.replace_dirs(set(source_dirs) | {path for path in indexed_dirs if is_under(path, scan.unreadable)})
+
+        # Propriétaire, droits et dates des dossiers comme dans la source (après les copies, qui les modifient)
+        for path in sorted(source_dirs, key=len, reverse=True):
+            try:
+                copy_owner(os.path.join(source, path), os.path.join(destination, path))
+                shutil.copystat(os.path.join(source, path), os.path.join(destination, path))
+            except OSError as e:
+                stats['errors'].append((path, str(e)))
+    finally:
+        index.close()
+
+    stats['scan_seconds'] = scan_seconds
+    stats['seconds'] = time.perf_counter() - start
+    return stats
+
+
+# Fonction de journalisation (même format que le script de sauvegarde)
+def log_message(log_path, message):
+    line = f"{datetime.datetime.now():%Y-%m-%d %H:%M:%S} : {message}"
+    print(line)
+    try:
+        with open(log_path, 'a') as f:
+            f.write(line + "\n")
+    except OSError as e:
+        print(f"Impossible d'écrire dans le journal {log_path} : {e}")
+
+
+def format_rate(byte_count, seconds):
+    return f"{byte_count / max(seconds, 1e-9) / (1 << 20):.1f} Mo/s"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sauvegarde incrémentale en parallèle, avec sommes de contrôle.")
+    parser.add_argument('source')
+    parser.add_argument('destination')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS)
+    parser.add_argument('--index', help=f"Fichier d'index (par défaut DESTINATION/{INDEX_NAME})")
+    parser.add_argument('--log', default=DEFAULT_LOG)
+    parser.add_argument('--delete', action='store_true', help="Supprimer ce qui a disparu de la source")
+    parser.add_argument('--verify', action='store_true', help="Relire chaque copie pour vérifier son empreinte")
+    args = parser.parse_args(argv)
+
+    try:
+        stats = run_backup(args.source, args.destination, args.workers, args.index, args.delete, args.verify)
+    except BackupError as e:
+        log_message(args.log, f"Sauvegarde annulée : {e}")
+        sys.exit(2)
+
+    log_message(args.log, f"Sauvegarde {args.source} -> {args.destination} : {stats['files']} fichiers, "
+                          f"{stats['copied']} copiés, {stats['skipped']} inchangés, "
+                          f"{stats['updated']} avec droits ou propriétaire mis à jour, "
+                          f"{stats.get('deleted', 0)} supprimés, {stats['bytes_copied'] / (1 << 20):.1f} Mo en "
+                          f"{stats['seconds']:.1f} s ({format_rate(stats['bytes_copied'], stats['seconds'])}, "
+                          f"parcours {stats['scan_seconds']:.1f} s, {len(stats['shards'])} workers)")
+    for number, (byte_count, seconds) in enumerate(stats['shards'], 1):
+        log_message(args.log, f"  worker {number} : {byte_count / (1 << 20):.1f} Mo en {seconds:.1f} s "
+                              f"({format_rate(byte_count, seconds)})")
+    for path, error in stats['errors']:
+        log_message(args.log, f"  Erreur : {path} : {error}")
+    # Code de sortie 23 en cas d'erreur, comme rsync (transfert partiel : le reste a été sauvegardé)
+    sys.exit(EXIT_PARTIAL if stats['errors'] else 0)
+
+
+if __name__ == "__main__":
+    main()
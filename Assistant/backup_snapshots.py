@@ -0,0 +1,367 @@
+# Instantanés de sauvegarde dédupliqués : historique de plusieurs nuits pour le prix d'une copie
+# plus les modifications de chaque jour.
+# - les fichiers sont découpés en blocs de 4 Mo, enregistrés une seule fois sous leur empreinte
+#   (DEPOT/chunks/ab/abcdef...) et partagés par tous les instantanés
+# - chaque instantané est un manifeste compressé (DEPOT/snapshots/NOM.jsonl.gz) : chemin, taille,
+#   date, mode, propriétaire et liste des blocs de chaque fichier
+# - un catalogue SQLite (DEPOT/index.sqlite) liste les instantanés et les blocs connus : la liste
+#   des instantanés et la restauration ne lisent que le catalogue et un manifeste
+# - un fichier inchangé depuis l'instantané précédent (même taille, même date) reprend ses blocs
+#   sans être relu ; les fichiers modifiés sont découpés et hachés en parallèle
+# - prune supprime les instantanés trop anciens puis les blocs qui ne servent plus à aucun instantané
+# Utilisation : python3 backup_snapshots.py create SOURCE DEPOT [--workers 8] [--log FICHIER]
+#               python3 backup_snapshots.py list DEPOT
+#               python3 backup_snapshots.py restore DEPOT NOM CIBLE [--path CHEMIN] [--verify]
+#               python3 backup_snapshots.py prune DEPOT [--keep-days 30]
+import argparse
+import datetime
+import gzip
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from backup import (DEFAULT_LOG, DEFAULT_WORKERS, EXIT_PARTIAL, INDEX_NAME, SNAPSHOT_CATALOG, TMP_SUFFIX,
+                    BackupError, format_rate, log_message, make_shards, scan_tree)
+
+# Taille des blocs (les fichiers plus petits tiennent dans un seul bloc)
+CHUNK_SIZE = 4 << 20
+
+DEFAULT_KEEP_DAYS = 30
+
+CATALOG_NAME = SNAPSHOT_CATALOG
+
+
+# Fonction pour calculer l'empreinte d'un bloc
+def chunk_hash(data):
+    return hashlib.blake2b(data, digest_size=32).hexdigest()
+
+
+# Dépôt d'instantanés : blocs, manifestes et catalogue
+class SnapshotStore:
+    def __init__(self, root):
+        # Un miroir de backup.py --delete effacerait les blocs et manifestes du dépôt
+        if os.path.exists(os.path.join(root, INDEX_NAME)):
+            raise BackupError(f"{root} est le miroir de backup.py : choisissez un autre dossier pour le dépôt")
+        self.root = root
+        os.makedirs(os.path.join(root, 'chunks'), exist_ok=True)
+        os.makedirs(os.path.join(root, 'snapshots'), exist_ok=True)
+        self.connection = sqlite3.connect(os.path.join(root, CATALOG_NAME))
+        self.connection.execute("CREATE TABLE IF NOT EXISTS chunks (hash TEXT PRIMARY KEY, size INTEGER)")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS snapshots (name TEXT PRIMARY KEY, created REAL, files INTEGER, "
+            "bytes INTEGER, new_bytes INTEGER)")
+        self.known = None
+        self.known_lock = threading.Lock()
+
+    def close(self):
+        self.connection.close()
+
+    def chunk_path(self, digest):
+        return os.path.join(self.root, 'chunks', digest[:2], digest)
+
+    def manifest_path(self, name):
+        return os.path.join(self.root, 'snapshots', name + '.jsonl.gz')
+
+    # Liste des instantanés, du plus ancien au plus récent
+    def list_snapshots(self):
+        return self.connection.execute(
+            "SELECT name, created, files, bytes, new_bytes FROM snapshots ORDER BY created").fetchall()
+
+    def stored_bytes(self):
+        return self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM chunks").fetchone()[0]
+
+    # Fonction pour enregistrer un bloc s'il n'est pas déjà dans le dépôt (True s'il est nouveau)
+    # Le bloc n'est marqué connu qu'une fois écrit : après une erreur d'écriture, le prochain fichier qui
+    # le contient l'écrit à nouveau au lieu de pointer vers un bloc absent
+    def put_chunk(self, digest, data):
+        with self.known_lock:
+            if digest in self.known:
+                return False
+        path = self.chunk_path(digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Fichier temporaire propre au thread : deux workers qui lisent le même bloc peuvent l'écrire en même temps
+        tmp_path = f"{path}.{threading.get_ident()}{TMP_SUFFIX}"
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        with self.known_lock:
+            self.known.add(digest)
+        return True
+
+    def read_chunk(self, digest, verify=False):
+        with open(self.chunk_path(digest), 'rb') as f:
+            data = f.read()
+        if verify and chunk_hash(data) != digest:
+            raise OSError(f"bloc {digest} corrompu (somme de contrôle)")
+        return data
+
+    # Lire un manifeste : liste d'entrées
+    # ["d", chemin, mode, date, uid, gid] / ["f", chemin, mode, date, taille, [blocs], uid, gid]
+    # / ["l", chemin, mode, date, cible, uid, gid]
+    def read_manifest(self, name):
+        with gzip.open(self.manifest_path(name), 'rt', encoding='utf-8') as f:
+            return [json.loads(line) for line in f]
+
+    def write_manifest(self, name, entries):
+        path = self.manifest_path(name)
+        with gzip.open(path + TMP_SUFFIX, 'wt', encoding='utf-8') as f:
+            for entry in entries:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        os.replace(path + TMP_SUFFIX, path)
+
+
+# Fonction pour découper un fichier en blocs et enregistrer les nouveaux : [(empreinte, taille)]
+def store_file(store, source_path):
+    chunks = []
+    with open(source_path, 'rb') as f:
+        while data := f.read(CHUNK_SIZE):
+            digest = chunk_hash(data)
+            store.put_chunk(digest, data)
+            chunks.append((digest, len(data)))
+    return chunks
+
+
+# Fonction pour enregistrer un lot de fichiers modifiés
+def process_shard(store, source, shard):
+    start = time.perf_counter()
+    entries = []
+    new_chunks = []
+    read_bytes = 0
+    errors = []
+    for entry in shard:
+        try:
+            chunks = store_file(store, os.path.join(source, entry.path))
+        except OSError as e:
+            errors.append((entry.path, str(e)))
+            continue
+        read_bytes += entry.size
+        new_chunks.extend(chunks)
+        entries.append(['f', entry.path, entry.mode, entry.mtime_ns, entry.size, [digest for digest, _ in chunks],
+                        entry.uid, entry.gid])
+    return entries, new_chunks, read_bytes, errors, time.perf_counter() - start
+
+
+# Fonction pour créer un instantané de la source et retourner ses statistiques
+def create_snapshot(store, source, workers=DEFAULT_WORKERS, name=None):
+    start = time.perf_counter()
+    name = name or datetime.datetime.now().strftime('%Y-%m-%dT%H-%M-%S')
+    if store.connection.execute("SELECT 1 FROM snapshots WHERE name = ?", (name,)).fetchone():
+        raise ValueError(f"l'instantané {name} existe déjà")
+    catalog = {digest for (digest,) in store.connection.execute("SELECT hash FROM chunks")}
+    store.known = set(catalog)
+
+    # Fichiers de l'instantané précédent, pour reprendre les blocs des fichiers inchangés
+    snapshots = store.list_snapshots()
+    previous = {}
+    if snapshots:
+        previous = {item[1]: item for item in store.read_manifest(snapshots[-1][0]) if item[0] == 'f'}
+
+    manifest = []
+    changed = []
+    stats = {'name': name, 'files': 0, 'bytes': 0, 'read_bytes': 0, 'errors': [], 'shards': []}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        scan = scan_tree(source, executor)
+        # Éléments illisibles ou supprimés pendant le parcours : absents de l'instantané, signalés
+        stats['errors'].extend(scan.errors)
+        for path in scan.dirs:
+            try:
+                info = os.lstat(os.path.join(source, path))
+            except OSError as e:
+                stats['errors'].append((path, str(e)))
+                continue
+            manifest.append(['d', path, info.st_mode, info.st_mtime_ns, info.st_uid, info.st_gid])
+        for entry in scan.files.values():
+            if entry.link is not None:
+                manifest.append(['l', entry.path, entry.mode, entry.mtime_ns, entry.link, entry.uid, entry.gid])
+                continue
+            old = previous.get(entry.path)
+            if old and old[3:5] == [entry.mtime_ns, entry.size] and all(digest in catalog for digest in old[5]):
+                manifest.append(['f', entry.path, entry.mode, entry.mtime_ns, entry.size, old[5],
+                                 entry.uid, entry.gid])
+            else:
+                changed.append(entry)
+
+        new_chunks = {}
+        futures = [executor.submit(process_shard, store, source, shard) for shard in make_shards(changed, workers)]
+        for future in as_completed(futures):
+            entries, chunks, read_bytes, errors, seconds = future.result()
+            manifest.extend(entries)
+            new_chunks.update(chunks)
+            stats['read_bytes'] += read_bytes
+            stats['errors'].extend(errors)
+            stats['shards'].append((read_bytes, seconds))
+
+    manifest.sort(key=lambda item: item[1])
+    files = [item for item in manifest if item[0] == 'f']
+    stats['files'] = len(files)
+    stats['bytes'] = sum(item[4] for item in files)
+
+    # Blocs d'abord, puis le manifeste, puis le catalogue : un instantané interrompu n'apparaît jamais
+    store.write_manifest(name, manifest)
+    added = [(digest, size) for digest, size in new_chunks.items() if digest not in catalog]
+    stats['new_bytes'] = sum(size for _, size in added)
+    with store.connection:
+        store.connection.executemany("INSERT OR IGNORE INTO chunks VALUES (?, ?)", added)
+        store.connection.execute("INSERT INTO snapshots VALUES (?, ?, ?, ?, ?)",
+                                 (name, time.time(), stats['files'], stats['bytes'], stats['new_bytes']))
+    stats['new_chunks'] = len(added)
+    stats['seconds'] = time.perf_counter() - start
+    return stats
+
+
+# Fonction pour rendre son propriétaire à un élément restauré (comme rsync -a, seulement possible en root)
+# Le propriétaire et le groupe terminent toutes les entrées de manifeste
+def restore_owner(path, item):
+    if os.geteuid() == 0:
+        os.lchown(path, *item[-2:])
+
+
+# Fonction pour restaurer un instantané (ou seulement un fichier / dossier avec path) dans target
+def restore_snapshot(store, name, target, path=None, workers=DEFAULT_WORKERS, verify=False):
+    prefix = path.strip('/') if path else ''
+    entries = [item for item in store.read_manifest(name)
+               if not prefix or item[1] == prefix or item[1].startswith(prefix + '/')]
+    dirs = [item for item in entries if item[0] == 'd']
+    for item in dirs:
+        os.makedirs(os.path.join(target, item[1]), exist_ok=True)
+
+    def restore_file(item):
+        destination_path = os.path.join(target, item[1])
+        os.makedirs(os.path.dirname(destination_path) or target, exist_ok=True)
+        if item[0] == 'l':
+            if os.path.lexists(destination_path):
+                os.remove(destination_path)
+            os.symlink(item[4], destination_path)
+            restore_owner(destination_path, item)
+            return 0
+        with open(destination_path + TMP_SUFFIX, 'wb') as f:
+            for digest in item[5]:
+                f.write(store.read_chunk(digest, verify))
+        # Propriétaire avant les droits : chown efface les bits setuid/setgid
+        restore_owner(destination_path + TMP_SUFFIX, item)
+        os.chmod(destination_path + TMP_SUFFIX, item[2] & 0o7777)
+        os.utime(destination_path + TMP_SUFFIX, ns=(item[3], item[3]))
+        os.replace(destination_path + TMP_SUFFIX, destination_path)
+        return item[4]
+
+    restored = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for size in executor.map(restore_file, [item for item in entries if item[0] != 'd']):
+            restored += size
+    # Dates des dossiers après l'écriture de leur contenu
+    for item in sorted(dirs, key=lambda item: len(item[1]), reverse=True):
+        destination_path = os.path.join(target, item[1])
+        restore_owner(destination_path, item)
+        os.chmod(destination_path, item[2] & 0o7777)
+        os.utime(destination_path, ns=(item[3], item[3]))
+    return len(entries) - len(dirs), restored
+
+
+# Fonction pour supprimer les instantanés de plus de keep_days jours (le plus récent est toujours gardé)
+# puis les blocs qui ne sont plus utilisés par aucun instantané
+def prune_snapshots(store, keep_days=DEFAULT_KEEP_DAYS):
+    snapshots = store.list_snapshots()
+    limit = time.time() - keep_days * 86400
+    removed = [snapshot[0] for snapshot in snapshots[:-1] if snapshot[1] < limit]
+    if not removed:
+        return [], 0, 0
+    with store.connection:
+        store.connection.executemany("DELETE FROM snapshots WHERE name = ?", [(name,) for name in removed])
+    for name in removed:
+        os.remove(store.manifest_path(name))
+
+    # Blocs encore utilisés par les instantanés conservés
+    used = set()
+    for snapshot in store.list_snapshots():
+        for item in store.read_manifest(snapshot[0]):
+            if item[0] == 'f':
+                used.update(item[5])
+    unused = [(digest, size) for digest, size in store.connection.execute("SELECT hash, size FROM chunks")
+              if digest not in used]
+    for digest, _ in unused:
+        try:
+            os.remove(store.chunk_path(digest))
+        except FileNotFoundError:
+            pass
+    with store.connection:
+        store.connection.executemany("DELETE FROM chunks WHERE hash = ?", [(digest,) for digest, _ in unused])
+    return removed, len(unused), sum(size for _, size in unused)
+
+
+def megabytes(byte_count):
+    return f"{byte_count / (1 << 20):.1f} Mo"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Instantanés de sauvegarde dédupliqués.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    create = commands.add_parser('create', help="Créer un instantané de SOURCE")
+    create.add_argument('source')
+    create.add_argument('store')
+    create.add_argument('--name', help="Nom de l'instantané (par défaut la date et l'heure)")
+    create.add_argument('--workers', type=int, default=DEFAULT_WORKERS)
+    create.add_argument('--log', default=DEFAULT_LOG)
+    listing = commands.add_parser('list', help="Lister les instantanés")
+    listing.add_argument('store')
+    restore = commands.add_parser('restore', help="Restaurer un instantané")
+    restore.add_argument('store')
+    restore.add_argument('name')
+    restore.add_argument('target')
+    restore.add_argument('--path', help="Restaurer seulement ce fichier ou ce dossier")
+    restore.add_argument('--workers', type=int, default=DEFAULT_WORKERS)
+    restore.add_argument('--verify', action='store_true', help="Vérifier l'empreinte de chaque bloc lu")
+    prune = commands.add_parser('prune', help="Supprimer les instantanés anciens et les blocs inutilisés")
+    prune.add_argument('store')
+    prune.add_argument('--keep-days', type=int, default=DEFAULT_KEEP_DAYS)
+    prune.add_argument('--log', default=DEFAULT_LOG)
+    args = parser.parse_args(argv)
+
+    try:
+        store = SnapshotStore(args.store)
+    except BackupError as e:
+        print(f"Erreur : {e}")
+        sys.exit(2)
+    try:
+        if args.command == 'create':
+            try:
+                stats = create_snapshot(store, args.source, args.workers, args.name)
+            except BackupError as e:
+                log_message(args.log, f"Instantané annulé : {e}")
+                sys.exit(2)
+            log_message(args.log, f"Instantané {stats['name']} de {args.source} : {stats['files']} fichiers, "
+                                  f"{megabytes(stats['bytes'])}, {megabytes(stats['read_bytes'])} relus, "
+                                  f"{megabytes(stats['new_bytes'])} nouveaux ({stats['new_chunks']} blocs) en "
+                                  f"{stats['seconds']:.1f} s ({format_rate(stats['read_bytes'], stats['seconds'])}), "
+                                  f"dépôt : {megabytes(store.stored_bytes())}")
+            for path, error in stats['errors']:
+                log_message(args.log, f"  Erreur : {path} : {error}")
+            if stats['errors']:
+                sys.exit(EXIT_PARTIAL)
+        elif args.command == 'list':
+            print(f"{'instantané':<22} {'fichiers':>9} {'taille':>12} {'nouveau':>12}")
+            for name, created, files, byte_count, new_bytes in store.list_snapshots():
+                print(f"{name:<22} {files:>9} {megabytes(byte_count):>12} {megabytes(new_bytes):>12}")
+            print(f"Taille du dépôt : {megabytes(store.stored_bytes())}")
+        elif args.command == 'restore':
+            files, byte_count = restore_snapshot(store, args.name, args.target, args.path, args.workers, args.verify)
+            print(f"{files} fichiers restaurés ({megabytes(byte_count)}) dans {args.target}")
+        elif args.command == 'prune':
+            removed, chunk_count, byte_count = prune_snapshots(store, args.keep_days)
+            log_message(args.log, f"Nettoyage du dépôt {args.store} : {len(removed)} instantanés supprimés, "
+                                  f"{chunk_count} blocs libérés ({megabytes(byte_count)})")
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
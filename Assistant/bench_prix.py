@@ -0,0 +1,90 @@
+# Mesure de l'extraction des prix sur des descriptions synthétiques.
+# Compare l'ancienne extraction (re.search avec le motif en chaîne, carte par carte)
+# à parse_price() carte par carte et à parse_prices() (descriptions identiques analysées une fois).
+# Utilisation : python bench_prix.py [--descriptions N]
+import argparse
+import random
+import re
+import time
+
+from trello_sheets.prix import parse_price, parse_prices
+
+SPECS = [
+    "Objectif : Le CPU doit être performant pour gérer les tâches de calcul général.\n"
+    "Spécifications : Processeur avec au moins 8 cœurs, Fréquence : 3.0 GHz ou plus.\n",
+    "Objectif : Le GPU est essentiel pour les tâches de deep learning.\n"
+    "Spécifications : GPU avec au moins 10 Go de VRAM (ex. NVIDIA RTX 3060 ou supérieur).\n",
+    "Spécifications : 32 Go de RAM DDR4 ou DDR5, Fréquence : 3200 MHz ou plus.\n",
+]
+
+
+# Fonction pour générer une description avec un prix dans l'un des formats rencontrés
+def synthetic_description(rng):
+    low = rng.randint(20, 2000)
+    high = low + rng.randint(10, 1500)
+    price_line = rng.choice([
+        f"Prix moyen : {low}€ - {high}€.",
+        f"prix : {low} euro",
+        f"Prix : {low},{rng.randint(10, 99)} €",
+        f"Prix moyen : {low // 1000} {low % 1000:03d} € - {high // 1000} {high % 1000:03d} €",
+        f"prix : {low}€ (carte graphique) et prix : {high}€ (écran)",
+        "Prix à définir",
+    ])
+    return rng.choice(SPECS) + price_line
+
+
+# Anciennes fonctions des scripts, pour comparaison
+def legacy_extract_prices(card_desc):
+    match = re.search(r"Prix moyen :\s*(\d+)€\s*-\s*(\d+)€", card_desc)
+    if match:
+        return int(match.group(1)), int(match.group(2))
+    return 0, 0
+
+
+def legacy_extract_price(card_desc):
+    match_single = re.search(r"prix\s*:\s*(\d+)\s*[€euro]*", card_desc, re.IGNORECASE)
+    if match_single:
+        return int(match_single.group(1))
+    return 0
+
+
+# Fonction pour mesurer une fonction appliquée à toutes les descriptions
+def measure(label, function, descriptions):
+    start = time.perf_counter()
+    results = function(descriptions)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<45} {elapsed * 1000:9.1f} ms  ({len(descriptions) / elapsed:,.0f} descriptions/s)")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mesure l'extraction des prix.")
+    parser.add_argument('--descriptions', type=int, default=100_000)
+    parser.add_argument('--modeles', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    descriptions = [synthetic_description(rng) for _ in range(args.descriptions)]
+
+    measure("ancien extract_prices + extract_price", lambda ds: [
+        (legacy_extract_prices(d), legacy_extract_price(d)) for d in ds], descriptions)
+    single = measure("parse_price (carte par carte)", lambda ds: [parse_price(d) for d in ds], descriptions)
+    batch = measure("parse_prices (dédoublonnées)", parse_prices, descriptions)
+
+    assert single == batch
+    found = sum(1 for info in batch if info.confidence > 0)
+    print(f"Prix trouvés : {found} / {len(descriptions)}")
+
+    # Tableaux créés depuis des modèles (trelloIA.py) : beaucoup de descriptions identiques
+    templates = [synthetic_description(rng) for _ in range(args.modeles)]
+    templated = [rng.choice(templates) for _ in range(args.descriptions)]
+    print(f"\nDescriptions issues de {args.modeles} modèles :")
+    measure("ancien extract_prices + extract_price", lambda ds: [
+        (legacy_extract_prices(d), legacy_extract_price(d)) for d in ds], templated)
+    measure("parse_price (carte par carte)", lambda ds: [parse_price(d) for d in ds], templated)
+    measure("parse_prices (dédoublonnées)", parse_prices, templated)
+
+
+if __name__ == "__main__":
+    main()
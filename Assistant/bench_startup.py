@@ -0,0 +1,45 @@
+# Mesure du temps de démarrage des scripts Trello (import du module et --help).
+# Chaque mesure lance un nouvel interpréteur Python, comme cron le ferait.
+# Utilisation : python bench_startup.py [--repetitions N]
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+SCRIPTS = ["trelloserveur.py", "ScrapPrixTrelloGoogleSheet.py", "trelloIA.py"]
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+# Fonction pour mesurer la durée médiane (en ms) d'une commande Python
+def measure(command, repetitions):
+    durations = []
+    for _ in range(repetitions):
+        start = time.perf_counter()
+        subprocess.run([sys.executable] + command, cwd=SCRIPT_DIR, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        durations.append((time.perf_counter() - start) * 1000)
+    return statistics.median(durations)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mesure le temps de démarrage des scripts Trello.")
+    parser.add_argument('--repetitions', type=int, default=10)
+    args = parser.parse_args()
+
+    # Référence : démarrage d'un interpréteur vide
+    baseline = measure(["-c", "pass"], args.repetitions)
+    print(f"{'Interpréteur seul':<35} {baseline:8.1f} ms")
+
+    for script in SCRIPTS:
+        module = script[:-3]
+        import_time = measure(["-c", f"import {module}"], args.repetitions)
+        help_time = measure([script, "--help"], args.repetitions)
+        print(f"{'import ' + module:<35} {import_time:8.1f} ms  (+{import_time - baseline:.1f})")
+        print(f"{script + ' --help':<35} {help_time:8.1f} ms  (+{help_time - baseline:.1f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+# Mesure hors ligne de la synchronisation Trello -> Google Sheets (trello_sheets.sync).
+# Les API sont remplacées par les services simulés de fake_services.py : pour des tableaux
+# de 10, 1 000 et 10 000 cartes, on relève la durée, le nombre de requêtes et les octets
+# envoyés d'une écriture complète, puis de deux exécutions incrémentales.
+# Utilisation : python bench_sync.py [--cartes 10 1000 10000] [--latence-trello 0.05]
+#               [--quota-google 60/60] [--sortie resultats.json] [--reference resultats.json]
+# Avec --webhook, webhook_server.py est lancé sur un tableau et un classeur simulés, pour l'essayer
+# avec webhook_sender.py : python bench_sync.py --webhook [--cartes 100] [options de webhook_server.py]
+import argparse
+import contextlib
+import functools
+import importlib
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+BOARD_ID = "tableau-simule"
+SPREADSHEET_URL = "https://docs.google.com/spreadsheets/d/classeur-simule/edit"
+
+
+# Fonction pour brancher les services simulés à la place des clients partagés, le temps du bloc with
+@contextlib.contextmanager
+def install_fakes(trello, spreadsheet):
+    from unittest import mock
+    from trello_sheets import clients
+    from trello_sheets.transport import RetryingSession
+    from trello_sheets.sheet_metadata import clear_metadata
+    trello_session = RetryingSession(trello)
+    # Comme clients.get_spreadsheet, le classeur n'est ouvert qu'une fois par exécution
+    open_spreadsheet = functools.lru_cache(maxsize=None)(lambda url: spreadsheet.open())
+    with mock.patch.object(clients, 'get_trello_session', lambda: trello_session), \
+            mock.patch.object(clients, 'get_spreadsheet', open_spreadsheet), \
+            mock.patch.object(clients, 'get_sheets_service', lambda: spreadsheet):
+        # Les métadonnées en cache décrivent un autre classeur (simulé ou réel)
+        clear_metadata()
+        try:
+            yield
+        finally:
+            clear_metadata()
+
+
+# Fonction pour isoler une exécution simulée le temps du bloc with : identifiants simulés, instantanés
+# dans un dossier temporaire (retourné), pas d'historique des prix ; tout est rétabli à la sortie
+@contextlib.contextmanager
+def simulated_environment():
+    from unittest import mock
+    from trello_sheets import sync_snapshot
+    from trello_sheets.price_history import get_history
+    from trello_sheets.settings import get_settings
+    snapshot_dir = tempfile.mkdtemp(prefix="simulation-")
+    with mock.patch.dict(os.environ, TRELLO_API_KEY="cle", TRELLO_API_TOKEN="jeton", BOARD_ID=BOARD_ID,
+                         PRICE_HISTORY_DB='off'), \
+            mock.patch.object(sync_snapshot, 'SNAPSHOT_DIR', snapshot_dir):
+        get_settings.cache_clear()
+        get_history.cache_clear()
+        try:
+            yield snapshot_dir
+        finally:
+            get_settings.cache_clear()
+            get_history.cache_clear()
+            shutil.rmtree(snapshot_dir, ignore_errors=True)
+
+
+# Fonction pour remplacer Trello et Google par un tableau de card_count cartes et un classeur simulés,
+# le temps du bloc with ; retourne la session Trello et le classeur simulés
+@contextlib.contextmanager
+def simulation(card_count):
+    import fake_services
+    lists, list_ids = fake_services.make_board(card_count)
+    trello = fake_services.FakeTrelloSession(BOARD_ID, lists, list_ids)
+    spreadsheet = fake_services.FakeSpreadsheet()
+    with simulated_environment(), install_fakes(trello, spreadsheet):
+        yield trello, spreadsheet
+
+
+# Fonction pour lancer webhook_server.py sur les services simulés (essais avec webhook_sender.py)
+def serve_webhook(card_count, server_args):
+    from unittest import mock
+    import webhook_server
+    from trello_sheets import clients
+    with simulation(card_count) as (trello, _):
+        for name, list_id in trello.list_ids.items():
+            print(f"Colonne simulée '{name}' : --colonne {list_id} --nom-colonne \"{name}\"")
+        # Le serveur lit les cartes sans cache : ici, directement dans le tableau simulé
+        with mock.patch.object(webhook_server, 'create_live_session', clients.get_trello_session):
+            webhook_server.main(server_args)
+
+
+# Fonction pour exécuter une synchronisation et relever ses mesures
+def run_scenario(profile, trello, spreadsheet, incremental):
+    from trello_sheets.sync import process_and_update_sheet
+
+    before = (trello.stats.as_dict(), spreadsheet.stats.as_dict())
+    args = argparse.Namespace(listes=[], all_lists=True, incremental=incremental)
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        process_and_update_sheet(profile, args)
+    elapsed = time.perf_counter() - start
+
+    result = {'seconds': round(elapsed, 4)}
+    for prefix, stats, previous in (('trello', trello.stats, before[0]), ('google', spreadsheet.stats, before[1])):
+        for key, value in stats.as_dict().items():
+            result[f"{prefix}_{key}"] = value - previous[key]
+    return result
+
+
+# Fonction pour vérifier que chaque feuille contient l'en-tête, une ligne par carte et le total
+def check_sheets(spreadsheet, lists):
+    for name, cards in lists.items():
+        rows = spreadsheet.sheets[name].rows
+        # Lignes 1 à 4 vides, en-tête en ligne 5, cartes, puis total
+        expected = 4 + 1 + len(cards) + 1
+        if len(rows) != expected or rows[-1][1] != "Total":
+            raise AssertionError(f"Feuille '{name}' : {len(rows)} lignes au lieu de {expected}")
+
+
+# Fonction pour mesurer un tableau d'une taille donnée
+def bench_size(profile, card_count, args):
+    import fake_services
+    from trello_sheets import sync_snapshot
+
+    lists, list_ids = fake_services.make_board(card_count, args.colonnes)
+    trello = fake_services.FakeTrelloSession(BOARD_ID, lists, list_ids, latency=args.latence_trello,
+                                             quota=fake_services.parse_quota(args.quota_trello))
+    spreadsheet = fake_services.FakeSpreadsheet(latency=args.latence_google,
+                                                quota=fake_services.parse_quota(args.quota_google))
+    # Instantanés séparés pour chaque taille de tableau
+    sync_snapshot.SNAPSHOT_DIR = tempfile.mkdtemp(prefix=f"snapshots-{card_count}-", dir=args.cache_dir)
+
+    results = {}
+    with install_fakes(trello, spreadsheet):
+        results['complet'] = run_scenario(profile, trello, spreadsheet, incremental=False)
+        check_sheets(spreadsheet, lists)
+        results['incrémental, sans changement'] = run_scenario(profile, trello, spreadsheet, incremental=True)
+        fake_services.touch_cards(lists, 0.01)
+        results['incrémental, 1 % modifié'] = run_scenario(profile, trello, spreadsheet, incremental=True)
+        check_sheets(spreadsheet, lists)
+    return results
+
+
+def print_results(card_count, results):
+    print(f"\n{card_count} cartes")
+    print(f"{'scénario':<30} {'durée':>9} {'req. Trello':>12} {'req. Google':>12} "
+          f"{'octets envoyés':>15} {'octets reçus':>13} {'429':>5}")
+    for scenario, result in results.items():
+        sent = result['trello_bytes_sent'] + result['google_bytes_sent']
+        received = result['trello_bytes_received'] + result['google_bytes_received']
+        throttled = result['trello_throttled'] + result['google_throttled']
+        print(f"{scenario:<30} {result['seconds'] * 1000:7.0f}ms {result['trello_requests']:>12} "
+              f"{result['google_requests']:>12} {sent:>15,} {received:>13,} {throttled:>5}")
+
+
+# Fonction pour comparer aux mesures de référence : toute requête supplémentaire est une régression
+# Les requêtes refusées par un quota simulé (429) ne sont pas comptées, et les octets envoyés
+# ne sont comparés que si aucune des deux mesures n'a subi de quota (les nouvelles tentatives renvoient le corps)
+def compare(all_results, reference):
+    regressions = []
+    for size, results in all_results.items():
+        for scenario, result in results.items():
+            previous = reference.get(size, {}).get(scenario)
+            if not previous:
+                continue
+            for api in ('trello', 'google'):
+                accepted = result[f"{api}_requests"] - result[f"{api}_throttled"]
+                previous_accepted = previous[f"{api}_requests"] - previous[f"{api}_throttled"]
+                if accepted > previous_accepted:
+                    regressions.append(f"{size} cartes, {scenario} : requêtes {api} {previous_accepted} -> {accepted}")
+            if result['trello_throttled'] + result['google_throttled'] + \
+                    previous['trello_throttled'] + previous['google_throttled']:
+                continue
+            sent = result['trello_bytes_sent'] + result['google_bytes_sent']
+            previous_sent = previous['trello_bytes_sent'] + previous['google_bytes_sent']
+            if sent > previous_sent * 1.1:
+                regressions.append(f"{size} cartes, {scenario} : octets envoyés {previous_sent} -> {sent}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mesure la synchronisation Trello -> Google Sheets hors ligne.")
+    parser.add_argument('--script', default='trelloserveur', choices=['trelloserveur', 'ScrapPrixTrelloGoogleSheet'])
+    parser.add_argument('--cartes', type=int, nargs='+', help="Tailles des tableaux (10 1000 10000, ou 100 avec --webhook)")
+    parser.add_argument('--colonnes', type=int, default=5)
+    parser.add_argument('--latence-trello', type=float, default=0.0, help="Latence simulée par requête (s)")
+    parser.add_argument('--latence-google', type=float, default=0.0, help="Latence simulée par requête (s)")
+    parser.add_argument('--quota-trello', help="Quota simulé, ex : 100/10 (requêtes/secondes)")
+    parser.add_argument('--quota-google', help="Quota simulé, ex : 60/60 (requêtes/secondes)")
+    parser.add_argument('--sortie', help="Fichier JSON où enregistrer les mesures")
+    parser.add_argument('--reference', help="Mesures JSON précédentes : échec si le nombre de requêtes augmente")
+    parser.add_argument('--webhook', action='store_true',
+                        help="Lancer webhook_server.py sur les services simulés (les autres options lui sont passées)")
+    args, server_args = parser.parse_known_args()
+    if args.webhook:
+        serve_webhook(args.cartes[0] if args.cartes else 100, server_args + ['--script', args.script])
+        return
+    if server_args:
+        parser.error(f"arguments non reconnus : {' '.join(server_args)}")
+    args.cartes = args.cartes or [10, 1000, 10000]
+
+    # Les instantanés et caches de l'exécution restent dans un dossier temporaire
+    args.cache_dir = tempfile.mkdtemp(prefix="bench-sync-")
+    os.environ['AUTOMATISATION_CACHE_DIR'] = args.cache_dir
+    # Identifiants simulés (prioritaires sur ceux du fichier .env)
+    os.environ.update(TRELLO_API_KEY="cle", TRELLO_API_TOKEN="jeton", BOARD_ID=BOARD_ID)
+    profile = importlib.import_module(args.script).PROFILE._replace(spreadsheet_url=SPREADSHEET_URL)
+
+    all_results = {}
+    for card_count in args.cartes:
+        all_results[str(card_count)] = results = bench_size(profile, card_count, args)
+        print_results(card_count, results)
+
+    if args.sortie:
+        with open(args.sortie, 'w') as f:
+            json.dump(all_results, f, indent=2, ensure_ascii=False)
+
+    if args.reference:
+        with open(args.reference) as f:
+            regressions = compare(all_results, json.load(f))
+        if regressions:
+            print("\nRégressions par rapport à la référence :")
+            for regression in regressions:
+                print(f"- {regression}")
+            sys.exit(1)
+        print("\nAucune régression par rapport à la référence.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,319 @@
+# Services Trello et Google Sheets simulés en mémoire, sans réseau.
+# Ils répondent comme les vraies API aux appels utilisés par les scripts
+# (colonnes et cartes Trello, values.batchUpdate et batchUpdate de Sheets, classeur gspread),
+# avec une latence et des quotas réglables, et comptent les requêtes et les octets échangés.
+# Utilisés par bench_sync.py pour mesurer la synchronisation hors ligne.
+import json
+import random
+import re
+import threading
+import time
+from collections import deque
+from urllib.parse import urlencode, urlparse
+
+from bench_prix import synthetic_description
+
+TRELLO_PATH_RE = re.compile(r"^/1/(boards|lists)/([^/]+)/(lists|cards)$")
+
+A1_RE = re.compile(r"^'((?:[^']|'')*)'!([A-Z]+)(\d+)$")
+
+
+# Compteurs d'un service simulé (partagés entre les threads)
+class ServiceStats:
+    def __init__(self):
+        self.requests = 0
+        self.throttled = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.lock = threading.Lock()
+
+    def record(self, sent, received, throttled=False):
+        with self.lock:
+            self.requests += 1
+            self.bytes_sent += sent
+            self.bytes_received += received
+            if throttled:
+                self.throttled += 1
+
+    def as_dict(self):
+        return {
+            'requests': self.requests,
+            'throttled': self.throttled,
+            'bytes_sent': self.bytes_sent,
+            'bytes_received': self.bytes_received
+        }
+
+
+# Quota glissant : au plus max_requests requêtes par fenêtre de window secondes
+class Quota:
+    def __init__(self, max_requests, window):
+        self.max_requests = max_requests
+        self.window = window
+        self.calls = deque()
+        self.lock = threading.Lock()
+
+    # Retourne None si la requête est acceptée, sinon le délai avant de réessayer
+    def check(self):
+        with self.lock:
+            now = time.monotonic()
+            while self.calls and self.calls[0] <= now - self.window:
+                self.calls.popleft()
+            if len(self.calls) >= self.max_requests:
+                return self.calls[0] + self.window - now
+            self.calls.append(now)
+            return None
+
+
+# Fonction pour lire un quota écrit "requêtes/secondes" (ex : "100/10")
+def parse_quota(value):
+    if not value:
+        return None
+    max_requests, window = value.split('/')
+    return Quota(int(max_requests), float(window))
+
+
+# Fonction pour générer un tableau Trello : {nom de colonne: cartes}
+def make_board(card_count, list_count=5, seed=42):
+    rng = random.Random(seed)
+    # Position dans la colonne indépendante de la date de création (cartes déplacées)
+    order = random.Random(seed + 1)
+    lists = {f"Colonne {idx}": [] for idx in range(list_count)}
+    list_ids = {name: f"{idx:024x}" for idx, name in enumerate(lists)}
+    names = list(lists)
+    for idx in range(card_count):
+        name = names[idx % list_count]
+        card_id = f"{idx + 1:024x}"
+        lists[name].append({
+            'id': card_id,
+            'idList': list_ids[name],
+            'name': f"Composant {idx}",
+            'desc': synthetic_description(rng),
+            'dateLastActivity': "2024-01-01T00:00:00.000Z",
+            'url': f"https://trello.com/c/{card_id[-8:]}",
+            'pos': order.uniform(0, 65536 * card_count)
+        })
+    return lists, list_ids
+
+
+# Fonction pour modifier une part des cartes (description et date d'activité), comme entre deux exécutions
+def touch_cards(lists, ratio, seed=0):
+    rng = random.Random(seed)
+    for cards in lists.values():
+        for card in cards:
+            if rng.random() < ratio:
+                card['desc'] = synthetic_description(rng)
+                card['dateLastActivity'] = "2024-06-01T00:00:00.000Z"
+
+
+# Session Trello simulée (interface de requests.Session)
+class FakeTrelloSession:
+    def __init__(self, board_id, lists, list_ids, latency=0.0, quota=None):
+        self.board_id = board_id
+        self.lists = lists
+        self.list_ids = list_ids
+        self.latency = latency
+        self.quota = quota
+        self.stats = ServiceStats()
+
+    def response(self, url, status, payload, headers=None):
+        import requests
+        response = requests.Response()
+        response.status_code = status
+        response.url = url
+        response._content = json.dumps(payload).encode('utf-8')
+        response.headers.update(headers or {})
+        response.headers['Content-Type'] = 'application/json'
+        return response
+
+    def route(self, path, params):
+        match = TRELLO_PATH_RE.match(path)
+        if not match:
+            return None
+        kind, object_id, resource = match.groups()
+        if kind == 'boards' and object_id == self.board_id:
+            if resource == 'lists':
+                return [{'id': self.list_ids[name], 'name': name} for name in self.lists]
+            return self.page([card for cards in self.lists.values() for card in cards], params)
+        if kind == 'lists' and resource == 'cards':
+            for name, list_id in self.list_ids.items():
+                if list_id == object_id:
+                    return self.page(self.lists[name], params)
+        return None
+
+    # Pagination comme Trello : sans limit/before, les cartes dans l'ordre de la colonne (pos) ;
+    # avec limit/before, les cartes créées avant `before`, les plus récentes d'abord
+    def page(self, cards, params):
+        if 'limit' not in params and 'before' not in params:
+            return sorted(cards, key=lambda card: card['pos'])
+        if 'before' in params:
+            cards = [card for card in cards if card['id'] < params['before']]
+        cards = sorted(cards, key=lambda card: card['id'], reverse=True)
+        return cards[:int(params.get('limit', 1000))]
+
+    def request(self, method, url, params=None, headers=None, **kwargs):
+        # Comme requests, les paramètres à None ne sont pas envoyés
+        params = {key: value for key, value in (params or {}).items() if value is not None}
+        full_url = f"{url}?{urlencode(params)}" if params else url
+        sent = len(f"{method} {full_url} HTTP/1.1\r\n")
+        time.sleep(self.latency)
+
+        retry_after = self.quota.check() if self.quota else None
+        if retry_after is not None:
+            response = self.response(full_url, 429, {'message': "API token limit exceeded"},
+                                     {'Retry-After': f"{retry_after:.3f}"})
+        elif method != 'GET':
+            response = self.response(full_url, 405, {'message': "Méthode non simulée"})
+        else:
+            payload = self.route(urlparse(url).path, params)
+            if payload is None:
+                response = self.response(full_url, 404, {'message': "The requested resource was not found."})
+            else:
+                response = self.response(full_url, 200, payload)
+        self.stats.record(sent, len(response.content), throttled=retry_after is not None)
+        return response
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def close(self):
+        pass
+
+
+# Fonction pour convertir des lettres de colonne en index (A -> 0)
+def column_index(letters):
+    index = 0
+    for letter in letters:
+        index = index * 26 + ord(letter) - ord('A') + 1
+    return index - 1
+
+
+# Feuille simulée : titre, id et valeurs (listes de lignes, à partir de la ligne 1)
+class FakeWorksheet:
+    def __init__(self, sheet_id, title, rows=None):
+        self.id = sheet_id
+        self.title = title
+        self.rows = rows or []
+
+    def write(self, row, column, values):
+        for offset, values_row in enumerate(values):
+            index = row - 1 + offset
+            while len(self.rows) <= index:
+                self.rows.append([])
+            line = self.rows[index]
+            if len(line) < column + len(values_row):
+                line.extend([""] * (column + len(values_row) - len(line)))
+            line[column:column + len(values_row)] = values_row
+
+
+# Classeur Google Sheets simulé, utilisable à la fois comme client gspread
+# (worksheet, duplicate_sheet) et comme service googleapiclient (spreadsheets().…execute())
+class FakeSpreadsheet:
+    def __init__(self, latency=0.0, quota=None, spreadsheet_id="classeur-simule"):
+        self.id = spreadsheet_id
+        self.latency = latency
+        self.quota = quota
+        self.stats = ServiceStats()
+        self.sheets = {'modele': FakeWorksheet(0, 'modele')}
+        self.next_sheet_id = 1
+        self.opening_metadata = None
+        self.lock = threading.Lock()
+
+    # Simuler un appel HTTP : latence, quota (erreur 429 comme l'API Google), comptage
+    def call(self, body, handler):
+        sent = len(json.dumps(body)) if body is not None else 0
+        time.sleep(self.latency)
+        retry_after = self.quota.check() if self.quota else None
+        if retry_after is not None:
+            from googleapiclient.errors import HttpError
+            import httplib2
+            content = json.dumps({'error': {'code': 429, 'status': 'RESOURCE_EXHAUSTED',
+                                            'message': "Quota exceeded (rateLimitExceeded)"}}).encode('utf-8')
+            self.stats.record(sent, len(content), throttled=True)
+            raise HttpError(httplib2.Response({'status': 429, 'retry-after': f"{retry_after:.3f}"}), content)
+        with self.lock:
+            result = handler()
+        self.stats.record(sent, len(json.dumps(result)))
+        return result
+
+    # Ouverture du classeur (clients.get_spreadsheet) : métadonnées lues une fois et gardées
+    def open(self):
+        self.opening_metadata = (time.monotonic(), self.fetch_sheet_metadata())
+        return self
+
+    # Interface gspread
+    def fetch_sheet_metadata(self):
+        return self.call(None, lambda: {
+            'sheets': [{'properties': {'sheetId': s.id, 'title': s.title}} for s in self.sheets.values()]
+        })
+
+    def worksheet(self, title):
+        import gspread
+        self.fetch_sheet_metadata()
+        if title not in self.sheets:
+            raise gspread.exceptions.WorksheetNotFound(title)
+        return self.sheets[title]
+
+    def duplicate_sheet(self, source_sheet_id, new_sheet_name=None):
+        body = {'requests': [{'duplicateSheet': {'sourceSheetId': source_sheet_id, 'newSheetName': new_sheet_name}}]}
+
+        def handler():
+            source = next(s for s in self.sheets.values() if s.id == source_sheet_id)
+            sheet = FakeWorksheet(self.next_sheet_id, new_sheet_name, [list(row) for row in source.rows])
+            self.next_sheet_id += 1
+            self.sheets[new_sheet_name] = sheet
+            return {'replies': [{'duplicateSheet': {'properties': {'sheetId': sheet.id, 'title': sheet.title}}}]}
+        self.call(body, handler)
+        return self.sheets[new_sheet_name]
+
+    # Interface googleapiclient
+    def spreadsheets(self):
+        return self
+
+    def values(self):
+        return FakeValues(self)
+
+    def batchUpdate(self, spreadsheetId, body):
+        return FakeRequest(self, body, lambda: self.apply_requests(body['requests']))
+
+    def sheet_by_id(self, sheet_id):
+        return next(s for s in self.sheets.values() if s.id == sheet_id)
+
+    def apply_requests(self, requests):
+        for request in requests:
+            if 'insertDimension' in request:
+                grid = request['insertDimension']['range']
+                sheet = self.sheet_by_id(grid['sheetId'])
+                for _ in range(grid['endIndex'] - grid['startIndex']):
+                    sheet.rows.insert(grid['startIndex'], [])
+            elif 'deleteDimension' in request:
+                grid = request['deleteDimension']['range']
+                del self.sheet_by_id(grid['sheetId']).rows[grid['startIndex']:grid['endIndex']]
+            elif 'updateCells' in request:
+                grid = request['updateCells']['range']
+                del self.sheet_by_id(grid['sheetId']).rows[grid['startRowIndex']:]
+        return {'replies': [{} for _ in requests]}
+
+    def write_values(self, data):
+        for value_range in data:
+            title, letters, row = A1_RE.match(value_range['range']).groups()
+            self.sheets[title.replace("''", "'")].write(int(row), column_index(letters), value_range['values'])
+        return {'totalUpdatedRanges': len(data)}
+
+
+class FakeValues:
+    def __init__(self, spreadsheet):
+        self.spreadsheet = spreadsheet
+
+    def batchUpdate(self, spreadsheetId, body):
+        return FakeRequest(self.spreadsheet, body, lambda: self.spreadsheet.write_values(body['data']))
+
+
+# Requête googleapiclient différée : rien n'est envoyé avant execute()
+class FakeRequest:
+    def __init__(self, spreadsheet, body, handler):
+        self.spreadsheet = spreadsheet
+        self.body = body
+        self.handler = handler
+
+    def execute(self):
+        return self.spreadsheet.call(self.body, self.handler)
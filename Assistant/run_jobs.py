@@ -0,0 +1,164 @@
+# Lanceur de tâches : synchronise plusieurs tableaux Trello vers plusieurs classeurs Google Sheets.
+# Les tâches (tableau, colonnes, classeur, feuille modèle) sont lues dans un fichier YAML ou JSON
+# et exécutées en parallèle par un pool de threads. La session Trello et les identifiants Google
+# sont partagés par toutes les tâches, et le nombre de requêtes simultanées vers chaque API est
+# plafonné pour l'ensemble des tâches. Chaque tâche a son propre statut et sa durée dans le rapport.
+# Utilisation : python run_jobs.py taches.yaml [--workers 4] [--trello 8] [--google 4] [--rapport rapport.json]
+import argparse
+import importlib
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from trello_sheets import metrics
+from trello_sheets.boards import get_existing_lists
+from trello_sheets.cli import select_lists
+from trello_sheets.settings import get_settings
+from trello_sheets.sync import sync_lists
+from trello_sheets.transport import set_concurrency_limit
+
+SCRIPTS = ('trelloserveur', 'ScrapPrixTrelloGoogleSheet')
+
+DEFAULT_WORKERS = 4
+DEFAULT_TRELLO_CONCURRENCY = 8
+DEFAULT_GOOGLE_CONCURRENCY = 4
+
+
+class JobConfigError(Exception):
+    pass
+
+
+# Fonction pour charger le fichier de tâches (JSON, ou YAML si PyYAML est installé)
+def load_config(path):
+    with open(path) as f:
+        if path.endswith('.json'):
+            config = json.load(f)
+        else:
+            try:
+                import yaml
+            except ImportError:
+                raise JobConfigError("PyYAML n'est pas installé : utilisez un fichier .json ou `pip install pyyaml`")
+            try:
+                config = yaml.safe_load(f)
+            except yaml.YAMLError as e:
+                raise JobConfigError(f"YAML invalide : {e}")
+    # Une simple liste de tâches est acceptée
+    if isinstance(config, list):
+        config = {'jobs': config}
+    config['jobs'] = [normalize_job(job, idx) for idx, job in enumerate(config.get('jobs') or [])]
+    return config
+
+
+# Fonction pour vérifier une tâche et compléter les valeurs par défaut
+def normalize_job(job, idx):
+    for key in ('board', 'spreadsheet'):
+        if not job.get(key):
+            raise JobConfigError(f"Tâche {idx} : '{key}' manquant")
+    script = job.get('script', SCRIPTS[0])
+    if script not in SCRIPTS:
+        raise JobConfigError(f"Tâche {idx} : script inconnu '{script}' (attendu : {', '.join(SCRIPTS)})")
+    lists = job.get('lists', 'all')
+    return {
+        'name': job.get('name') or f"{script}:{job['board']}",
+        'script': script,
+        'board': job['board'],
+        # 'all' ou liste de noms / index de colonnes
+        'lists': lists if lists == 'all' else [str(selection) for selection in lists],
+        'spreadsheet': job['spreadsheet'],
+        'template': job.get('template', 'modele'),
+        'incremental': bool(job.get('incremental', False))
+    }
+
+
+# Fonction pour exécuter une tâche et construire son rapport (les erreurs n'arrêtent pas les autres tâches)
+def run_job(job):
+    report = {'name': job['name'], 'board': job['board'], 'spreadsheet': job['spreadsheet'], 'status': 'ok'}
+    start = time.perf_counter()
+    try:
+        profile = importlib.import_module(job['script']).PROFILE
+        existing_lists = get_existing_lists(job['board'])
+        # Tableau illisible, colonne inconnue ou aucune colonne : ListSelectionError, tâche en erreur
+        selected_lists = select_lists(existing_lists, [] if job['lists'] == 'all' else job['lists'],
+                                      all_lists=job['lists'] == 'all')
+        summary = sync_lists(profile, selected_lists, job['spreadsheet'], incremental=job['incremental'],
+                             template_sheet=job['template'])
+        report.update(summary)
+        if summary['failed_sheets']:
+            report['status'] = 'partiel'
+    except Exception as e:
+        report['status'] = 'erreur'
+        report['error'] = str(e)
+    report['seconds'] = round(time.perf_counter() - start, 3)
+    metrics.observe('job_seconds', report['seconds'], job=job['name'], status=report['status'])
+    return report
+
+
+# Fonction pour exécuter toutes les tâches avec un pool de workers (rapports dans l'ordre du fichier)
+def run_jobs(jobs, workers=DEFAULT_WORKERS, trello_concurrency=DEFAULT_TRELLO_CONCURRENCY,
+             google_concurrency=DEFAULT_GOOGLE_CONCURRENCY):
+    set_concurrency_limit('trello', trello_concurrency)
+    set_concurrency_limit('google', google_concurrency)
+    # Profils importés et .env chargé avant le démarrage des threads, une seule fois
+    get_settings()
+    for script in {job['script'] for job in jobs}:
+        importlib.import_module(script)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(run_job, jobs))
+
+
+# Fonction pour créer les clients partagés avant le démarrage des threads
+# (après le chargement du .env, qui peut donner GOOGLE_CREDENTIALS_PATH)
+def warm_up_clients():
+    from trello_sheets.clients import get_trello_session, get_credentials
+    get_settings()
+    get_trello_session()
+    get_credentials()
+
+
+def print_report(reports):
+    print(f"\n{'tâche':<30} {'statut':<8} {'durée':>8} {'feuilles':>9} {'cartes':>8} {'appels Google':>14}")
+    for report in reports:
+        print(f"{report['name']:<30} {report['status']:<8} {report['seconds']:7.1f}s "
+              f"{report.get('sheets', 0):>9} {report.get('cards', 0):>8} {report.get('google_write_calls', 0):>14}")
+        if report.get('error'):
+            print(f"    erreur : {report['error']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Synchronise plusieurs tableaux Trello vers Google Sheets.")
+    parser.add_argument('config', help="Fichier de tâches YAML ou JSON")
+    parser.add_argument('--workers', type=int, help="Nombre de tâches exécutées en parallèle")
+    parser.add_argument('--trello', type=int, help="Requêtes Trello simultanées au maximum (toutes tâches)")
+    parser.add_argument('--google', type=int, help="Requêtes Google simultanées au maximum (toutes tâches)")
+    parser.add_argument('--rapport', help="Fichier JSON où enregistrer le rapport des tâches")
+    parser.add_argument('--metriques', metavar='FICHIER',
+                        help="Exporter les mesures (durées, requêtes, octets) : .prom pour Prometheus, sinon lignes JSON")
+    args = parser.parse_args(argv)
+
+    try:
+        config = load_config(args.config)
+    except (OSError, ValueError, JobConfigError) as e:
+        print(f"Erreur dans le fichier de tâches : {e}")
+        sys.exit(2)
+    concurrency = config.get('concurrency') or {}
+
+    warm_up_clients()
+    reports = run_jobs(config['jobs'],
+                       workers=args.workers or config.get('workers', DEFAULT_WORKERS),
+                       trello_concurrency=args.trello or concurrency.get('trello', DEFAULT_TRELLO_CONCURRENCY),
+                       google_concurrency=args.google or concurrency.get('google', DEFAULT_GOOGLE_CONCURRENCY))
+    print_report(reports)
+    metrics.write_metrics(args.metriques)
+
+    if args.rapport:
+        with open(args.rapport, 'w') as f:
+            json.dump(reports, f, indent=2, ensure_ascii=False)
+
+    # Une tâche en erreur ou dont une feuille n'a pas pu être écrite fait échouer l'exécution
+    if any(report['status'] != 'ok' for report in reports):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+# backup.py sur des dossiers temporaires : copie, index, suppressions et changements de type (ni /srv ni /var/log).
+import contextlib
+import io
+import os
+import shutil
+import stat
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+import backup
+from backup import INDEX_NAME, run_backup
+
+
+# Fonction pour lister une arborescence : {chemin relatif: contenu, 'dossier' ou cible du lien}
+def tree(root):
+    content = {}
+    for current, dirs, files in os.walk(root):
+        for name in dirs + files:
+            path = os.path.join(current, name)
+            relative = os.path.relpath(path, root)
+            if relative.startswith(INDEX_NAME):
+                continue
+            if os.path.islink(path):
+                content[relative] = 'lien:' + os.readlink(path)
+            elif os.path.isdir(path):
+                content[relative] = 'dossier'
+            else:
+                with open(path, 'rb') as f:
+                    content[relative] = f.read()
+    return content
+
+
+def write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+class BackupTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp(prefix="test-backup-")
+        self.source = os.path.join(self.root, 'src')
+        self.destination = os.path.join(self.root, 'dst')
+        write(os.path.join(self.source, 'a', 'b', 'document.txt'), b"contenu" * 1000)
+        write(os.path.join(self.source, 'a', 'note.txt'), b"note")
+        write(os.path.join(self.source, 'racine.bin'), os.urandom(50000))
+        os.makedirs(os.path.join(self.source, 'vide'))
+        os.symlink('a/note.txt', os.path.join(self.source, 'lien'))
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def backup(self, delete=True):
+        return run_backup(self.source, self.destination, workers=2, delete=delete)
+
+    def assertMirror(self):
+        self.assertEqual(tree(self.source), tree(self.destination))
+
+    def test_first_run_copies_everything(self):
+        stats = self.backup()
+        self.assertEqual(stats['copied'], 4)
+        self.assertEqual(stats['errors'], [])
+        self.assertMirror()
+
+    def test_unchanged_files_are_skipped(self):
+        self.backup()
+        stats = self.backup()
+        self.assertEqual((stats['copied'], stats['skipped']), (0, 4))
+
+        # Un fichier modifié (taille et date) est recopié, et lui seul
+        path = os.path.join(self.source, 'a', 'note.txt')
+        write(path, b"note modifiee")
+        os.utime(path, ns=(time.time_ns() + 10 ** 9,) * 2)
+        stats = self.backup()
+        self.assertEqual((stats['copied'], stats['bytes_copied']), (1, len(b"note modifiee")))
+        self.assertMirror()
+
+    def test_existing_mirror_is_adopted_without_copy(self):
+        # Miroir fait par rsync -a : mêmes tailles et mêmes dates, mais pas d'index
+        shutil.copytree(self.source, self.destination, symlinks=True)
+        write(os.path.join(self.destination, 'en_trop', 'ancien.txt'), b"disparu de la source")
+        stats = self.backup()
+        self.assertEqual(stats['copied'], 0)
+        self.assertEqual(stats['skipped'], 4)
+        self.assertMirror()
+
+    def test_deleted_files_and_dirs_are_removed(self):
+        self.backup()
+        os.remove(os.path.join(self.source, 'racine.bin'))
+        shutil.rmtree(os.path.join(self.source, 'a', 'b'))
+        stats = self.backup()
+        self.assertEqual(stats['deleted'], 3)
+        self.assertMirror()
+
+    def test_without_delete_removed_files_are_kept(self):
+        self.backup()
+        os.remove(os.path.join(self.source, 'racine.bin'))
+        self.backup(delete=False)
+        self.assertTrue(os.path.exists(os.path.join(self.destination, 'racine.bin')))
+
+    def test_file_replaced_by_directory(self):
+        self.backup()
+        os.remove(os.path.join(self.source, 'racine.bin'))
+        write(os.path.join(self.source, 'racine.bin', 'dedans.txt'), b"dossier")
+        stats = self.backup()
+        self.assertEqual(stats['errors'], [])
+        self.assertMirror()
+        # Les exécutions suivantes restent normales
+        stats = self.backup()
+        self.assertEqual((stats['copied'], stats['errors']), (0, []))
+
+    def test_directory_replaced_by_file_and_link(self):
+        self.backup()
+        shutil.rmtree(os.path.join(self.source, 'a', 'b'))
+        write(os.path.join(self.source, 'a', 'b'), b"fichier")
+        shutil.rmtree(os.path.join(self.source, 'vide'))
+        os.symlink('a', os.path.join(self.source, 'vide'))
+        for delete in (True, False):
+            stats = self.backup(delete=delete)
+            self.assertEqual(stats['errors'], [])
+            self.assertMirror()
+
+    def test_mode_change_is_applied_without_copy(self):
+        self.backup()
+        path = os.path.join('a', 'note.txt')
+        os.chmod(os.path.join(self.source, path), 0o600)
+        stats = self.backup()
+        self.assertEqual((stats['copied'], stats['updated'], stats['skipped']), (0, 1, 3))
+        self.assertEqual(stat.S_IMODE(os.stat(os.path.join(self.destination, path)).st_mode), 0o600)
+        self.assertEqual(self.backup()['updated'], 0)
+
+    @unittest.skipUnless(os.geteuid() == 0, "changer de propriétaire demande les droits root")
+    def test_owner_change_is_applied_to_files_and_dirs(self):
+        self.backup()
+        for path in ('a', os.path.join('a', 'note.txt')):
+            os.chown(os.path.join(self.source, path), 1234, 4321)
+        stats = self.backup()
+        self.assertEqual((stats['copied'], stats['updated']), (0, 1))
+        for path in ('a', os.path.join('a', 'note.txt')):
+            info = os.lstat(os.path.join(self.destination, path))
+            self.assertEqual((info.st_uid, info.st_gid), (1234, 4321))
+
+    # Parcours perturbé : 'a/b' ne peut pas être listé et 'a/note.txt' disparaît entre la lecture
+    # du dossier 'a' et celle de ses informations
+    def racy_scandir(self):
+        real_scandir = os.scandir
+
+        def scandir(path):
+            if path == os.path.join(self.source, 'a', 'b'):
+                raise PermissionError(13, "Permission denied", path)
+            if path != os.path.join(self.source, 'a'):
+                return real_scandir(path)
+            with real_scandir(path) as entries:
+                entries = list(entries)
+            os.remove(os.path.join(path, 'note.txt'))
+            return contextlib.nullcontext(entries)
+        return mock.patch('os.scandir', scandir)
+
+    def test_scan_errors_are_reported_and_the_rest_is_saved(self):
+        self.backup()
+        write(os.path.join(self.source, 'nouveau.txt'), b"nouveau")
+        with self.racy_scandir():
+            stats = self.backup()
+        self.assertEqual(sorted(path for path, _ in stats['errors']),
+                         [os.path.join('a', 'b'), os.path.join('a', 'note.txt')])
+        self.assertEqual(stats['copied'], 1)
+        # Le contenu du dossier illisible n'est pas supprimé de la destination
+        self.assertTrue(os.path.exists(os.path.join(self.destination, 'a', 'b', 'document.txt')))
+        # Au parcours suivant, tout redevient normal
+        self.assertEqual(self.backup()['errors'], [])
+        self.assertMirror()
+
+    def test_scan_errors_give_rsync_exit_code(self):
+        log = os.path.join(self.root, 'backup.log')
+        with self.racy_scandir(), contextlib.redirect_stdout(io.StringIO()), \
+                self.assertRaises(SystemExit) as error:
+            backup.main([self.source, self.destination, '--delete', '--log', log])
+        self.assertEqual(error.exception.code, backup.EXIT_PARTIAL)
+        with open(log) as f:
+            self.assertIn("Permission denied", f.read())
+
+
+if __name__ == "__main__":
+    unittest.main()
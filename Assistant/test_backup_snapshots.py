@@ -0,0 +1,119 @@
+# Magasin d'instantanés de backup_snapshots.py : restauration, déduplication, nettoyage, propriétaires
+# et séparation d'avec le miroir.
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from backup import TMP_SUFFIX, BackupError, run_backup
+from backup_snapshots import SnapshotStore, chunk_hash, create_snapshot, prune_snapshots, restore_snapshot
+from test_backup import tree, write
+
+
+class SnapshotTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp(prefix="test-snapshots-")
+        self.source = os.path.join(self.root, 'src')
+        self.store_path = os.path.join(self.root, 'depot')
+        write(os.path.join(self.source, 'a', 'document.txt'), b"contenu" * 1000)
+        os.symlink('a/document.txt', os.path.join(self.source, 'lien'))
+        os.makedirs(os.path.join(self.source, 'vide'))
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def chunk_files(self):
+        return {name for _, _, files in os.walk(os.path.join(self.store_path, 'chunks')) for name in files}
+
+    def test_restore_matches_source(self):
+        store = SnapshotStore(self.store_path)
+        create_snapshot(store, self.source, workers=2, name='premier')
+        target = os.path.join(self.root, 'restauration')
+        restore_snapshot(store, 'premier', target, workers=2)
+        store.close()
+        self.assertEqual(tree(self.source), tree(target))
+
+    def test_unchanged_data_writes_no_new_chunks(self):
+        store = SnapshotStore(self.store_path)
+        first = create_snapshot(store, self.source, workers=2, name='premier')
+        chunks = self.chunk_files()
+        self.assertEqual(len(chunks), first['new_chunks'])
+
+        second = create_snapshot(store, self.source, workers=2, name='second')
+        self.assertEqual((second['new_chunks'], second['new_bytes'], second['read_bytes']), (0, 0, 0))
+        # Copie d'un fichier existant : relue, mais ses blocs sont déjà dans le dépôt
+        shutil.copy(os.path.join(self.source, 'a', 'document.txt'), os.path.join(self.source, 'copie.txt'))
+        third = create_snapshot(store, self.source, workers=2, name='troisieme')
+        self.assertEqual((third['new_chunks'], third['read_bytes']), (0, len(b"contenu" * 1000)))
+        self.assertEqual(self.chunk_files(), chunks)
+        store.close()
+
+    def test_prune_removes_only_unreferenced_chunks(self):
+        store = SnapshotStore(self.store_path)
+        write(os.path.join(self.source, 'modifie.txt'), b"version 1")
+        create_snapshot(store, self.source, workers=2, name='ancien')
+        write(os.path.join(self.source, 'modifie.txt'), b"version 2")
+        create_snapshot(store, self.source, workers=2, name='recent')
+        with store.connection:
+            store.connection.execute("UPDATE snapshots SET created = 0 WHERE name = 'ancien'")
+
+        removed, chunk_count, byte_count = prune_snapshots(store, keep_days=30)
+        self.assertEqual((removed, chunk_count, byte_count), (['ancien'], 1, len(b"version 1")))
+        self.assertEqual(self.chunk_files(), {chunk_hash(b"version 2"), chunk_hash(b"contenu" * 1000)})
+        self.assertEqual([snapshot[0] for snapshot in store.list_snapshots()], ['recent'])
+
+        target = os.path.join(self.root, 'restauration')
+        restore_snapshot(store, 'recent', target, workers=2, verify=True)
+        store.close()
+        self.assertEqual(tree(self.source), tree(target))
+
+    def test_manifest_keeps_owner_and_restores_it_as_root(self):
+        store = SnapshotStore(self.store_path)
+        create_snapshot(store, self.source, workers=2, name='premier')
+        info = os.lstat(os.path.join(self.source, 'a', 'document.txt'))
+        item = next(item for item in store.read_manifest('premier') if item[1] == os.path.join('a', 'document.txt'))
+        self.assertEqual(item[6:], [info.st_uid, info.st_gid])
+
+        target = os.path.join(self.root, 'restauration')
+        with mock.patch('os.geteuid', return_value=0), mock.patch('os.lchown') as lchown:
+            restore_snapshot(store, 'premier', target, workers=2)
+        store.close()
+        owners = {os.path.relpath(call.args[0], target): call.args[1:] for call in lchown.call_args_list}
+        self.assertEqual(owners[os.path.join('a', 'document.txt') + TMP_SUFFIX], (info.st_uid, info.st_gid))
+        self.assertIn('lien', owners)
+        self.assertIn('vide', owners)
+
+    def test_chunk_is_known_only_once_written(self):
+        store = SnapshotStore(self.store_path)
+        store.known = set()
+        data = b"bloc"
+        digest = chunk_hash(data)
+        with mock.patch('os.replace', side_effect=OSError(28, "No space left on device")):
+            with self.assertRaises(OSError):
+                store.put_chunk(digest, data)
+        self.assertNotIn(digest, store.known)
+        self.assertEqual(os.listdir(os.path.dirname(store.chunk_path(digest))), [])
+
+        self.assertTrue(store.put_chunk(digest, data))
+        self.assertEqual(store.read_chunk(digest, verify=True), data)
+        self.assertFalse(store.put_chunk(digest, data))
+        store.close()
+
+    def test_mirror_and_store_refuse_each_other(self):
+        store = SnapshotStore(self.store_path)
+        create_snapshot(store, self.source, workers=2, name='premier')
+        store.close()
+        # Le miroir --delete effacerait les blocs et les manifestes
+        with self.assertRaises(BackupError):
+            run_backup(self.source, self.store_path, workers=2, delete=True)
+        self.assertTrue(os.path.isdir(os.path.join(self.store_path, 'chunks')))
+
+        mirror = os.path.join(self.root, 'miroir')
+        run_backup(self.source, mirror, workers=2, delete=True)
+        with self.assertRaises(BackupError):
+            SnapshotStore(mirror)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+# Création de cartes en masse contre une colonne Trello simulée (429, cache des réponses, ordre des cartes).
+import contextlib
+import email.utils
+import io
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+import trelloIA
+from trello_sheets.bulk_cards import TokenBucket, create_cards_bulk
+from trello_sheets.http_cache import CachedSession, FileStorage, ResponseCache
+
+
+class FakeResponse:
+    def __init__(self, status_code, payload=None, headers=None):
+        self.status_code = status_code
+        self.payload = payload
+        self.headers = headers or {}
+        self.text = str(payload)
+        self.content = self.text.encode('utf-8')
+
+    def json(self):
+        return self.payload
+
+    def raise_for_status(self):
+        pass
+
+
+# Colonne Trello simulée : une carte existante, un 429 (Retry-After en date HTTP) sur la première création
+class FakeTrello:
+    def __init__(self):
+        self.cards = [{'name': 'Existante', 'pos': 65535}]
+        self.throttled = False
+        self.lock = threading.Lock()
+
+    def get(self, url, params=None, **kwargs):
+        return FakeResponse(200, [dict(card) for card in self.cards])
+
+    def post(self, url, params=None, **kwargs):
+        with self.lock:
+            throttle, self.throttled = not self.throttled, True
+        if throttle:
+            retry_at = email.utils.formatdate(time.time() + 30, usegmt=True)
+            return FakeResponse(429, headers={'Retry-After': retry_at})
+        with self.lock:
+            self.cards.append({'name': params['name'], 'pos': params['pos']})
+        return FakeResponse(200, {})
+
+
+class CountingStorage(FileStorage):
+    clears = 0
+
+    def clear(self):
+        self.clears += 1
+        super().clear()
+
+
+class RecordingBucket(TokenBucket):
+    def __init__(self):
+        super().__init__()
+        self.pauses = []
+
+    def pause(self, seconds):
+        self.pauses.append(seconds)
+
+
+class BulkCardsTest(unittest.TestCase):
+    def test_bulk_run_pauses_on_http_date_and_invalidates_cache_once(self):
+        trello = FakeTrello()
+        directory = tempfile.mkdtemp(prefix="test-bulk-")
+        self.addCleanup(shutil.rmtree, directory)
+        storage = CountingStorage(directory)
+        session = CachedSession(trello, ResponseCache(storage))
+        bucket = RecordingBucket()
+        templates = [('Existante', ''), ('Carte 1', ''), ('Carte 2', ''), ('Carte 3', '')]
+
+        created, skipped, failed = create_cards_bulk(session, 'cle', 'jeton', 'colonne', templates, bucket=bucket)
+
+        self.assertEqual((sorted(created), skipped, failed), (['Carte 1', 'Carte 2', 'Carte 3'], ['Existante'], []))
+        self.assertEqual(len(bucket.pauses), 1)
+        self.assertTrue(25 < bucket.pauses[0] <= 30)
+        self.assertEqual(storage.clears, 1)
+        # La première carte, réessayée après le 429, reste avant les autres
+        names = [card['name'] for card in sorted(trello.cards, key=lambda card: card['pos'])]
+        self.assertEqual(names, ['Existante', 'Carte 1', 'Carte 2', 'Carte 3'])
+
+    def test_concurrency_must_be_positive(self):
+        for value in ('0', '-2', 'huit'):
+            with contextlib.redirect_stderr(io.StringIO()), self.assertRaises(SystemExit) as error:
+                trelloIA.main(['--concurrence', value])
+            self.assertEqual(error.exception.code, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
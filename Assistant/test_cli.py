@@ -0,0 +1,30 @@
+# Sélection des colonnes en ligne de commande (trello_sheets.cli), sans tableau Trello.
+import unittest
+
+from trello_sheets.cli import ListSelectionError, build_parser, select_lists
+
+LISTS = {'A acheter': 'id-a', 'Composants': 'id-c', '2024': 'id-annee'}
+
+
+class SelectListsTest(unittest.TestCase):
+    def test_names_and_indexes(self):
+        self.assertEqual(select_lists(LISTS, ['Composants', '0']), {'Composants': 'id-c', 'A acheter': 'id-a'})
+        self.assertEqual(select_lists(LISTS, [], all_lists=True), LISTS)
+
+    def test_exact_name_wins_over_index(self):
+        self.assertEqual(select_lists(LISTS, ['2024']), {'2024': 'id-annee'})
+        self.assertEqual(select_lists(LISTS, ['2']), {'2024': 'id-annee'})
+
+    def test_impossible_selections_raise(self):
+        for lists, selections in [({}, ['0']), (LISTS, ['Inconnue', '0']), (LISTS, ['3']), (LISTS, [])]:
+            with self.assertRaises(ListSelectionError):
+                select_lists(lists, selections)
+
+    def test_parser(self):
+        args = build_parser("test").parse_args(['--all', '--metriques', 'mesures.prom'])
+        self.assertEqual((args.listes, args.all_lists, args.metriques), ([], True, 'mesures.prom'))
+        self.assertEqual(build_parser("test").parse_args(['0', 'Composants']).listes, ['0', 'Composants'])
+
+
+if __name__ == "__main__":
+    unittest.main()
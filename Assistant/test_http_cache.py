@@ -0,0 +1,127 @@
+# Cache des réponses Trello (trello_sheets.http_cache) avec les deux stockages : durée de validité,
+# revalidation par ETag (304), éviction LRU et droits des fichiers.
+import json
+import os
+import shutil
+import stat
+import tempfile
+import unittest
+from unittest import mock
+
+from trello_sheets.http_cache import FileStorage, ResponseCache, SQLiteStorage
+
+LISTS_URL = "https://api.trello.com/1/lists/colonne/cards"
+
+
+# Session Trello qui répond 304 quand l'ETag envoyé correspond à la version courante
+class EtagSession:
+    def __init__(self):
+        self.version = 1
+        self.calls = []
+
+    def get(self, url, params=None, headers=None, **kwargs):
+        import requests
+        self.calls.append(dict(headers or {}))
+        etag = f'"v{self.version}"'
+        response = requests.Response()
+        response.url = url
+        response.headers['ETag'] = etag
+        if (headers or {}).get('If-None-Match') == etag:
+            response.status_code = 304
+            response._content = b''
+        else:
+            response.status_code = 200
+            # Corps assez gros pour que l'enveloppe JSON du stockage fichier reste négligeable
+            response._content = json.dumps([{"url": url, "version": self.version, "desc": "x" * 10000}]).encode('utf-8')
+        return response
+
+
+# Horloge avancée à la main (time.time du cache)
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+class StorageTests:
+    def setUp(self):
+        self.root = tempfile.mkdtemp(prefix="test-cache-")
+        self.addCleanup(shutil.rmtree, self.root)
+        self.clock = Clock()
+        self.enterContext(mock.patch('time.time', self.clock))
+        self.session = EtagSession()
+
+    def cache(self, max_bytes=1 << 20):
+        return ResponseCache(self.make_storage(), ttls=[("*/lists/*/cards", 60)], default_ttl=60,
+                             max_bytes=max_bytes)
+
+    def test_ttl_then_revalidation(self):
+        cache = self.cache()
+        first = cache.get(self.session, LISTS_URL).json()
+        self.clock.now += 30
+        self.assertEqual(cache.get(self.session, LISTS_URL).json(), first)
+        self.assertEqual((cache.misses, cache.hits, len(self.session.calls)), (1, 1, 1))
+
+        # Expirée : revalidée avec l'ETag, le serveur répond 304 et le corps en cache est rendu
+        self.clock.now += 31
+        self.assertEqual(cache.get(self.session, LISTS_URL).json(), first)
+        self.assertEqual(self.session.calls[-1]['If-None-Match'], '"v1"')
+        self.assertEqual(cache.revalidated, 1)
+        # La revalidation repart pour une durée de validité complète
+        self.clock.now += 59
+        cache.get(self.session, LISTS_URL)
+        self.assertEqual(len(self.session.calls), 2)
+
+        # Modifiée côté Trello : la revalidation suivante rapporte la nouvelle version
+        self.session.version = 2
+        self.clock.now += 61
+        self.assertEqual(cache.get(self.session, LISTS_URL).json()[0]['version'], 2)
+        self.assertEqual((cache.misses, cache.revalidated), (2, 1))
+
+    def test_least_recently_used_is_evicted(self):
+        urls = [f"https://api.trello.com/1/lists/{name}/cards" for name in ('a', 'b', 'c')]
+        # Place pour deux réponses, pas pour trois
+        size = len(self.session.get(urls[0]).content)
+        cache = self.cache(max_bytes=int(2.5 * size))
+        for url in urls[:2]:
+            cache.get(self.session, url)
+            self.clock.now += 1
+        # 'a' relue : 'b' devient la moins récemment utilisée
+        cache.get(self.session, urls[0])
+        self.clock.now += 1
+        cache.get(self.session, urls[2])
+
+        storage = cache.storage
+        self.assertIsNotNone(storage.get(cache.key_for(urls[0], None)))
+        self.assertIsNone(storage.get(cache.key_for(urls[1], None)))
+        self.assertIsNotNone(storage.get(cache.key_for(urls[2], None)))
+
+    def test_files_are_private(self):
+        self.cache().get(self.session, LISTS_URL)
+        for path in self.private_files():
+            self.assertEqual(stat.S_IMODE(os.stat(path).st_mode), 0o600, path)
+
+
+class SQLiteStorageTest(StorageTests, unittest.TestCase):
+    def make_storage(self):
+        return SQLiteStorage(os.path.join(self.root, 'reponses.sqlite'))
+
+    def private_files(self):
+        return [os.path.join(self.root, 'reponses.sqlite')]
+
+
+class FileStorageTest(StorageTests, unittest.TestCase):
+    def make_storage(self):
+        return FileStorage(os.path.join(self.root, 'reponses'))
+
+    def private_files(self):
+        directory = os.path.join(self.root, 'reponses')
+        names = os.listdir(directory)
+        self.assertEqual(len(names), 1)
+        return [os.path.join(directory, name) for name in names]
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+# Export des mesures (trello_sheets.metrics) : texte Prometheus exact (étiquettes échappées, seaux
+# cumulés, _sum et _count) et lignes JSON.
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from trello_sheets import metrics
+
+
+class MetricsTest(unittest.TestCase):
+    def setUp(self):
+        metrics.reset()
+        self.addCleanup(metrics.reset)
+
+    def record(self):
+        metrics.inc('api_requests_total', api='trello', status=200)
+        metrics.inc('api_requests_total', 2, api='trello', status=200)
+        metrics.inc('api_requests_total', api='google', status=429)
+        metrics.inc('sheet_metadata_fetch_total')
+        # Une borne appartient à son seau (le = inférieur ou égal), au-delà de 30 s : +Inf
+        for value in (0.005, 0.2, 0.25, 45.0):
+            metrics.observe('api_request_seconds', value, api='trello')
+
+    def test_prometheus_text(self):
+        self.record()
+        self.assertEqual(metrics.export_prometheus(), "\n".join([
+            '# TYPE automatisation_api_requests_total counter',
+            'automatisation_api_requests_total{api="google",status="429"} 1',
+            'automatisation_api_requests_total{api="trello",status="200"} 3',
+            '# TYPE automatisation_sheet_metadata_fetch_total counter',
+            'automatisation_sheet_metadata_fetch_total 1',
+            '# TYPE automatisation_api_request_seconds histogram',
+            'automatisation_api_request_seconds_bucket{api="trello",le="0.005"} 1',
+            'automatisation_api_request_seconds_bucket{api="trello",le="0.01"} 1',
+            'automatisation_api_request_seconds_bucket{api="trello",le="0.025"} 1',
+            'automatisation_api_request_seconds_bucket{api="trello",le="0.05"} 1',
+            'automatisation_api_request_seconds_bucket{api="trello",le="0.1"} 1',
+            'automatisation_api_request_seconds_bucket{api="trello",le="0.25"} 3',
+            'automatisation_api_request_seconds_bucket{api="trello",le="0.5"} 3',
+            'automatisation_api_request_seconds_bucket{api="trello",le="1.0"} 3',
+            'automatisation_api_request_seconds_bucket{api="trello",le="2.5"} 3',
+            'automatisation_api_request_seconds_bucket{api="trello",le="5.0"} 3',
+            'automatisation_api_request_seconds_bucket{api="trello",le="10.0"} 3',
+            'automatisation_api_request_seconds_bucket{api="trello",le="30.0"} 3',
+            'automatisation_api_request_seconds_bucket{api="trello",le="+Inf"} 4',
+            'automatisation_api_request_seconds_sum{api="trello"} 45.455000',
+            'automatisation_api_request_seconds_count{api="trello"} 4',
+        ]) + "\n")
+
+    def test_label_values_are_escaped(self):
+        metrics.inc('sheet_errors_total', sheet='Colonne "A"\\B\nsuite')
+        self.assertEqual(metrics.export_prometheus().splitlines()[-1],
+                         'automatisation_sheet_errors_total{sheet="Colonne \\"A\\"\\\\B\\nsuite"} 1')
+
+    def test_json_lines(self):
+        self.record()
+        with mock.patch('time.time', return_value=1700000000.0):
+            lines = [json.loads(line) for line in metrics.export_json_lines().splitlines()]
+        common = {'ts': 1700000000.0, 'run': metrics.RUN_ID}
+        self.assertEqual(lines[:3], [
+            dict(common, metric='api_requests_total', type='counter', labels={'api': 'google', 'status': '429'},
+                 value=1),
+            dict(common, metric='api_requests_total', type='counter', labels={'api': 'trello', 'status': '200'},
+                 value=3),
+            dict(common, metric='sheet_metadata_fetch_total', type='counter', labels={}, value=1),
+        ])
+        # Contrairement au texte Prometheus, les seaux JSON ne sont pas cumulés
+        buckets = dict.fromkeys([str(bound) for bound in metrics.LATENCY_BUCKETS] + ['+Inf'], 0)
+        buckets.update({'0.005': 1, '0.25': 2, '+Inf': 1})
+        self.assertEqual(lines[3], dict(common, metric='api_request_seconds', type='histogram',
+                                        labels={'api': 'trello'}, count=4, sum=45.455, buckets=buckets))
+        self.assertEqual(len(lines), 4)
+
+    def test_write_metrics(self):
+        root = tempfile.mkdtemp(prefix="test-metrics-")
+        self.addCleanup(shutil.rmtree, root)
+        metrics.inc('sheet_metadata_fetch_total')
+
+        # .prom : remplacé à chaque écriture ; autre extension : lignes ajoutées
+        prom, jsonl = os.path.join(root, 'mesures.prom'), os.path.join(root, 'mesures.jsonl')
+        for _ in range(2):
+            metrics.write_metrics(prom)
+            metrics.write_metrics(jsonl)
+        with open(prom) as f:
+            self.assertEqual(f.read(), metrics.export_prometheus())
+        with open(jsonl) as f:
+            self.assertEqual(len(f.read().splitlines()), 2)
+        self.assertEqual(sorted(os.listdir(root)), ['mesures.jsonl', 'mesures.prom'])
+
+        with mock.patch.dict(os.environ, AUTOMATISATION_METRICS=prom):
+            os.remove(prom)
+            metrics.write_metrics()
+        self.assertTrue(os.path.exists(prom))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+# Historique des prix dans une base SQLite temporaire.
+import os
+import shutil
+import tempfile
+import unittest
+
+from trello_sheets.price_history import PriceHistory
+from trello_sheets.prix import PriceInfo
+
+
+def info(low, high):
+    return PriceInfo(low, high, 'EUR', 1.0)
+
+
+class PriceHistoryTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp(prefix="test-prix-")
+        self.path = os.path.join(self.root, 'price_history.sqlite')
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_same_list_name_in_two_spreadsheets(self):
+        history = PriceHistory(self.path)
+        # La carte c1 est dans les deux classeurs (trelloserveur et un autre tableau du lanceur de tâches)
+        history.append([('c1', 'RAM', 'A acheter', info(40, 50))], spreadsheet='classeur-1', ts=100)
+        history.append([('c1', 'RAM', 'A acheter', info(10, 20)), ('c2', 'SSD', 'A acheter', info(0, 80))],
+                       spreadsheet='classeur-2', ts=200)
+        history.append([('c1', 'RAM', 'A acheter', info(40, 70))], spreadsheet='classeur-1', ts=300)
+
+        totals = {(row['spreadsheet'], row['list']): (row['cards'], row['total_max'])
+                  for row in history.list_totals(until=1000)}
+        self.assertEqual(totals, {('classeur-1', 'A acheter'): (1, 70), ('classeur-2', 'A acheter'): (2, 100)})
+        self.assertEqual([row['spreadsheet'] for row in history.list_totals(until=1000, spreadsheet='classeur-2')],
+                         ['classeur-2'])
+
+        trend = history.trend('A acheter', until=1000, spreadsheet='classeur-1')
+        self.assertEqual([row['total_max'] for row in trend], [70])
+        self.assertEqual({row['spreadsheet'] for row in history.trend('A acheter', until=1000)},
+                         {'classeur-1', 'classeur-2'})
+
+        # Sans classeur, c1 n'est pas comparée d'un classeur à l'autre (50 -> 20)
+        movers = history.top_movers(0, until=1000)
+        self.assertEqual([(row['spreadsheet'], row['before'], row['after']) for row in movers],
+                         [('classeur-1', 50, 70)])
+        history.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+# Formats de prix reconnus par trello_sheets.prix.
+import unittest
+
+from trello_sheets.prix import parse_price, parse_prices
+
+
+class ParsePriceTest(unittest.TestCase):
+    def assertPrice(self, desc, low, high, confidence):
+        info = parse_price(desc)
+        self.assertEqual((info.min, info.max, info.confidence), (low, high, confidence), desc)
+
+    def test_formats(self):
+        self.assertPrice("Prix moyen : 300€ - 600€.", 300, 600, 1.0)
+        self.assertPrice("Prix moyen : 1 200 € - 1 500 €", 1200, 1500, 1.0)
+        self.assertPrice("Prix : 300 à 600 €", 300, 600, 1.0)
+        self.assertPrice("prix : 233 euro", 233, 233, 0.9)
+        self.assertPrice("Prix : 19,99€", 19.99, 19.99, 0.9)
+        self.assertPrice("Écran 1,500.00$", 1500, 1500, 0.6)
+        self.assertPrice("Prix à définir", 0, 0, 0.0)
+
+    def test_bare_number_does_not_start_a_range(self):
+        self.assertPrice("RAM 32 Go, 2024 - 150€", 150, 150, 0.6)
+        self.assertPrice("Fréquence : 3200 MHz ou plus - 89 €", 89, 89, 0.6)
+
+    def test_thousands_suffix(self):
+        self.assertPrice("1.5k€", 1500, 1500, 0.6)
+        self.assertPrice("Prix : 2k - 3,5k€", 2000, 3500, 1.0)
+        self.assertPrice("Prix : 12kg", 12, 12, 0.9)
+
+    def test_space_before_three_digits_groups_thousands(self):
+        # Règle documentée dans prix.py : "2 150" est 2150, une quantité s'écrit "2 x 150"
+        self.assertPrice("Pack 2 150 €", 2150, 2150, 0.6)
+        self.assertPrice("Pack 2 x 150 €", 150, 150, 0.6)
+        self.assertPrice("Pack 2 × 150 €", 150, 150, 0.6)
+
+    def test_parse_prices_matches_parse_price(self):
+        descriptions = ["Prix : 10€", None, "Prix : 10€", "RAM 2024 - 150€", ""]
+        self.assertEqual(parse_prices(descriptions), [parse_price(desc) for desc in descriptions])
+
+
+if __name__ == "__main__":
+    unittest.main()
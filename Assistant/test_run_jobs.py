@@ -0,0 +1,72 @@
+# Lanceur de tâches (run_jobs.py) sur le tableau et le classeur simulés : statuts, code de sortie, fichier invalide.
+import contextlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import run_jobs
+from bench_sync import BOARD_ID, SPREADSHEET_URL, simulation
+from trello_sheets import clients
+
+
+class RunJobsTest(unittest.TestCase):
+    def setUp(self):
+        self.trello, self.spreadsheet = self.enterContext(simulation(20))
+        self.enterContext(mock.patch.object(clients, 'get_credentials'))
+        self.root = tempfile.mkdtemp(prefix="test-taches-")
+        self.addCleanup(shutil.rmtree, self.root)
+
+    def write_config(self, name, content):
+        path = os.path.join(self.root, name)
+        with open(path, 'w') as f:
+            f.write(content)
+        return path
+
+    def run_main(self, *jobs):
+        path = self.write_config('taches.json', json.dumps(
+            [dict({'board': BOARD_ID, 'spreadsheet': SPREADSHEET_URL}, **job) for job in jobs]))
+        report = os.path.join(self.root, 'rapport.json')
+        with contextlib.redirect_stdout(io.StringIO()):
+            try:
+                run_jobs.main([path, '--rapport', report])
+                code = 0
+            except SystemExit as e:
+                code = e.code
+        with open(report) as f:
+            return code, [job['status'] for job in json.load(f)]
+
+    def test_exit_code_follows_job_statuses(self):
+        self.assertEqual(self.run_main({'lists': ['Colonne 0']}), (0, ['ok']))
+        # Feuille modèle absente : aucune feuille écrite, tâche partielle
+        self.assertEqual(self.run_main({'lists': ['Colonne 1']}, {'lists': ['Colonne 2'], 'template': 'absent'}),
+                         (1, ['ok', 'partiel']))
+        self.assertEqual(self.run_main({'lists': ['Inconnue']}), (1, ['erreur']))
+
+    def test_env_file_is_loaded_before_clients(self):
+        # Le .env est la seule source de GOOGLE_CREDENTIALS_PATH
+        from trello_sheets.settings import get_settings
+        get_settings.cache_clear()
+        self.enterContext(mock.patch.dict(os.environ))
+        os.environ.pop('GOOGLE_CREDENTIALS_PATH', None)
+        load_dotenv = mock.Mock(side_effect=lambda: os.environ.update(GOOGLE_CREDENTIALS_PATH='compte.json'))
+        with mock.patch('dotenv.load_dotenv', load_dotenv):
+            clients.get_credentials.side_effect = lambda: self.assertEqual(
+                os.getenv('GOOGLE_CREDENTIALS_PATH'), 'compte.json')
+            run_jobs.warm_up_clients()
+        clients.get_credentials.assert_called_once()
+
+    def test_invalid_yaml_is_a_config_error(self):
+        path = self.write_config('taches.yaml', "jobs:\n  - board: [tableau\n")
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output), self.assertRaises(SystemExit) as error:
+            run_jobs.main([path])
+        self.assertEqual(error.exception.code, 2)
+        self.assertIn("YAML invalide", output.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+# Écriture groupée des feuilles (trello_sheets.sheet_writer) contre le classeur simulé de fake_services.py.
+import unittest
+
+from fake_services import FakeSpreadsheet, FakeWorksheet
+from trello_sheets.sheet_format import clear_rows_request, extend_borders, number_format_request
+from trello_sheets.sheet_writer import SheetWriter
+
+
+class SheetWriterTest(unittest.TestCase):
+    def setUp(self):
+        self.spreadsheet = FakeSpreadsheet()
+        self.spreadsheet.sheets["Colonne 'A'"] = FakeWorksheet(1, "Colonne 'A'")
+        self.bodies = []
+        call = self.spreadsheet.call
+        self.spreadsheet.call = lambda body, handler: self.bodies.append(body) or call(body, handler)
+
+    def rows(self, count):
+        return [[f"Carte {i}", f'=HYPERLINK("https://trello.com/c/{i}";"lien")'] for i in range(count)]
+
+    def test_whole_column_is_one_values_call_and_one_format_call(self):
+        writer = SheetWriter(self.spreadsheet, self.spreadsheet.id)
+        writer.set_values("Colonne 'A'", "B5", [["Nom", "Lien"]])
+        writer.set_values("Colonne 'A'", "B6", self.rows(500))
+        # Anciennes lignes sous le tableau effacées après l'écriture
+        writer.add_request(clear_rows_request(1, 506))
+        writer.flush()
+
+        self.assertEqual(writer.api_calls, 2)
+        values, formats = self.bodies
+        self.assertEqual(values['valueInputOption'], 'USER_ENTERED')
+        self.assertEqual([value_range['range'] for value_range in values['data']],
+                         ["'Colonne ''A'''!B5", "'Colonne ''A'''!B6"])
+        self.assertEqual(len(formats['requests']), 1)
+        rows = self.spreadsheet.sheets["Colonne 'A'"].rows
+        self.assertEqual((len(rows), rows[4][1], rows[504][1]), (505, "Nom", "Carte 499"))
+
+    def test_borders_are_one_request_whatever_the_row_count(self):
+        for end_row in (6, 5000):
+            writer = SheetWriter(self.spreadsheet, self.spreadsheet.id)
+            extend_borders(writer, 1, 5, end_row, 1, 5, [number_format_request(1, 6, end_row, 3, 5)])
+            borders, price_format = writer.requests
+            self.assertEqual(borders['updateBorders']['range'], {
+                'sheetId': 1, 'startRowIndex': 4, 'endRowIndex': end_row, 'startColumnIndex': 1, 'endColumnIndex': 5
+            })
+            self.assertEqual(set(borders['updateBorders']),
+                             {'range', 'top', 'bottom', 'left', 'right', 'innerHorizontal', 'innerVertical'})
+            self.assertIn('repeatCell', price_format)
+            writer.flush()
+        self.assertEqual(len(self.bodies), 2)
+
+    def test_values_are_sent_in_bounded_chunks(self):
+        writer = SheetWriter(self.spreadsheet, self.spreadsheet.id, chunk_rows=100, chunk_chars=10_000)
+        writer.set_values("Colonne 'A'", "B6", self.rows(250))
+        # Deux morceaux pleins partis pendant l'ajout, le reste au flush
+        self.assertEqual(len(self.bodies), 2)
+        writer.flush()
+        self.assertEqual([[value_range['range'] for value_range in body['data']] for body in self.bodies],
+                         [["'Colonne ''A'''!B6"], ["'Colonne ''A'''!B106"], ["'Colonne ''A'''!B206"]])
+        self.assertEqual([len(body['data'][0]['values']) for body in self.bodies], [100, 100, 50])
+
+        # Seuil de caractères : de longues descriptions coupent les morceaux plus tôt
+        self.bodies.clear()
+        writer.set_values("Colonne 'A'", "B6", [["x" * 4000]] * 5)
+        writer.flush()
+        self.assertEqual([len(body['data'][0]['values']) for body in self.bodies], [3, 2])
+        rows = self.spreadsheet.sheets["Colonne 'A'"].rows
+        self.assertEqual([row[1] for row in rows[5:11]], ["x" * 4000] * 5 + ["Carte 5"])
+
+
+if __name__ == "__main__":
+    unittest.main()
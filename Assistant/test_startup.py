@@ -0,0 +1,30 @@
+# Démarrage des scripts Trello : aucun client (gspread, googleapiclient, requests) n'est importé
+# ni connecté au chargement, seulement à la première utilisation.
+import subprocess
+import sys
+import unittest
+from unittest import mock
+
+from trello_sheets import clients
+
+HEAVY_MODULES = ('gspread', 'googleapiclient', 'google', 'requests', 'httplib2')
+
+
+class StartupTest(unittest.TestCase):
+    def test_scripts_import_no_client_library(self):
+        # Nouvel interpréteur : les autres tests ont déjà importé ces bibliothèques
+        code = ("import sys, trelloserveur, ScrapPrixTrelloGoogleSheet, trelloIA; "
+                "print(' '.join(sorted({name.split('.')[0] for name in sys.modules})))")
+        loaded = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+        self.assertEqual(set(loaded.split()) & set(HEAVY_MODULES), set())
+
+    def test_clients_are_created_once(self):
+        clients.get_trello_session.cache_clear()
+        self.addCleanup(clients.get_trello_session.cache_clear)
+        with mock.patch.dict('os.environ', TRELLO_CACHE='off'):  # pas de fichier de cache écrit
+            session = clients.get_trello_session()
+            self.assertIs(clients.get_trello_session(), session)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+# Synchronisation complète et incrémentale contre le tableau et le classeur simulés de fake_services.py.
+import argparse
+import contextlib
+import importlib
+import io
+import unittest
+from unittest import mock
+
+import fake_services
+from bench_sync import BOARD_ID, SPREADSHEET_URL, install_fakes, simulated_environment
+
+
+class SyncTest(unittest.TestCase):
+    def setUp(self):
+        self.enterContext(simulated_environment())
+        self.lists, list_ids = fake_services.make_board(20, 2)
+        self.trello = fake_services.FakeTrelloSession(BOARD_ID, self.lists, list_ids)
+        self.spreadsheet = fake_services.FakeSpreadsheet()
+        self.enterContext(install_fakes(self.trello, self.spreadsheet))
+
+    def sync(self, script, incremental):
+        from trello_sheets.sync import process_and_update_sheet
+        profile = importlib.import_module(script).PROFILE._replace(spreadsheet_url=SPREADSHEET_URL)
+        args = argparse.Namespace(listes=[], all_lists=True, incremental=incremental)
+        with contextlib.redirect_stdout(io.StringIO()):
+            process_and_update_sheet(profile, args)
+        return profile
+
+    def headers(self, name):
+        return self.spreadsheet.sheets[name].rows[4][1:5]
+
+    def test_rows_follow_trello_list_order(self):
+        self.sync('trelloserveur', incremental=False)
+        for name, cards in self.lists.items():
+            rows = self.spreadsheet.sheets[name].rows[5:5 + len(cards)]
+            expected = [card['name'] for card in sorted(cards, key=lambda card: card['pos'])]
+            self.assertEqual([row[1] for row in rows], expected)
+
+    def run_script(self, *argv):
+        from trello_sheets.sync import run
+        import trelloserveur
+        profile = trelloserveur.PROFILE._replace(spreadsheet_url=SPREADSHEET_URL)
+        with contextlib.redirect_stdout(io.StringIO()):
+            try:
+                run(profile, list(argv))
+            except SystemExit as e:
+                return e.code
+        return 0
+
+    def test_exit_codes(self):
+        self.assertEqual(self.run_script('--all'), 0)
+        self.assertEqual(self.run_script('Colonne 0', 'Inconnue'), 2)
+        self.assertEqual(self.run_script('7'), 2)
+        # Tableau illisible (get_existing_lists renvoie {})
+        self.trello.board_id = 'autre-tableau'
+        self.assertEqual(self.run_script('--all'), 2)
+
+    def test_failed_sheet_exit_code(self):
+        # Feuille modèle absente : la colonne ne peut pas être écrite
+        del self.spreadsheet.sheets['modele']
+        self.assertEqual(self.run_script('Colonne 1'), 1)
+
+    def test_incremental_after_other_profile_rewrites_headers(self):
+        # Les deux profils écrivent dans le même classeur
+        self.sync('trelloserveur', incremental=True)
+        profile = self.sync('ScrapPrixTrelloGoogleSheet', incremental=True)
+        for name in self.lists:
+            self.assertEqual(self.headers(name), profile.headers)
+
+        # Même profil : l'exécution incrémentale n'envoie que la ligne de total
+        before = self.spreadsheet.stats.as_dict()['requests']
+        self.sync('ScrapPrixTrelloGoogleSheet', incremental=True)
+        self.assertLessEqual(self.spreadsheet.stats.as_dict()['requests'] - before, 3)
+
+    def test_sheet_metadata_is_read_once(self):
+        # Lues à l'ouverture du classeur, les métadonnées servent pour toutes les colonnes
+        # (seules les lectures de métadonnées sont des appels sans corps)
+        with mock.patch.object(self.spreadsheet, 'call', wraps=self.spreadsheet.call) as call:
+            self.sync('trelloserveur', incremental=False)
+        self.assertEqual([c.args[0] for c in call.call_args_list].count(None), 1)
+
+
+# Ouverture d'un vrai classeur gspread sur un client HTTP simulé
+class OpenSpreadsheetTest(unittest.TestCase):
+    def test_opening_metadata_is_reused(self):
+        from trello_sheets import clients
+        from trello_sheets.sheet_metadata import clear_metadata, get_metadata
+        http_client = mock.Mock()
+        http_client.fetch_sheet_metadata.return_value = {
+            'properties': {'title': "Classeur"},
+            'sheets': [{'properties': {'sheetId': 0, 'title': 'modele'}}]
+        }
+        self.enterContext(mock.patch.object(clients, 'get_gspread_client',
+                                            return_value=mock.Mock(http_client=http_client)))
+        clients.get_spreadsheet.cache_clear()
+        self.addCleanup(clients.get_spreadsheet.cache_clear)
+        clear_metadata()
+        self.addCleanup(clear_metadata)
+
+        spreadsheet = clients.get_spreadsheet(SPREADSHEET_URL)
+        self.assertEqual((spreadsheet.id, spreadsheet.title), ('classeur-simule', "Classeur"))
+        metadata = get_metadata(spreadsheet)
+        self.assertEqual(metadata.get_sheet('modele').id, 0)
+        self.assertEqual((http_client.fetch_sheet_metadata.call_count, metadata.metadata_calls), (1, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
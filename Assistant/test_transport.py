@@ -0,0 +1,90 @@
+# Nouvelles tentatives, délais et disjoncteurs de trello_sheets.transport, sans réseau.
+import unittest
+from unittest import mock
+
+from trello_sheets import transport
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.content = b''
+
+
+# Session qui rend les réponses prévues, dans l'ordre, et garde les appels reçus
+class ScriptedSession:
+    def __init__(self, *statuses):
+        self.statuses = list(statuses)
+        self.calls = []
+
+    def request(self, method, url, **kwargs):
+        self.calls.append((method, kwargs))
+        return FakeResponse(self.statuses.pop(0))
+
+
+# Erreur googleapiclient minimale (HttpError : resp.status, resp.get, content)
+class FakeHttpError(Exception):
+    def __init__(self, status, content=b''):
+        super().__init__(status)
+        self.resp = mock.Mock(status=status)
+        self.resp.get = lambda name: None
+        self.content = content
+
+
+class RetryingSessionTest(unittest.TestCase):
+    def setUp(self):
+        transport._breakers.clear()
+        sleep = mock.patch('time.sleep')
+        sleep.start()
+        self.addCleanup(sleep.stop)
+
+    def test_get_is_retried(self):
+        session = ScriptedSession(503, 200)
+        response = transport.RetryingSession(session).get('https://api.trello.com/1/lists')
+        self.assertEqual((response.status_code, len(session.calls)), (200, 2))
+
+    def test_post_is_sent_once_and_429_reaches_the_caller(self):
+        for status in (429, 503):
+            session = ScriptedSession(status, 200)
+            response = transport.RetryingSession(session).post('https://api.trello.com/1/cards')
+            self.assertEqual((response.status_code, len(session.calls)), (status, 1))
+
+    def test_default_timeout(self):
+        session = ScriptedSession(200, 200)
+        retrying = transport.RetryingSession(session)
+        retrying.get('https://api.trello.com/1/lists')
+        retrying.get('https://api.trello.com/1/lists', timeout=5)
+        self.assertEqual([kwargs['timeout'] for _, kwargs in session.calls], [transport.DEFAULT_TIMEOUT, 5])
+
+
+class StructureRetryTest(unittest.TestCase):
+    def test_structure_batch_only_retried_on_quota(self):
+        classify = transport.classify_google_quota
+        self.assertTrue(classify(error=FakeHttpError(429))[0])
+        self.assertTrue(classify(error=FakeHttpError(403, b'rateLimitExceeded'))[0])
+        self.assertFalse(classify(error=FakeHttpError(503))[0])
+        self.assertFalse(classify(error=TimeoutError())[0])
+        self.assertTrue(transport.classify_google(error=FakeHttpError(503))[0])
+
+
+class GoogleNetworkErrorTest(unittest.TestCase):
+    def setUp(self):
+        transport._breakers.clear()
+
+    def test_network_errors_are_retried(self):
+        import requests
+        for error in (ConnectionResetError(), TimeoutError(), requests.ConnectionError(), requests.ReadTimeout()):
+            self.assertEqual(transport.classify_google(error=error), (True, None))
+        self.assertEqual(transport.classify_google(error=ValueError()), (False, None))
+
+    def test_gspread_call_is_retried_after_a_timeout(self):
+        import requests
+        function = mock.Mock(side_effect=[requests.ReadTimeout(), {'sheets': []}])
+        with mock.patch('time.sleep'):
+            self.assertEqual(transport.call_google(function), {'sheets': []})
+        self.assertEqual(function.call_count, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
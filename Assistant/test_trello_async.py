@@ -0,0 +1,50 @@
+# Lecture des cartes par colonnes (trello_sheets.trello_async) contre le tableau simulé : parallélisme,
+# pages limit/before et ordre des cartes.
+import unittest
+
+import fake_services
+from trello_sheets.trello_async import fetch_lists_cards, iter_list_cards
+
+
+class TrelloAsyncTest(unittest.TestCase):
+    def setUp(self):
+        self.lists, self.list_ids = fake_services.make_board(50, 2)
+        self.session = fake_services.FakeTrelloSession('tableau', self.lists, self.list_ids)
+
+    def pages(self, name, page_size, first_page=None):
+        return list(iter_list_cards(self.session, 'cle', 'jeton', self.list_ids[name], page_size, first_page))
+
+    def test_first_pages_of_all_lists(self):
+        first_pages = fetch_lists_cards('cle', 'jeton', self.list_ids, session=self.session, page_size=10)
+        self.assertEqual(list(first_pages), list(self.lists))
+        for name, page in first_pages.items():
+            # Sans ordre de colonne avec limit : les cartes créées en dernier
+            newest = sorted(self.lists[name], key=lambda card: card['id'], reverse=True)[:10]
+            self.assertEqual(page, newest)
+        self.assertEqual(self.session.stats.requests, 2)
+
+    def test_pages_cover_the_list_in_column_order(self):
+        cards = self.lists['Colonne 0']
+        pages = self.pages('Colonne 0', 10)
+        self.assertEqual([len(page) for page in pages], [10, 10, 5])
+        # Une requête par page ; la dernière, incomplète, n'en demande pas d'autre
+        self.assertEqual(self.session.stats.requests, 3)
+        self.assertEqual(sorted(card['id'] for page in pages for card in page), sorted(card['id'] for card in cards))
+        for page in pages:
+            self.assertEqual(page, sorted(page, key=lambda card: card['pos']))
+        # Pages des cartes les plus récentes aux plus anciennes
+        self.assertGreater(min(card['id'] for card in pages[0]), max(card['id'] for card in pages[1]))
+
+    def test_single_page_keeps_trello_order(self):
+        pages = self.pages('Colonne 1', 1000)
+        self.assertEqual(pages, [sorted(self.lists['Colonne 1'], key=lambda card: card['pos'])])
+
+    def test_first_page_is_not_fetched_again(self):
+        first_pages = fetch_lists_cards('cle', 'jeton', self.list_ids, session=self.session, page_size=20)
+        pages = self.pages('Colonne 0', 20, first_pages['Colonne 0'])
+        self.assertEqual([len(page) for page in pages], [20, 5])
+        self.assertEqual(self.session.stats.requests, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+# Serveur de webhooks avec les services simulés : les appels sont envoyés par webhook_sender.py,
+# comme lors d'un essai manuel, sans Trello ni Google.
+import contextlib
+import io
+import threading
+import unittest
+import urllib.error
+import urllib.request
+
+import webhook_sender
+from bench_sync import SPREADSHEET_URL, simulation
+from trello_sheets import clients
+from webhook_server import WebhookServer
+
+
+class WebhookServerTest(unittest.TestCase):
+    def setUp(self):
+        trello, self.spreadsheet = self.enterContext(simulation(30))
+        self.session = clients.get_trello_session()
+        self.board_lists = {list_id: name for name, list_id in trello.list_ids.items()}
+
+    def start(self, **kwargs):
+        import trelloserveur
+        profile = trelloserveur.PROFILE._replace(spreadsheet_url=SPREADSHEET_URL)
+        server = WebhookServer(('127.0.0.1', 0), profile, self.session, self.board_lists, None, SPREADSHEET_URL,
+                               debounce=0.2, max_delay=5, **kwargs)
+        thread = threading.Thread(target=server.serve)
+        with contextlib.redirect_stdout(io.StringIO()):
+            thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(server.shutdown)
+        return server, f"http://127.0.0.1:{server.server_address[1]}/"
+
+    def test_burst_is_written_in_one_batch(self):
+        server, url = self.start()
+        list_id, name = next(iter(self.board_lists.items()))
+        payload = webhook_sender.build_action('carte', list_id, name)
+        with contextlib.redirect_stdout(io.StringIO()):
+            for _ in range(5):
+                self.assertEqual(webhook_sender.send_action(url, payload), {'queued': [name]})
+            server.shutdown()  # le lot en attente est envoyé à l'arrêt
+            server.batcher.thread.join()
+
+        self.assertEqual((server.batcher.events, server.batcher.batches), (5, 1))
+        self.assertEqual(server.batcher.last_report['status'], 'ok')
+        self.assertEqual(list(self.spreadsheet.sheets), ['modele', name])
+
+    def test_signature_is_checked(self):
+        server, url = self.start(secret='secret', callback_url='https://exemple.org/trello')
+        list_id, name = next(iter(self.board_lists.items()))
+        payload = webhook_sender.build_action('carte', list_id, name)
+        with self.assertRaises(urllib.error.HTTPError) as error:
+            webhook_sender.send_action(url, payload)
+        self.assertEqual(error.exception.code, 401)
+        self.assertEqual(webhook_sender.send_action(url, payload, 'secret', 'https://exemple.org/trello'),
+                         {'queued': [name]})
+
+    def test_secret_and_callback_url_go_together(self):
+        with self.assertRaises(ValueError):
+            self.start(secret='secret')
+        with self.assertRaises(ValueError):
+            self.start(callback_url='https://exemple.org/trello')
+
+    def test_json_that_is_not_an_object_is_rejected(self):
+        server, url = self.start()
+        for body in (b'[]', b'"action"', b'{"action": "carte"}', b'{'):
+            request = urllib.request.Request(url, data=body, method='POST')
+            with self.assertRaises(urllib.error.HTTPError) as error:
+                urllib.request.urlopen(request)
+            self.assertEqual(error.exception.code, 400)
+        self.assertEqual(server.batcher.events, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,16 +1,13 @@
-import os
-import requests
-import gspread
-from google.oauth2.service_account import Credentials
-from dotenv import load_dotenv
+# Profil « création de cartes » : une carte par composant matériel dans les colonnes choisies.
+import sys
 
-# Charger les variables d'environnement depuis le fichier .env
-load_dotenv()
-
-# Récupération des informations depuis le fichier .env
-api_key = os.getenv('TRELLO_API_KEY')
-api_token = os.getenv('TRELLO_API_TOKEN')
-board_id = os.getenv('BOARD_ID')
+from trello_sheets import metrics
+from trello_sheets.boards import get_existing_lists
+from trello_sheets.bulk_cards import TokenBucket, create_cards_bulk, load_templates, DEFAULT_CONCURRENCY
+from trello_sheets.cli import (EXIT_FAILED, EXIT_SELECTION_ERROR, ListSelectionError, build_parser, positive_int,
+                               resolve_lists)
+from trello_sheets.clients import get_trello_session
+from trello_sheets.settings import get_settings
 
 # Liste des composants matériels pour un ordinateur de développement IA
 hardware_components = {
@@ -47,55 +44,45 @@ hardware_components = {
                   "Prix moyen : 150€ - 300€."
 }
 
-# Fonction pour obtenir les colonnes existantes sur le tableau Trello
-def get_existing_lists(board_id):
-    url = f"https://api.trello.com/1/boards/{board_id}/lists"
-    query = {
-        'key': api_key,
-        'token': api_token
-    }
-    response = requests.get(url, params=query)
-    if response.status_code == 200:
-        return {lst['name']: lst['id'] for lst in response.json()}
-    else:
-        print(f"Erreur lors de la récupération des listes: {response.text}")
-        return {}
-
-# Fonction pour créer une carte dans une colonne (liste)
-def create_card(list_id, card_name, card_desc):
-    url = "https://api.trello.com/1/cards"
-    query = {
-        'key': api_key,
-        'token': api_token,
-        'idList': list_id,
-        'name': card_name,
-        'desc': card_desc,
-        'pos': 'bottom'
-    }
-    response = requests.post(url, params=query)
-    if response.status_code == 200:
-        print(f"Carte '{card_name}' créée avec succès dans la liste ID {list_id}.")
-    else:
-        print(f"Erreur lors de la création de la carte '{card_name}': {response.text}")
-
 # Fonction principale pour créer les cartes à partir de la liste de composants
-def create_cards_from_hardware_list():
-    existing_lists = get_existing_lists(board_id)
-    print("Colonnes disponibles :")
-    for idx, name in enumerate(existing_lists.keys()):
-        print(f"{idx}: {name}")
-
-    column_index = input("Dans quelle colonne voulez-vous ajouter les cartes (entrez l'index)? ").strip()
+# (ou des modèles lus dans un fichier JSON/CSV) ; retourne le nombre de cartes en échec
+def create_cards_from_hardware_list(args):
+    templates = load_templates(args.fichier) if args.fichier else list(hardware_components.items())
+
+    settings = get_settings()
+    existing_lists = get_existing_lists()
+    selected_lists = resolve_lists(existing_lists, args,
+                                   "Dans quelle colonne voulez-vous ajouter les cartes (entrez l'index)? ")
+
+    # Créer en parallèle les cartes manquantes dans chaque colonne choisie
+    bucket = TokenBucket()
+    failures = 0
+    for column_name, list_id in selected_lists.items():
+        created, skipped, failed = create_cards_bulk(get_trello_session(), settings.api_key, settings.api_token,
+                                                     list_id, templates, concurrency=args.concurrence, bucket=bucket)
+        print(f"Colonne '{column_name}' : {len(created)} carte(s) créée(s), "
+              f"{len(skipped)} déjà présente(s), {len(failed)} erreur(s).")
+        for card_name, error in failed:
+            print(f"Erreur lors de la création de la carte '{card_name}': {error}")
+        failures += len(failed)
+    return failures
+
+def main(argv=None):
+    parser = build_parser("Crée une carte Trello par composant matériel dans les colonnes choisies.")
+    parser.add_argument('--fichier', help="Fichier JSON ou CSV de modèles de cartes (nom, description)")
+    parser.add_argument('--concurrence', type=positive_int, default=DEFAULT_CONCURRENCY,
+                        help="Nombre de cartes créées en parallèle")
+    args = parser.parse_args(argv)
     try:
-        column_index = int(column_index)
-        column_name = list(existing_lists.keys())[column_index]
-        list_id = existing_lists[column_name]
-
-        # Créer une carte pour chaque composant matériel
-        for component_name, component_desc in hardware_components.items():
-            create_card(list_id, component_name, component_desc)
-    except (ValueError, IndexError):
-        print("Index invalide. Veuillez entrer un nombre correspondant à une colonne existante.")
+        failures = create_cards_from_hardware_list(args)
+    except ListSelectionError as e:
+        print(f"Erreur : {e}")
+        sys.exit(EXIT_SELECTION_ERROR)
+    finally:
+        metrics.write_metrics(args.metriques)
+    if failures:
+        sys.exit(EXIT_FAILED)
 
 # Appel de la fonction pour créer les cartes
-create_cards_from_hardware_list()
+if __name__ == "__main__":
+    main()
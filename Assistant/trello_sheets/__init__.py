@@ -0,0 +1,5 @@
+# Bibliothèque commune des scripts Trello : clients partagés (session HTTP avec cache et nouvelles
+# tentatives, API Google Sheets), lecture des cartes, lot d'écriture Google Sheets, synchronisation
+# incrémentale, extraction des prix, historique et mesures.
+# Les scripts du dossier Assistant ne sont plus que des profils (sync.Profile) : une optimisation
+# faite ici profite à tous. Rien n'est importé ici, chaque script n'importe que les modules qu'il utilise.
@@ -0,0 +1,20 @@
+# Lecture des tableaux Trello commune à tous les profils.
+from . import clients
+from .settings import get_settings
+
+
+# Fonction pour obtenir les colonnes existantes sur le tableau Trello ({nom: id})
+# Sans tableau donné, celui du fichier .env (BOARD_ID) est utilisé
+def get_existing_lists(board_id=None, session=None):
+    settings = get_settings()
+    url = f"{clients.TRELLO_API_URL}/boards/{board_id or settings.board_id}/lists"
+    query = {
+        'key': settings.api_key,
+        'token': settings.api_token
+    }
+    response = (session or clients.get_trello_session()).get(url, params=query)
+    if response.status_code == 200:
+        return {lst['name']: lst['id'] for lst in response.json()}
+    else:
+        print(f"Erreur lors de la récupération des listes: {response.text}")
+        return {}
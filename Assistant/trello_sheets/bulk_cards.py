@@ -0,0 +1,158 @@
+# Création de cartes Trello en masse.
+# Les modèles de cartes (nom, description) sont lus depuis un fichier JSON ou CSV,
+# puis créés en parallèle sur la session HTTP partagée, avec un seau à jetons qui
+# respecte les limites de Trello (en-têtes x-rate-limit-*, réponses 429 et Retry-After).
+# Les cartes dont le nom existe déjà dans la colonne sont ignorées : relancer le
+# script ne crée jamais de doublon.
+# Chaque carte reçoit une position explicite après la dernière carte de la colonne : créées en
+# parallèle, elles gardent quand même l'ordre du fichier de modèles.
+import contextlib
+import csv
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from . import metrics
+from .clients import TRELLO_API_URL
+from .transport import TransportError, parse_retry_after
+
+# Trello autorise 100 requêtes par 10 secondes et par jeton : on reste en dessous
+DEFAULT_RATE = 9  # jetons par seconde
+DEFAULT_BURST = 10
+DEFAULT_CONCURRENCY = 8
+
+# Nombre de nouvelles tentatives après une réponse 429
+MAX_RETRIES = 5
+
+# Pause par défaut après un 429 sans Retry-After (fenêtre de limitation de Trello)
+DEFAULT_RATE_LIMIT_PAUSE = 10
+
+# Écart entre les positions de deux cartes créées (celui qu'utilise Trello pour pos='bottom')
+POSITION_STEP = 16384
+
+
+# Seau à jetons partagé par tous les threads : chaque requête consomme un jeton
+class TokenBucket:
+    def __init__(self, rate=DEFAULT_RATE, capacity=DEFAULT_BURST):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0
+        self.lock = threading.Lock()
+
+    # Attendre qu'un jeton soit disponible puis le consommer
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                wait = self.blocked_until - now
+                if wait <= 0:
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    # Suspendre toutes les requêtes pendant un certain temps (limite atteinte côté serveur)
+    def pause(self, seconds):
+        with self.lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+            self.tokens = 0
+
+
+# Fonction pour lire les modèles de cartes depuis un fichier JSON ou CSV
+# JSON : {"nom": "description", ...} ou [{"name": ..., "desc": ...}, ...]
+# CSV : colonnes name/desc (ou nom/description)
+def load_templates(path):
+    if path.lower().endswith('.csv'):
+        with open(path, newline='', encoding='utf-8') as f:
+            return [(row.get('name') or row.get('nom'), row.get('desc') or row.get('description') or '')
+                    for row in csv.DictReader(f)]
+
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        return list(data.items())
+    return [(item['name'], item.get('desc', '')) for item in data]
+
+
+# Fonction pour ralentir quand les en-têtes de Trello indiquent que la limite est presque atteinte
+def throttle_from_headers(bucket, response):
+    remaining = response.headers.get('x-rate-limit-api-token-remaining')
+    interval_ms = response.headers.get('x-rate-limit-api-token-interval-ms')
+    if remaining is not None and interval_ms and int(remaining) <= 1:
+        bucket.pause(int(interval_ms) / 1000)
+
+
+# Fonction pour obtenir le nom des cartes déjà présentes dans une colonne et la position de la dernière
+def get_existing_cards(session, auth, list_id):
+    # no-cache : la liste doit être à jour pour éviter les doublons
+    response = session.get(f"{TRELLO_API_URL}/lists/{list_id}/cards",
+                           params=dict(auth, fields='name,pos'), headers={'Cache-Control': 'no-cache'})
+    response.raise_for_status()
+    cards = response.json()
+    return {card['name'] for card in cards}, max((card['pos'] for card in cards), default=0)
+
+
+# Fonction pour créer une carte à la position donnée en respectant les limites de débit
+# Retourne None si la carte est créée, sinon le message d'erreur
+def create_card(session, auth, bucket, list_id, card_name, card_desc, position):
+    query = dict(auth, idList=list_id, name=card_name, desc=card_desc, pos=position)
+    for _ in range(MAX_RETRIES + 1):
+        bucket.acquire()
+        try:
+            response = session.post(f"{TRELLO_API_URL}/cards", params=query)
+        except (OSError, TransportError) as e:
+            # Pas de nouvel essai : la carte a peut-être été créée malgré l'erreur,
+            # relancer le script la retrouvera dans la colonne au lieu de la dupliquer
+            return f"{e} (relancer le script : les cartes déjà créées sont ignorées)"
+        throttle_from_headers(bucket, response)
+        if response.status_code == 200:
+            return None
+        if response.status_code != 429:
+            return response.text
+        # Limite dépassée : attendre le délai demandé par le serveur (secondes ou date HTTP) avant de réessayer
+        retry_after = parse_retry_after(response.headers.get('Retry-After'))
+        metrics.inc('trello_rate_limit_pauses_total')
+        bucket.pause(DEFAULT_RATE_LIMIT_PAUSE if retry_after is None else retry_after)
+    return "limite de débit Trello toujours dépassée après plusieurs tentatives"
+
+
+# Fonction pour créer toutes les cartes manquantes d'une colonne en parallèle
+# Retourne les noms créés, les noms ignorés (déjà présents) et les échecs (nom, erreur)
+def create_cards_bulk(session, api_key, api_token, list_id, templates,
+                      concurrency=DEFAULT_CONCURRENCY, bucket=None):
+    auth = {
+        'key': api_key,
+        'token': api_token
+    }
+    bucket = bucket or TokenBucket()
+
+    existing_names, last_position = get_existing_cards(session, auth, list_id)
+    skipped = []
+    to_create = []
+    for card_name, card_desc in templates:
+        if card_name in existing_names:
+            skipped.append(card_name)
+        else:
+            existing_names.add(card_name)  # Un nom présent deux fois dans le fichier n'est créé qu'une fois
+            position = last_position + (len(to_create) + 1) * POSITION_STEP
+            to_create.append((card_name, card_desc, position))
+
+    # Avec le cache des réponses, les créations forment un seul lot d'écritures : le cache est vidé
+    # une fois à la fin au lieu d'à chaque carte
+    batch_writes = getattr(session, 'batch_writes', contextlib.nullcontext)
+    with batch_writes(), ThreadPoolExecutor(max_workers=concurrency) as executor:
+        errors = list(executor.map(
+            lambda template: create_card(session, auth, bucket, list_id, *template), to_create))
+
+    created = [name for (name, _, _), error in zip(to_create, errors) if error is None]
+    failed = [(name, error) for (name, _, _), error in zip(to_create, errors) if error is not None]
+    metrics.inc('trello_cards_bulk_total', len(created), result='created')
+    metrics.inc('trello_cards_bulk_total', len(skipped), result='skipped')
+    metrics.inc('trello_cards_bulk_total', len(failed), result='failed')
+    return created, skipped, failed
@@ -0,0 +1,93 @@
+# Outils communs pour lancer les scripts Trello en ligne de commande (cron, batch)
+# ou en mode interactif quand aucune colonne n'est donnée.
+# Une sélection impossible (colonne inconnue, tableau illisible, aucune colonne choisie) lève
+# ListSelectionError : les scripts s'arrêtent alors avec le code EXIT_SELECTION_ERROR, pour que cron
+# ou le lanceur de tâches ne prennent pas une exécution qui n'a rien écrit pour un succès.
+import argparse
+
+# Codes de sortie des scripts
+EXIT_FAILED = 1  # au moins une feuille (ou une carte) en échec
+EXIT_SELECTION_ERROR = 2  # colonnes demandées introuvables ou aucune colonne sélectionnée
+
+
+class ListSelectionError(Exception):
+    pass
+
+
+# Type argparse pour un entier strictement positif (nombre de threads, de cartes...)
+def positive_int(value):
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"entier attendu : {value!r}")
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"doit être supérieur ou égal à 1 : {number}")
+    return number
+
+
+# Fonction pour créer l'analyseur d'arguments commun aux scripts
+def build_parser(description):
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('listes', nargs='*', metavar='LISTE',
+                        help="Nom ou index des colonnes Trello à traiter (mode interactif si absent)")
+    parser.add_argument('--all', action='store_true', dest='all_lists',
+                        help="Traiter toutes les colonnes du tableau")
+    parser.add_argument('--metriques', metavar='FICHIER',
+                        help="Exporter les mesures (durées, requêtes, octets) : .prom pour Prometheus, sinon lignes JSON")
+    return parser
+
+
+# Fonction pour retrouver les colonnes demandées par nom ou par index ({nom: id})
+# Lève ListSelectionError si le tableau n'a pas pu être lu, si une colonne demandée n'existe pas
+# ou si aucune colonne n'est sélectionnée
+def select_lists(existing_lists, selections, all_lists=False):
+    if not existing_lists:
+        raise ListSelectionError("aucune colonne trouvée sur le tableau")
+    if all_lists:
+        return dict(existing_lists)
+
+    names = list(existing_lists.keys())
+    selected = {}
+    unknown = []
+    for selection in selections:
+        # Le nom exact est prioritaire, pour les colonnes dont le nom est un nombre
+        if selection in existing_lists:
+            name = selection
+        else:
+            try:
+                name = names[int(selection)]
+            except (ValueError, IndexError):
+                unknown.append(selection)
+                continue
+        selected[name] = existing_lists[name]
+    if unknown:
+        raise ListSelectionError(f"colonne(s) inconnue(s) : {', '.join(unknown)}")
+    if not selected:
+        raise ListSelectionError("aucune colonne sélectionnée")
+    return selected
+
+
+# Fonction pour demander une colonne à l'utilisateur (comportement historique des scripts)
+def prompt_list(existing_lists, question):
+    print("Colonnes disponibles :")
+    for idx, name in enumerate(existing_lists.keys()):
+        print(f"{idx}: {name}")
+
+    column_index = input(question).strip()
+    try:
+        column_index = int(column_index)
+        column_name = list(existing_lists.keys())[column_index]
+        return {column_name: existing_lists[column_name]}
+    except (ValueError, IndexError):
+        print("Index invalide. Veuillez entrer un nombre correspondant à une colonne existante.")
+        return {}
+
+
+# Fonction pour choisir les colonnes à traiter selon les arguments reçus
+def resolve_lists(existing_lists, args, question):
+    if args.listes or args.all_lists or not existing_lists:
+        return select_lists(existing_lists, args.listes, args.all_lists)
+    selected = prompt_list(existing_lists, question)
+    if not selected:
+        raise ListSelectionError("aucune colonne sélectionnée")
+    return selected
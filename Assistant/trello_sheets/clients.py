@@ -0,0 +1,141 @@
+# Clients partagés (Trello, gspread, API Google Sheets v4) créés à la demande.
+# Rien n'est importé ni connecté au chargement du module : un script ne paie que
+# pour les clients qu'il utilise vraiment, et chacun n'est créé qu'une fois par exécution.
+# Le jeton d'accès du compte de service est mis en cache sur disque pour les exécutions suivantes ;
+# le document de découverte de l'API Sheets est celui fourni avec googleapiclient (aucune requête).
+import datetime
+import functools
+import json
+import os
+import threading
+import time
+
+TRELLO_API_URL = "https://api.trello.com/1"
+
+SCOPES = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/spreadsheets",
+          "https://www.googleapis.com/auth/drive.file", "https://www.googleapis.com/auth/drive"]
+
+# Dossier de cache local (jeton d'accès, réponses Trello, instantanés)
+CACHE_DIR = os.getenv('AUTOMATISATION_CACHE_DIR',
+                      os.path.join(os.path.expanduser("~"), ".cache", "automatisation"))
+
+# Marge avant expiration en dessous de laquelle un jeton en cache n'est plus réutilisé
+TOKEN_EXPIRY_MARGIN = datetime.timedelta(minutes=5)
+
+
+# Fonction pour extraire l'ID du Google Sheets depuis son URL
+def spreadsheet_id_from_url(google_sheet_url):
+    return google_sheet_url.split('/')[5]
+
+
+# Fonction pour écrire un fichier de cache lisible uniquement par l'utilisateur courant
+def write_private_file(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'w') as f:
+        f.write(content)
+
+
+# Fonction pour retrouver le chemin du cache du jeton d'un compte de service
+def token_cache_path(creds):
+    return os.path.join(CACHE_DIR, f"token_{creds.service_account_email}.json")
+
+
+# Fonction pour réutiliser un jeton d'accès encore valide enregistré lors d'une exécution précédente
+def load_cached_token(creds):
+    try:
+        with open(token_cache_path(creds)) as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return
+    expiry = datetime.datetime.fromisoformat(cached['expiry'])
+    if cached.get('scopes') == SCOPES and expiry - TOKEN_EXPIRY_MARGIN > datetime.datetime.utcnow():
+        creds.token = cached['token']
+        creds.expiry = expiry
+
+
+# Fonction pour obtenir un jeton valide (depuis le cache ou en le rafraîchissant) et l'enregistrer
+def ensure_token(creds):
+    load_cached_token(creds)
+    if creds.valid:
+        return
+    from google.auth.transport.requests import Request
+    creds.refresh(Request())
+    write_private_file(token_cache_path(creds), json.dumps({
+        'token': creds.token,
+        'expiry': creds.expiry.isoformat(),
+        'scopes': SCOPES
+    }))
+
+
+# Session HTTP partagée par tous les appels Trello (connexions réutilisées)
+# Les GET passent par le cache local des réponses, sauf avec TRELLO_CACHE=off,
+# et les erreurs temporaires sont réessayées par la couche de transport
+@functools.lru_cache(maxsize=None)
+def get_trello_session():
+    from .trello_async import create_session
+    from .http_cache import CachedSession, create_cache
+    from .transport import RetryingSession
+    session = RetryingSession(create_session())
+    cache = create_cache(CACHE_DIR)
+    return CachedSession(session, cache) if cache else session
+
+
+# Identifiants du compte de service, partagés par gspread et l'API Sheets v4
+@functools.lru_cache(maxsize=None)
+def get_credentials(credentials_path=None):
+    from google.oauth2.service_account import Credentials
+    creds = Credentials.from_service_account_file(
+        credentials_path or os.getenv('GOOGLE_CREDENTIALS_PATH'), scopes=SCOPES)
+    ensure_token(creds)
+    return creds
+
+
+# Délai maximum (secondes) d'une requête gspread ; l'API Sheets v4 (httplib2) a déjà le sien (60 s)
+GSPREAD_TIMEOUT = 60
+
+
+# Connexion à Google Sheets via gspread
+@functools.lru_cache(maxsize=None)
+def get_gspread_client():
+    import gspread
+    client = gspread.authorize(get_credentials())
+    client.set_timeout(GSPREAD_TIMEOUT)
+    return client
+
+
+# Ouverture du classeur (requête réseau), une seule fois par URL
+# gspread lit à l'ouverture les métadonnées de tout le classeur puis n'en garde que le titre :
+# elles sont gardées (avec leur date) dans opening_metadata pour que sheet_metadata ne les relise pas
+@functools.lru_cache(maxsize=None)
+def get_spreadsheet(google_sheet_url):
+    import gspread
+
+    class Spreadsheet(gspread.Spreadsheet):
+        def __init__(self, http_client, properties):
+            self.opening_metadata = None
+            super().__init__(http_client, properties)
+
+        def fetch_sheet_metadata(self, params=None):
+            metadata = super().fetch_sheet_metadata(params)
+            if self.opening_metadata is None:
+                self.opening_metadata = (time.monotonic(), metadata)
+            return metadata
+
+    return Spreadsheet(get_gspread_client().http_client, {'id': spreadsheet_id_from_url(google_sheet_url)})
+
+
+# Services API Sheets par thread : les objets googleapiclient (httplib2) ne sont pas thread-safe
+_thread_clients = threading.local()
+
+
+# Connexion à l'API Google Sheets v4 avec le document de découverte fourni par googleapiclient
+# (static_discovery, par défaut : pas de téléchargement, donc pas de cache à tenir)
+# Un service par thread (lanceur de tâches), construit avec les identifiants partagés
+def get_sheets_service():
+    service = getattr(_thread_clients, 'sheets_service', None)
+    if service is None:
+        from googleapiclient.discovery import build
+        service = build('sheets', 'v4', credentials=get_credentials(), static_discovery=True)
+        _thread_clients.sheets_service = service
+    return service
@@ -0,0 +1,294 @@
+# Cache local des réponses de l'API Trello, partagé par tous les scripts.
+# - stockage interchangeable : SQLite (par défaut) ou un fichier par réponse
+# - durée de validité (TTL) par point d'accès
+# - taille bornée, les réponses les moins récemment utilisées sont évincées (LRU)
+# - revalidation conditionnelle (If-None-Match / If-Modified-Since) quand l'API renvoie ETag ou Last-Modified
+# - fichiers lisibles uniquement par l'utilisateur courant (0600), comme le jeton d'accès : les réponses
+#   contiennent les données des tableaux
+import contextlib
+import fnmatch
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import urlsplit
+
+from . import metrics
+from .clients import write_private_file
+
+# Durées de validité par point d'accès (motifs sur le chemin de l'URL, en secondes)
+DEFAULT_TTLS = [
+    ("*/boards/*/lists", 300),
+    ("*/lists/*/cards", 60),
+    ("*/boards/*/cards", 60),
+]
+DEFAULT_TTL = 60
+
+# Taille maximale du cache (corps des réponses)
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024
+
+# Paramètres d'authentification exclus de la clé de cache (seule leur empreinte est gardée)
+AUTH_PARAMS = ('key', 'token')
+
+
+# Stockage SQLite : une table indexée par clé, avec la date du dernier accès pour l'éviction
+class SQLiteStorage:
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        # Base créée en 0600 (ses journaux prennent les mêmes droits)
+        os.close(os.open(path, os.O_RDWR | os.O_CREAT, 0o600))
+        # Le client Trello asynchrone appelle le cache depuis plusieurs threads
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock, self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, stored_at REAL, last_access REAL, size INTEGER, "
+                "etag TEXT, last_modified TEXT, headers TEXT, body BLOB)")
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)")
+
+    def get(self, key):
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT stored_at, etag, last_modified, headers, body FROM responses WHERE key = ?",
+                (key,)).fetchone()
+        if row is None:
+            return None
+        return {'stored_at': row[0], 'etag': row[1], 'last_modified': row[2],
+                'headers': json.loads(row[3]), 'body': row[4]}
+
+    def set(self, key, entry):
+        now = time.time()
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, entry['stored_at'], now, len(entry['body']), entry['etag'],
+                 entry['last_modified'], json.dumps(entry['headers']), entry['body']))
+
+    # Marquer une réponse comme utilisée (et éventuellement revalidée)
+    def touch(self, key, stored_at=None):
+        with self.lock, self.connection:
+            if stored_at is None:
+                self.connection.execute("UPDATE responses SET last_access = ? WHERE key = ?",
+                                        (time.time(), key))
+            else:
+                self.connection.execute("UPDATE responses SET last_access = ?, stored_at = ? WHERE key = ?",
+                                        (time.time(), stored_at, key))
+
+    # Supprimer les réponses les moins récemment utilisées au-delà de max_bytes
+    def evict(self, max_bytes):
+        with self.lock, self.connection:
+            total = self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            if total <= max_bytes:
+                return
+            rows = self.connection.execute("SELECT key, size FROM responses ORDER BY last_access").fetchall()
+            for key, size in rows:
+                if total <= max_bytes:
+                    break
+                self.connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                total -= size
+
+    def clear(self):
+        with self.lock, self.connection:
+            self.connection.execute("DELETE FROM responses")
+
+
+# Stockage fichier : un fichier JSON par réponse, la date de modification sert de date d'accès
+class FileStorage:
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+
+    def path_for(self, key):
+        return os.path.join(self.directory, key + '.json')
+
+    def get(self, key):
+        try:
+            with open(self.path_for(key)) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        entry['body'] = entry['body'].encode('utf-8')
+        return entry
+
+    def set(self, key, entry):
+        stored = dict(entry, body=entry['body'].decode('utf-8'))
+        path = self.path_for(key)
+        # Écriture atomique : plusieurs threads peuvent lire le même fichier
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        write_private_file(tmp_path, json.dumps(stored))
+        now = time.time()
+        os.utime(tmp_path, (now, now))
+        os.replace(tmp_path, path)
+
+    def touch(self, key, stored_at=None):
+        if stored_at is not None:
+            entry = self.get(key)
+            if entry is not None:
+                entry['stored_at'] = stored_at
+                self.set(key, entry)
+                return
+        try:
+            now = time.time()
+            os.utime(self.path_for(key), (now, now))
+        except OSError:
+            pass
+
+    def evict(self, max_bytes):
+        files = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.json'):
+                stat = os.stat(os.path.join(self.directory, name))
+                files.append((stat.st_mtime, stat.st_size, name))
+        total = sum(size for _, size, _ in files)
+        for _, size, name in sorted(files):
+            if total <= max_bytes:
+                break
+            os.remove(os.path.join(self.directory, name))
+            total -= size
+
+    def clear(self):
+        for name in os.listdir(self.directory):
+            if name.endswith('.json'):
+                os.remove(os.path.join(self.directory, name))
+
+
+# Fonction pour construire une requests.Response à partir d'une entrée du cache
+def build_response(url, entry):
+    import requests
+    response = requests.Response()
+    response.status_code = 200
+    response.url = url
+    response._content = entry['body']
+    response.headers.update(entry['headers'])
+    response.encoding = 'utf-8'
+    return response
+
+
+class ResponseCache:
+    def __init__(self, storage, ttls=DEFAULT_TTLS, default_ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES):
+        self.storage = storage
+        self.ttls = ttls
+        self.default_ttl = default_ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+
+    # Fonction pour retrouver la durée de validité d'une URL
+    def ttl_for(self, url):
+        path = urlsplit(url).path
+        for pattern, ttl in self.ttls:
+            if fnmatch.fnmatch(path, pattern):
+                return ttl
+        return self.default_ttl
+
+    # Clé de cache : URL et paramètres triés, avec une empreinte des identifiants à la place de leur valeur
+    def key_for(self, url, params):
+        params = params or {}
+        public = sorted((k, str(v)) for k, v in params.items() if k not in AUTH_PARAMS)
+        auth = "|".join(str(params.get(k, '')) for k in AUTH_PARAMS)
+        raw = json.dumps([url, public, hashlib.sha256(auth.encode()).hexdigest()])
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    # Faire un GET en passant par le cache
+    def get(self, session, url, params=None, headers=None, **kwargs):
+        key = self.key_for(url, params)
+        entry = self.storage.get(key)
+
+        # Cache-Control: no-cache impose une revalidation même si la réponse est encore valide
+        no_cache = 'no-cache' in (headers or {}).get('Cache-Control', '')
+        if entry is not None and not no_cache and time.time() - entry['stored_at'] < self.ttl_for(url):
+            self.hits += 1
+            metrics.inc('trello_cache_total', result='hit')
+            self.storage.touch(key)
+            return build_response(url, entry)
+
+        # Réponse expirée : la revalider si le serveur a fourni un validateur
+        headers = dict(headers or {})
+        if entry is not None:
+            if entry['etag']:
+                headers['If-None-Match'] = entry['etag']
+            if entry['last_modified']:
+                headers['If-Modified-Since'] = entry['last_modified']
+
+        response = session.get(url, params=params, headers=headers, **kwargs)
+
+        if response.status_code == 304 and entry is not None:
+            self.revalidated += 1
+            metrics.inc('trello_cache_total', result='revalidated')
+            self.storage.touch(key, stored_at=time.time())
+            return build_response(url, entry)
+
+        self.misses += 1
+        metrics.inc('trello_cache_total', result='miss')
+        if response.status_code == 200:
+            self.storage.set(key, {
+                'stored_at': time.time(),
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'headers': {'Content-Type': response.headers.get('Content-Type', 'application/json')},
+                'body': response.content
+            })
+            self.storage.evict(self.max_bytes)
+        return response
+
+
+# Session qui passe les GET par le cache et délègue le reste à la session HTTP d'origine
+class CachedSession:
+    def __init__(self, session, cache):
+        self.session = session
+        self.cache = cache
+        self.batches = 0
+        self.lock = threading.Lock()
+
+    def get(self, url, params=None, **kwargs):
+        return self.cache.get(self.session, url, params=params, **kwargs)
+
+    # Toute écriture (POST, PUT, DELETE) invalide le cache pour ne jamais relire un état périmé,
+    # sauf pendant un lot d'écritures (batch_writes), où le cache n'est vidé qu'une fois, à la fin
+    def invalidate(self):
+        with self.lock:
+            if self.batches:
+                return
+        self.cache.storage.clear()
+
+    # Lot d'écritures (création de cartes en masse) : une seule invalidation pour tout le lot
+    @contextlib.contextmanager
+    def batch_writes(self):
+        with self.lock:
+            self.batches += 1
+        try:
+            yield self
+        finally:
+            with self.lock:
+                self.batches -= 1
+            self.invalidate()
+
+    def post(self, url, **kwargs):
+        self.invalidate()
+        return self.session.post(url, **kwargs)
+
+    def put(self, url, **kwargs):
+        self.invalidate()
+        return self.session.put(url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        self.invalidate()
+        return self.session.delete(url, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+
+# Fonction pour créer le cache selon la variable d'environnement TRELLO_CACHE (sqlite, file ou off)
+def create_cache(cache_dir, mode=None):
+    mode = (mode or os.getenv('TRELLO_CACHE', 'sqlite')).lower()
+    if mode == 'off':
+        return None
+    if mode == 'file':
+        return ResponseCache(FileStorage(os.path.join(cache_dir, 'trello_responses')))
+    return ResponseCache(SQLiteStorage(os.path.join(cache_dir, 'trello_responses.sqlite')))
@@ -0,0 +1,136 @@
+# Mesures d'exécution : compteurs et histogrammes de latence, exportés en lignes JSON ou au format
+# texte Prometheus. Les mesures sont relevées aux points chauds (requêtes Trello et Google, pages de
+# cartes, extraction des prix, préparation des feuilles, lots d'écriture, nouvelles tentatives et quotas)
+# et ne coûtent qu'un verrou et une addition : elles ne sont écrites que si un export est demandé
+# (--metriques FICHIER, ou variable AUTOMATISATION_METRICS).
+# - FICHIER.prom : texte Prometheus, remplacé à chaque exécution (collecteur textfile de node_exporter)
+# - autre extension : une ligne JSON par série, ajoutée à la fin du fichier à chaque exécution
+import bisect
+import contextlib
+import json
+import os
+import threading
+import time
+import uuid
+
+# Bornes des histogrammes de latence (secondes)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Identifiant de l'exécution, pour regrouper les lignes JSON d'un même lancement
+RUN_ID = uuid.uuid4().hex[:12]
+
+_lock = threading.Lock()
+_counters = {}
+_histograms = {}
+
+
+def _key(name, labels):
+    return name, tuple(sorted((label, str(value)) for label, value in labels.items()))
+
+
+# Fonction pour incrémenter un compteur (ex : inc('api_requests_total', api='trello', status=200))
+def inc(name, value=1, **labels):
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+# Fonction pour ajouter une observation à un histogramme (latence en secondes par défaut)
+def observe(name, value, **labels):
+    key = _key(name, labels)
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = {'buckets': [0] * (len(LATENCY_BUCKETS) + 1), 'sum': 0.0, 'count': 0}
+        histogram['buckets'][bisect.bisect_left(LATENCY_BUCKETS, value)] += 1
+        histogram['sum'] += value
+        histogram['count'] += 1
+
+
+# Mesurer la durée d'un bloc : with timed('setup_sheet_seconds'): ...
+@contextlib.contextmanager
+def timed(name, **labels):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start, **labels)
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+
+# Fonction pour obtenir une copie des mesures : (compteurs, histogrammes)
+def snapshot():
+    with _lock:
+        return dict(_counters), {key: {'buckets': list(h['buckets']), 'sum': h['sum'], 'count': h['count']}
+                                 for key, h in _histograms.items()}
+
+
+# Échappement des valeurs d'étiquettes Prometheus (barre oblique inverse, guillemet, saut de ligne)
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels, extra=()):
+    items = list(labels) + list(extra)
+    if not items:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in items) + '}'
+
+
+# Fonction pour exporter les mesures au format texte Prometheus
+def export_prometheus():
+    counters, histograms = snapshot()
+    lines = []
+    for name in sorted({key[0] for key in counters}):
+        lines.append(f"# TYPE automatisation_{name} counter")
+        for (metric, labels), value in sorted(counters.items()):
+            if metric == name:
+                lines.append(f"automatisation_{name}{_format_labels(labels)} {value}")
+    for name in sorted({key[0] for key in histograms}):
+        lines.append(f"# TYPE automatisation_{name} histogram")
+        for (metric, labels), histogram in sorted(histograms.items()):
+            if metric != name:
+                continue
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS + ('+Inf',), histogram['buckets']):
+                cumulative += count
+                lines.append(f"automatisation_{name}_bucket{_format_labels(labels, [('le', bound)])} {cumulative}")
+            lines.append(f"automatisation_{name}_sum{_format_labels(labels)} {histogram['sum']:.6f}")
+            lines.append(f"automatisation_{name}_count{_format_labels(labels)} {histogram['count']}")
+    return "\n".join(lines) + "\n"
+
+
+# Fonction pour exporter les mesures en lignes JSON (une par série)
+def export_json_lines():
+    counters, histograms = snapshot()
+    timestamp = time.time()
+    lines = []
+    for (name, labels), value in sorted(counters.items()):
+        lines.append(json.dumps({'ts': timestamp, 'run': RUN_ID, 'metric': name, 'type': 'counter',
+                                 'labels': dict(labels), 'value': value}, ensure_ascii=False))
+    for (name, labels), histogram in sorted(histograms.items()):
+        buckets = {str(bound): count for bound, count in zip(LATENCY_BUCKETS + ('+Inf',), histogram['buckets'])}
+        lines.append(json.dumps({'ts': timestamp, 'run': RUN_ID, 'metric': name, 'type': 'histogram',
+                                 'labels': dict(labels), 'count': histogram['count'],
+                                 'sum': round(histogram['sum'], 6), 'buckets': buckets}, ensure_ascii=False))
+    return "\n".join(lines) + "\n" if lines else ""
+
+
+# Fonction pour écrire les mesures dans le fichier demandé (ou celui de AUTOMATISATION_METRICS)
+def write_metrics(path=None):
+    path = path or os.getenv('AUTOMATISATION_METRICS')
+    if not path:
+        return
+    if path.endswith('.prom'):
+        # Remplacement atomique : le collecteur ne lit jamais un fichier à moitié écrit
+        with open(path + '.tmp', 'w') as f:
+            f.write(export_prometheus())
+        os.replace(path + '.tmp', path)
+    else:
+        with open(path, 'a') as f:
+            f.write(export_json_lines())
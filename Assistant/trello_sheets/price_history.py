@@ -0,0 +1,212 @@
+# Historique local des prix extraits des cartes Trello (base SQLite).
+# Chaque synchronisation réussie ajoute une exécution : pour chaque carte, son classeur, sa colonne et
+# ses prix minimum et maximum (le maximum est le prix retenu dans les feuilles), ainsi que le total
+# de chaque colonne. Les feuilles Google Sheets sont réécrites à chaque exécution ; l'historique,
+# lui, permet aux tableaux de bord de calculer totaux, tendances et plus fortes variations
+# localement, sans relire Trello ni les feuilles.
+# - prices : une ligne par carte et par exécution, indexée par classeur, colonne, date et carte
+# - list_totals : totaux par classeur, colonne et exécution, calculés à l'ajout (tendances instantanées)
+# Deux classeurs peuvent avoir des colonnes du même nom : chaque requête se limite à un classeur
+# (--classeur) ou sépare ses résultats par classeur.
+# La base est placée dans le dossier de cache (PRICE_HISTORY_DB pour un autre fichier, "off" pour désactiver).
+# Utilisation : python -m trello_sheets.price_history totals
+#               python -m trello_sheets.price_history trend "A acheter" [--jours 30]
+#               python -m trello_sheets.price_history movers [--jours 7] [--nombre 10] [--colonne NOM]
+#               (toutes acceptent --classeur ID_OU_URL)
+import argparse
+import datetime
+import functools
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from .clients import CACHE_DIR, spreadsheet_id_from_url
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS runs (id INTEGER PRIMARY KEY, ts REAL, script TEXT, spreadsheet TEXT)",
+    "CREATE TABLE IF NOT EXISTS cards (card_id TEXT PRIMARY KEY, name TEXT)",
+    "CREATE TABLE IF NOT EXISTS prices (run_id INTEGER, ts REAL, spreadsheet TEXT, card_id TEXT, "
+    "list_name TEXT, price_min REAL, price_max REAL)",
+    "CREATE TABLE IF NOT EXISTS list_totals (run_id INTEGER, ts REAL, spreadsheet TEXT, list_name TEXT, "
+    "cards INTEGER, total_min REAL, total_max REAL)",
+    "CREATE INDEX IF NOT EXISTS prices_sheet_list_ts ON prices (spreadsheet, list_name, ts)",
+    "CREATE INDEX IF NOT EXISTS prices_ts ON prices (ts)",
+    "CREATE INDEX IF NOT EXISTS prices_card_ts ON prices (card_id, ts)",
+    "CREATE INDEX IF NOT EXISTS list_totals_sheet_list_ts ON list_totals (spreadsheet, list_name, ts)",
+)
+
+
+class PriceHistory:
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        # Partagée par les tâches du lanceur ; le délai laisse passer l'écriture d'un autre processus
+        self.connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock, self.connection:
+            # WAL : les tableaux de bord lisent pendant qu'une synchronisation écrit
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            for statement in SCHEMA:
+                self.connection.execute(statement)
+
+    # Ajouter une exécution : records = [(id de carte, nom de carte, colonne, PriceInfo)]
+    def append(self, records, script=None, spreadsheet=None, ts=None):
+        ts = time.time() if ts is None else ts
+        totals = {}
+        rows = []
+        for card_id, card_name, list_name, info in records:
+            rows.append((card_id, list_name, info.min, info.max))
+            total = totals.setdefault(list_name, [0, 0, 0])
+            total[0] += 1
+            total[1] += info.min
+            total[2] += info.max
+        with self.lock, self.connection:
+            run_id = self.connection.execute("INSERT INTO runs (ts, script, spreadsheet) VALUES (?, ?, ?)",
+                                             (ts, script, spreadsheet)).lastrowid
+            self.connection.executemany("INSERT OR REPLACE INTO cards VALUES (?, ?)",
+                                        [(card_id, card_name) for card_id, card_name, _, _ in records])
+            self.connection.executemany(
+                "INSERT INTO prices (run_id, ts, spreadsheet, card_id, list_name, price_min, price_max) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", [(run_id, ts, spreadsheet) + row for row in rows])
+            self.connection.executemany(
+                "INSERT INTO list_totals (run_id, ts, spreadsheet, list_name, cards, total_min, total_max) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(run_id, ts, spreadsheet, list_name) + tuple(total) for list_name, total in totals.items()])
+        return run_id
+
+    def query(self, sql, params=()):
+        with self.lock:
+            return self.connection.execute(sql, params).fetchall()
+
+    # Totaux de chaque colonne de chaque classeur (ou du classeur donné) lors de sa dernière exécution
+    # (avant la date until si elle est donnée)
+    def list_totals(self, until=None, spreadsheet=None):
+        sheet_filter = "AND spreadsheet = ?" if spreadsheet else ""
+        params = [until if until is not None else time.time()] + ([spreadsheet] if spreadsheet else [])
+        rows = self.query(
+            "SELECT t.spreadsheet, t.list_name, t.ts, t.cards, t.total_min, t.total_max FROM list_totals t "
+            "JOIN (SELECT spreadsheet, list_name, MAX(ts) AS ts FROM list_totals "
+            f"WHERE ts <= ? {sheet_filter} GROUP BY spreadsheet, list_name) latest "
+            "ON t.spreadsheet IS latest.spreadsheet AND t.list_name = latest.list_name AND t.ts = latest.ts "
+            "ORDER BY t.spreadsheet, t.list_name", params)
+        return [dict(zip(('spreadsheet', 'list', 'ts', 'cards', 'total_min', 'total_max'), row)) for row in rows]
+
+    # Évolution du total d'une colonne : dernière valeur de chaque jour entre since et until,
+    # pour chaque classeur qui a une colonne de ce nom (ou pour le classeur donné)
+    def trend(self, list_name, since=None, until=None, spreadsheet=None):
+        sheet_filter = "AND spreadsheet = ?" if spreadsheet else ""
+        params = [list_name, since or 0, until if until is not None else time.time()]
+        rows = self.query(
+            "SELECT spreadsheet, ts, cards, total_min, total_max FROM list_totals "
+            f"WHERE list_name = ? AND ts >= ? AND ts <= ? {sheet_filter} ORDER BY spreadsheet, ts",
+            params + ([spreadsheet] if spreadsheet else []))
+        days = {}
+        for sheet, ts, cards, total_min, total_max in rows:
+            day = datetime.date.fromtimestamp(ts).isoformat()
+            days[sheet, day] = {'spreadsheet': sheet, 'day': day, 'ts': ts, 'cards': cards,
+                                'total_min': total_min, 'total_max': total_max}
+        return list(days.values())
+
+    # Cartes dont le prix retenu (maximum) a le plus changé entre leur premier et leur dernier relevé
+    # de la période, dans chaque classeur (ou dans le classeur donné)
+    def top_movers(self, since, until=None, limit=10, list_name=None, spreadsheet=None):
+        filters = ("AND list_name = ? " if list_name else "") + ("AND spreadsheet = ?" if spreadsheet else "")
+        params = [since, until if until is not None else time.time()] + \
+            ([list_name] if list_name else []) + ([spreadsheet] if spreadsheet else [])
+        rows = self.query(
+            "WITH period AS (SELECT spreadsheet, card_id, list_name, price_max, ts, "
+            "ROW_NUMBER() OVER (PARTITION BY spreadsheet, card_id ORDER BY ts) AS first_rank, "
+            "ROW_NUMBER() OVER (PARTITION BY spreadsheet, card_id ORDER BY ts DESC) AS last_rank "
+            f"FROM prices WHERE ts >= ? AND ts <= ? {filters}) "
+            "SELECT first.spreadsheet, first.card_id, cards.name, last.list_name, first.price_max, last.price_max, "
+            "last.price_max - first.price_max "
+            "FROM period first JOIN period last "
+            "ON first.card_id = last.card_id AND first.spreadsheet IS last.spreadsheet "
+            "LEFT JOIN cards ON cards.card_id = first.card_id "
+            "WHERE first.first_rank = 1 AND last.last_rank = 1 AND last.price_max != first.price_max "
+            "ORDER BY ABS(last.price_max - first.price_max) DESC LIMIT ?",
+            params + [limit])
+        return [dict(zip(('spreadsheet', 'card_id', 'name', 'list', 'before', 'after', 'change'), row))
+                for row in rows]
+
+    # Relevés d'une carte, du plus ancien au plus récent
+    def card_history(self, card_id):
+        rows = self.query("SELECT ts, spreadsheet, list_name, price_min, price_max FROM prices "
+                          "WHERE card_id = ? ORDER BY ts", (card_id,))
+        return [dict(zip(('ts', 'spreadsheet', 'list', 'price_min', 'price_max'), row)) for row in rows]
+
+    def close(self):
+        self.connection.close()
+
+
+# Fonction pour obtenir l'historique partagé (None s'il est désactivé)
+@functools.lru_cache(maxsize=None)
+def get_history():
+    path = os.getenv('PRICE_HISTORY_DB', os.path.join(CACHE_DIR, 'price_history.sqlite'))
+    if path.lower() == 'off':
+        return None
+    return PriceHistory(path)
+
+
+# Fonction utilisée par les scripts : ajouter les prix d'une synchronisation réussie
+# Une erreur d'écriture de l'historique est signalée sans faire échouer la synchronisation
+def record_prices(records, script=None, spreadsheet=None):
+    if not records:
+        return None
+    try:
+        history = get_history()
+        return history.append(records, script, spreadsheet) if history else None
+    except sqlite3.Error as e:
+        print(f"Erreur lors de l'enregistrement de l'historique des prix : {e}")
+        return None
+
+
+def print_rows(rows, columns, as_json):
+    if as_json:
+        print(json.dumps(rows, indent=2, ensure_ascii=False))
+        return
+    for row in rows:
+        print("  ".join(str(round(row[column], 2) if isinstance(row[column], float) else row[column])
+                        for column in columns))
+
+
+# Fonction pour accepter l'ID d'un classeur ou son URL
+def spreadsheet_argument(value):
+    return spreadsheet_id_from_url(value) if '/' in value else value
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Historique des prix des cartes Trello.")
+    parser.add_argument('--json', action='store_true', help="Résultat au format JSON")
+    parser.add_argument('--classeur', type=spreadsheet_argument,
+                        help="ID ou URL du classeur (par défaut : tous, séparés par classeur)")
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('totals', help="Total de chaque colonne lors de sa dernière synchronisation")
+    trend = commands.add_parser('trend', help="Évolution jour par jour du total d'une colonne")
+    trend.add_argument('colonne')
+    trend.add_argument('--jours', type=int, default=30)
+    movers = commands.add_parser('movers', help="Cartes dont le prix a le plus changé")
+    movers.add_argument('--jours', type=int, default=7)
+    movers.add_argument('--nombre', type=int, default=10)
+    movers.add_argument('--colonne')
+    args = parser.parse_args(argv)
+
+    history = get_history()
+    if history is None:
+        print("L'historique des prix est désactivé (PRICE_HISTORY_DB=off).")
+        return
+    if args.command == 'totals':
+        print_rows(history.list_totals(spreadsheet=args.classeur),
+                   ('spreadsheet', 'list', 'cards', 'total_min', 'total_max'), args.json)
+    elif args.command == 'trend':
+        print_rows(history.trend(args.colonne, since=time.time() - args.jours * 86400, spreadsheet=args.classeur),
+                   ('spreadsheet', 'day', 'cards', 'total_min', 'total_max'), args.json)
+    elif args.command == 'movers':
+        print_rows(history.top_movers(time.time() - args.jours * 86400, limit=args.nombre, list_name=args.colonne,
+                                      spreadsheet=args.classeur),
+                   ('spreadsheet', 'name', 'list', 'before', 'after', 'change'), args.json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+# Extraction des prix dans les descriptions de cartes Trello.
+# Formats reconnus :
+#   - fourchettes : "Prix moyen : 300€ - 600€", "Prix : 300 à 600 €", "300 € à 600 €"
+#     (le premier montant doit être étiqueté ou suivi d'une devise : dans "32 Go, 2024 - 150€",
+#     2024 n'est pas le bas d'une fourchette, seul 150€ est retenu)
+#   - prix étiquetés : "prix : 233 euro", "Prix : 19,99€"
+#   - montants suivis d'une devise : "1 499,90 €", "1,500.00$"
+#   - suffixe k pour les milliers : "1.5k€", "Prix : 2k - 3k€"
+# Décimales et séparateurs de milliers (espace, espace insécable, point, virgule) sont gérés,
+# ainsi que plusieurs prix dans une même description.
+# Un espace suivi d'exactement trois chiffres est toujours un séparateur de milliers, comme en français :
+# "Pack 2 150 €" vaut 2150 €. Une quantité s'écrit "2 x 150 €" (ou "2 × 150 €"), ce qui donne 150 €.
+# Les expressions sont compilées une seule fois, et parse_prices() n'analyse qu'une fois
+# chaque description distincte d'une liste.
+import re
+from collections import namedtuple
+
+# Résultat structuré : prix minimum, maximum, devise (EUR, USD) et indice de confiance (0 à 1)
+PriceInfo = namedtuple('PriceInfo', ['min', 'max', 'currency', 'confidence'])
+
+NO_PRICE = PriceInfo(0, 0, None, 0.0)
+
+# Confiance selon la forme du prix trouvé
+RANGE_CONFIDENCE = 1.0
+LABELED_CONFIDENCE = 0.9
+BARE_CONFIDENCE = 0.6
+
+# Nombre : simple ou avec séparateurs de milliers (1 500 / 1.500 / 1,500), décimales optionnelles
+_NUMBER = r"\d+(?:[ \u00a0\u202f.,]\d{3})*(?:[.,]\d{1,2})?(?!\d)"
+_CURRENCY = r"(?:€|eur(?:os?)?\b|\$|usd\b)"
+# Suffixe des milliers, collé au nombre et pas au début d'un mot ("2k€", mais pas "2 kg" ni "2ko")
+_THOUSANDS = r"k(?![^\W\d_])"
+_LABEL = r"prix[^:\n]{0,30}:\s*"
+
+# Une seule expression, le premier montant n'est analysé qu'une fois :
+#   [étiquette] montant [devise] [- montant devise]
+# Un montant sans étiquette ni devise est rejeté par la condition finale, et ne peut pas non plus
+# commencer une fourchette : un nombre isolé (année, capacité) n'en devient jamais le minimum.
+PRICE_RE = re.compile(
+    # Garde rapide : un prix commence par un chiffre ou par l'étiquette "prix"
+    r"(?=[\dpP])"
+    rf"(?:(?P<label>{_LABEL})|(?<![\w.,]))"
+    rf"(?P<low>{_NUMBER})(?P<low_k>{_THOUSANDS})?\s*(?P<low_cur>{_CURRENCY})?"
+    # Fourchette : seulement après un premier montant étiqueté ou avec devise,
+    # la devise est obligatoire après le second montant
+    rf"(?:(?(label)|(?(low_cur)|(?!)))\s*(?:-|–|à)\s*"
+    rf"(?P<high>{_NUMBER})(?P<high_k>{_THOUSANDS})?\s*(?P<high_cur>{_CURRENCY}))?"
+    r"(?(label)|(?(low_cur)|(?!)))",
+    re.IGNORECASE)
+
+_SPACES_RE = re.compile(r"[ \u00a0\u202f]")
+
+
+# Fonction pour convertir un nombre écrit "à la française" ou "à l'anglaise" en int/float
+def parse_number(text):
+    if text.isdigit():
+        return int(text)
+    text = _SPACES_RE.sub("", text)
+    if '.' in text and ',' in text:
+        # Le dernier séparateur est le séparateur décimal
+        decimal = '.' if text.rfind('.') > text.rfind(',') else ','
+        thousands = ',' if decimal == '.' else '.'
+        text = text.replace(thousands, '').replace(decimal, '.')
+    else:
+        for separator in '.,':
+            if separator in text:
+                parts = text.split(separator)
+                # Plusieurs séparateurs ou groupe final de 3 chiffres : séparateur de milliers
+                if len(parts) > 2 or len(parts[-1]) == 3:
+                    text = text.replace(separator, '')
+                else:
+                    text = text.replace(separator, '.')
+    value = float(text)
+    return int(value) if value.is_integer() else value
+
+
+# Fonction pour convertir un montant, multiplié par 1000 avec le suffixe k ("1.5k" : 1500)
+def parse_amount(text, thousands):
+    value = parse_number(text)
+    if not thousands:
+        return value
+    value = round(value * 1000, 2)
+    return int(value) if value == int(value) else value
+
+
+# Fonction pour normaliser la devise trouvée
+def normalize_currency(symbol):
+    if not symbol:
+        return None
+    return 'USD' if symbol.lower() in ('$', 'usd') else 'EUR'
+
+
+# Fonction pour convertir une correspondance en (min, max, devise, confiance)
+def match_to_price(match):
+    label, low_cur, high, high_cur = match.group('label', 'low_cur', 'high', 'high_cur')
+    low = parse_amount(match.group('low'), match.group('low_k'))
+    if high:
+        high = parse_amount(high, match.group('high_k'))
+        return min(low, high), max(low, high), normalize_currency(high_cur or low_cur), RANGE_CONFIDENCE
+    if label:
+        return low, low, normalize_currency(low_cur), LABELED_CONFIDENCE
+    return low, low, normalize_currency(low_cur), BARE_CONFIDENCE
+
+
+# Fonction pour combiner tous les prix trouvés dans une description
+# Seuls les prix de la forme la plus fiable sont gardés (une fourchette l'emporte sur un montant isolé)
+def combine_prices(prices):
+    if not prices:
+        return NO_PRICE
+    if len(prices) == 1:
+        low, high, currency, confidence = prices[0]
+        return PriceInfo(low, high, currency or 'EUR', confidence)
+    confidence = max(price[3] for price in prices)
+    best = [price for price in prices if price[3] == confidence]
+    currency = next((price[2] for price in best if price[2]), 'EUR')
+    return PriceInfo(min(price[0] for price in best), max(price[1] for price in best), currency, confidence)
+
+
+# Fonction pour extraire les prix d'une description
+def parse_price(card_desc):
+    return combine_prices([match_to_price(match) for match in PRICE_RE.finditer(card_desc or "")])
+
+
+# Fonction pour extraire les prix d'une liste de descriptions
+# Les descriptions identiques (cartes créées depuis un même modèle) ne sont analysées qu'une fois
+def parse_prices(descriptions):
+    descriptions = [desc or "" for desc in descriptions]
+    unique = list(dict.fromkeys(descriptions))
+    results = dict(zip(unique, [parse_price(desc) for desc in unique]))
+    return [results[desc] for desc in descriptions]
@@ -0,0 +1,16 @@
+# Paramètres Trello lus dans le fichier .env (ou l'environnement), une seule fois par processus
+# et seulement quand un profil en a besoin : --help et les imports restent immédiats.
+import functools
+import os
+from collections import namedtuple
+
+Settings = namedtuple('Settings', ['api_key', 'api_token', 'board_id'])
+
+
+# Fonction pour obtenir la clé, le jeton et le tableau Trello
+@functools.lru_cache(maxsize=None)
+def get_settings():
+    from dotenv import load_dotenv
+    # Les variables déjà définies dans l'environnement ne sont pas remplacées
+    load_dotenv()
+    return Settings(os.getenv('TRELLO_API_KEY'), os.getenv('TRELLO_API_TOKEN'), os.getenv('BOARD_ID'))
@@ -0,0 +1,84 @@
+# Requêtes de mise en forme Google Sheets construites par plage.
+# Une seule requête couvre tout le tableau, quelle que soit la taille de la liste :
+# la taille du corps envoyé et le nombre d'appels restent constants.
+
+# Style de bordure commun (trait plein noir)
+SOLID_BORDER = {
+    "style": "SOLID",
+    "width": 1,
+    "color": {
+        "red": 0,
+        "green": 0,
+        "blue": 0
+    }
+}
+
+# Format monétaire appliqué aux colonnes de prix
+PRICE_FORMAT = '#,##0.00 "€"'
+
+
+# Fonction pour construire une plage de grille
+# Les lignes sont numérotées comme dans la feuille (à partir de 1, fin incluse),
+# les colonnes sont des index Google Sheets (à partir de 0, fin exclue)
+def grid_range(sheet_id, start_row, end_row, start_column, end_column):
+    return {
+        "sheetId": sheet_id,
+        "startRowIndex": start_row - 1,  # Les index de Google Sheets commencent à 0
+        "endRowIndex": end_row,
+        "startColumnIndex": start_column,
+        "endColumnIndex": end_column
+    }
+
+
+# Fonction pour encadrer une plage entière (contour et séparations internes) en une requête
+def borders_request(sheet_id, start_row, end_row, start_column, end_column):
+    return {
+        "updateBorders": {
+            "range": grid_range(sheet_id, start_row, end_row, start_column, end_column),
+            "top": SOLID_BORDER,
+            "bottom": SOLID_BORDER,
+            "left": SOLID_BORDER,
+            "right": SOLID_BORDER,
+            "innerHorizontal": SOLID_BORDER,
+            "innerVertical": SOLID_BORDER
+        }
+    }
+
+
+# Fonction pour appliquer un format de nombre (prix par défaut) à une plage
+def number_format_request(sheet_id, start_row, end_row, start_column, end_column, pattern=PRICE_FORMAT):
+    return {
+        "repeatCell": {
+            "range": grid_range(sheet_id, start_row, end_row, start_column, end_column),
+            "cell": {
+                "userEnteredFormat": {
+                    "numberFormat": {
+                        "type": "CURRENCY",
+                        "pattern": pattern
+                    }
+                }
+            },
+            "fields": "userEnteredFormat.numberFormat"
+        }
+    }
+
+
+# Fonction pour étendre les bordures sur les lignes du tableau
+# Les mises en forme supplémentaires (formats de prix...) partent dans le même appel
+def extend_borders(writer, sheet_id, start_row, end_row, start_column, end_column, extra_requests=()):
+    writer.add_request(borders_request(sheet_id, start_row, end_row, start_column, end_column))
+    writer.add_requests(list(extra_requests))
+
+
+# Fonction pour effacer les valeurs de toutes les lignes à partir de start_row (jusqu'au bas de la feuille)
+# Remplace sheet.clear() : les anciennes lignes ne sont effacées qu'après l'écriture des nouvelles
+def clear_rows_request(sheet_id, start_row):
+    return {
+        "updateCells": {
+            "range": {
+                "sheetId": sheet_id,
+                "startRowIndex": start_row - 1  # Sans endRowIndex : jusqu'à la dernière ligne
+            },
+            "fields": "userEnteredValue"
+        }
+    }
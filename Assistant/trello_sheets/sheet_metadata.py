@@ -0,0 +1,113 @@
+# Cache en mémoire des métadonnées d'un classeur Google Sheets (id et titre des feuilles).
+# Avec gspread, chaque spreadsheet.worksheet(titre) relit toutes les métadonnées du classeur :
+# pour N colonnes, cela faisait jusqu'à 3 appels par feuille (feuille, modèle, duplication).
+# Ici les métadonnées sont lues une fois (à l'ouverture du classeur), la feuille modèle est retrouvée
+# dans le cache et chaque duplication met le cache à jour à partir de la réponse de l'API, sans relecture.
+# Le cache est relu après max_age secondes (processus longs) ou lorsqu'une modification échoue
+# (feuille créée ou supprimée par quelqu'un d'autre entre-temps).
+import threading
+import time
+from collections import namedtuple
+
+from . import metrics
+from .transport import call_google
+
+# Durée de validité des métadonnées en cache (secondes)
+DEFAULT_MAX_AGE = 300
+
+# Informations d'une feuille utilisées pour l'écriture (id de grille et titre pour les plages A1)
+SheetInfo = namedtuple('SheetInfo', ['id', 'title'])
+
+
+class SpreadsheetMetadata:
+    def __init__(self, spreadsheet, max_age=DEFAULT_MAX_AGE):
+        self.spreadsheet = spreadsheet
+        self.max_age = max_age
+        self.sheets = None
+        self.loaded_at = None
+        self.metadata_calls = 0
+        # Un seul thread à la fois crée des feuilles dans le classeur
+        self.lock = threading.RLock()
+
+    # Lire les métadonnées du classeur (un appel pour toutes les feuilles)
+    def load(self):
+        with metrics.timed('sheet_metadata_seconds'):
+            metadata = call_google(self.spreadsheet.fetch_sheet_metadata)
+        self.metadata_calls += 1
+        metrics.inc('sheet_metadata_fetch_total')
+        self.use(metadata, time.monotonic())
+
+    # Remplir le cache avec des métadonnées déjà lues (à l'ouverture du classeur, à la date loaded_at)
+    def use(self, metadata, loaded_at):
+        self.sheets = {}
+        for sheet in metadata['sheets']:
+            properties = sheet['properties']
+            self.sheets.setdefault(properties['title'], SheetInfo(properties['sheetId'], properties['title']))
+        self.loaded_at = loaded_at
+
+    def invalidate(self):
+        with self.lock:
+            self.sheets = None
+
+    def is_fresh(self):
+        return self.sheets is not None and time.monotonic() - self.loaded_at < self.max_age
+
+    # Obtenir une feuille par son titre (None si elle n'existe pas)
+    def get_sheet(self, title):
+        with self.lock:
+            if not self.is_fresh():
+                self.load()
+            return self.sheets.get(title)
+
+    # Obtenir la feuille d'une colonne, en la dupliquant depuis le modèle si elle n'existe pas
+    def ensure_sheet(self, title, template_sheet):
+        with self.lock:
+            sheet = self.get_sheet(title)
+            if sheet:
+                return sheet
+            try:
+                return self.duplicate(title, template_sheet)
+            except Exception:
+                # Le cache était peut-être périmé (feuille créée ou modèle supprimé entre-temps) :
+                # on relit les métadonnées avant un nouvel essai
+                self.invalidate()
+                sheet = self.get_sheet(title)
+                return sheet or self.duplicate(title, template_sheet)
+
+    def duplicate(self, title, template_sheet):
+        template = self.get_sheet(template_sheet)
+        if template is None:
+            import gspread
+            raise gspread.exceptions.WorksheetNotFound(template_sheet)
+        with metrics.timed('sheet_duplicate_seconds'):
+            worksheet = call_google(lambda: self.spreadsheet.duplicate_sheet(template.id, new_sheet_name=title))
+        # La réponse de duplicateSheet contient les propriétés de la nouvelle feuille
+        sheet = SheetInfo(worksheet.id, worksheet.title)
+        self.sheets[sheet.title] = sheet
+        return sheet
+
+
+# Un cache par classeur, partagé par toutes les tâches du processus
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+# Fonction pour obtenir le cache de métadonnées d'un classeur gspread
+# Les métadonnées lues à l'ouverture (clients.get_spreadsheet) évitent une seconde lecture ;
+# trop anciennes, elles sont relues comme le reste du cache
+def get_metadata(spreadsheet):
+    with _caches_lock:
+        if spreadsheet.id not in _caches:
+            cache = SpreadsheetMetadata(spreadsheet)
+            opening = getattr(spreadsheet, 'opening_metadata', None)
+            if opening:
+                loaded_at, metadata = opening
+                cache.use(metadata, loaded_at)
+            _caches[spreadsheet.id] = cache
+        return _caches[spreadsheet.id]
+
+
+# Fonction pour oublier toutes les métadonnées en cache
+def clear_metadata():
+    with _caches_lock:
+        _caches.clear()
@@ -0,0 +1,124 @@
+# Couche d'écriture groupée pour Google Sheets.
+# Toutes les valeurs, formules (HYPERLINK, SUM...) et mises en forme d'une exécution
+# sont accumulées puis envoyées en deux appels : un values.batchUpdate et un
+# spreadsheets.batchUpdate, au lieu d'une requête HTTP par cellule.
+# Les insertions/suppressions de lignes (synchronisation incrémentale) ajoutent un
+# troisième appel, envoyé en premier pour que les plages des valeurs soient justes.
+# Chaque appel passe par la couche de transport (nouvelles tentatives, disjoncteur).
+# Pour les très grandes colonnes, les valeurs partent par morceaux de taille fixe dès
+# qu'un seuil (lignes ou caractères) est atteint : la mémoire et la taille de chaque
+# requête restent bornées quelle que soit la taille de la liste.
+import json
+import re
+
+from . import metrics
+from .transport import classify_google, classify_google_quota, execute
+
+# Taille maximale d'un envoi de valeurs : nombre de lignes et nombre approximatif de caractères
+# (Google recommande des requêtes de moins de 2 Mo)
+DEFAULT_CHUNK_ROWS = 1000
+DEFAULT_CHUNK_CHARS = 1_000_000
+
+CELL_RE = re.compile(r"^([A-Z]+)(\d+)$")
+
+
+# Fonction pour construire une plage A1 préfixée par le nom de la feuille
+def a1_range(sheet_title, cell_range):
+    # Les apostrophes du titre doivent être doublées dans la notation A1
+    escaped_title = sheet_title.replace("'", "''")
+    return f"'{escaped_title}'!{cell_range}"
+
+
+class SheetWriter:
+    def __init__(self, service, spreadsheet_id, chunk_rows=DEFAULT_CHUNK_ROWS, chunk_chars=DEFAULT_CHUNK_CHARS):
+        self.service = service
+        self.spreadsheet_id = spreadsheet_id
+        self.chunk_rows = chunk_rows
+        self.chunk_chars = chunk_chars
+        self.structure_requests = []
+        self.value_ranges = []
+        self.pending_rows = 0
+        self.pending_chars = 0
+        self.requests = []
+        self.api_calls = 0
+
+    # Ajouter un bloc de lignes à écrire à partir d'une cellule (ex : "B5")
+    # Les valeurs en attente sont envoyées dès qu'elles atteignent la taille d'un morceau
+    def set_values(self, sheet_title, start_cell, rows):
+        column, row = CELL_RE.match(start_cell).groups()
+        row = int(row)
+        block = []
+        for values in rows:
+            block.append(values)
+            self.pending_rows += 1
+            self.pending_chars += sum(len(str(value)) for value in values)
+            if self.pending_rows >= self.chunk_rows or self.pending_chars >= self.chunk_chars:
+                self.add_value_range(sheet_title, f"{column}{row}", block)
+                row += len(block)
+                block = []
+                self.send_values()
+        if block:
+            self.add_value_range(sheet_title, f"{column}{row}", block)
+
+    def add_value_range(self, sheet_title, start_cell, rows):
+        self.value_ranges.append({
+            'range': a1_range(sheet_title, start_cell),
+            'values': rows
+        })
+
+    # Ajouter une insertion ou suppression de lignes (envoyée avant les valeurs)
+    def add_structure_request(self, request):
+        self.structure_requests.append(request)
+
+    # Ajouter une requête de mise en forme (bordures, formats, effacement...) envoyée après les valeurs
+    def add_request(self, request):
+        self.requests.append(request)
+
+    def add_requests(self, requests):
+        self.requests.extend(requests)
+
+    # kind : 'structure' (lignes insérées/supprimées) ou 'format' (bordures, formats, effacement)
+    def batch_update(self, requests, kind='format'):
+        body = {
+            'requests': requests
+        }
+        self.send(kind, self.service.spreadsheets().batchUpdate(spreadsheetId=self.spreadsheet_id, body=body), body)
+
+    # Envoyer une requête d'écriture en mesurant sa durée et la taille du corps
+    # La structure n'est pas idempotente (rejouer une insertion décalerait les lignes) :
+    # elle n'est réessayée que sur un refus de quota
+    def send(self, kind, request, body):
+        metrics.inc('sheets_bytes_sent_total', len(json.dumps(body)), call=kind)
+        with metrics.timed('sheets_write_seconds', call=kind):
+            execute(request, classify=classify_google_quota if kind == 'structure' else classify_google)
+        self.api_calls += 1
+
+    # Envoyer la structure en attente puis les valeurs en attente
+    # (la mise en forme attend flush, pour n'effacer les anciennes lignes qu'à la fin)
+    def send_values(self):
+        if self.structure_requests:
+            self.batch_update(self.structure_requests, kind='structure')
+            self.structure_requests = []
+
+        if self.value_ranges:
+            body = {
+                # USER_ENTERED pour que les formules soient interprétées par Google Sheets
+                'valueInputOption': 'USER_ENTERED',
+                'data': self.value_ranges
+            }
+            metrics.inc('sheets_rows_written_total', sum(len(value_range['values']) for value_range in self.value_ranges))
+            self.send('values', self.service.spreadsheets().values().batchUpdate(
+                spreadsheetId=self.spreadsheet_id, body=body), body)
+            self.value_ranges = []
+        self.pending_rows = 0
+        self.pending_chars = 0
+
+    # Envoyer tout ce qui a été accumulé : structure, puis valeurs, puis mise en forme
+    # Les valeurs partent avant l'effacement des anciennes lignes : si un appel échoue
+    # malgré les nouvelles tentatives, la feuille n'est jamais laissée vide
+    def flush(self):
+        self.send_values()
+
+        if self.requests:
+            self.batch_update(self.requests)
+            self.requests = []
@@ -0,0 +1,219 @@
+# Synchronisation des colonnes Trello vers Google Sheets, commune à tous les profils.
+# Un profil décrit ce qui change d'un script à l'autre : les en-têtes, la ligne écrite pour chaque
+# carte (extracteur carte -> ligne, à partir de la carte et des prix de sa description), les colonnes
+# de prix totalisées et la ligne de total. Tout le reste est partagé : lecture des cartes page par
+# page, feuilles dupliquées depuis le modèle, lot d'écriture unique, mode incrémental, historique
+# des prix et mesures.
+import sys
+from collections import namedtuple
+
+from . import clients, metrics
+from .cli import EXIT_FAILED, EXIT_SELECTION_ERROR, ListSelectionError, build_parser, resolve_lists
+from .boards import get_existing_lists
+from .prix import parse_prices
+from .price_history import record_prices
+from .settings import get_settings
+from .sheet_format import extend_borders, number_format_request, clear_rows_request
+from .sheet_metadata import get_metadata
+from .sheet_writer import SheetWriter
+from .sync_snapshot import (load_snapshot, save_snapshot, delete_snapshot, build_entries, release_rows,
+                            apply_incremental_update, row_hash)
+from .transport import call_google
+
+# Feuille modèle dupliquée pour chaque nouvelle colonne
+TEMPLATE_SHEET = 'modele'
+
+# En-têtes à la ligne 5, à partir de la colonne B ; les cartes suivent à partir de la ligne 6
+START_ROW = 5
+FIRST_COLUMN = 1
+
+# Profil d'un script :
+# - name : nom du script (historique des prix, tâches, serveur de webhooks)
+# - description : aide de la ligne de commande
+# - spreadsheet_url : classeur utilisé par défaut
+# - headers : en-têtes des colonnes, à partir de B
+# - card_to_row(card, price_info) : valeurs de la ligne d'une carte, à partir de B
+# - price_columns : index, dans la ligne, des colonnes de prix (totalisées, au format monétaire)
+# - total_row(totals, data_row, sum_row) : valeurs de la ligne de total (totals : une somme par colonne de prix)
+# - list_prompt : question posée en mode interactif
+Profile = namedtuple('Profile', ['name', 'description', 'spreadsheet_url', 'headers', 'card_to_row',
+                                 'price_columns', 'total_row', 'list_prompt'])
+
+
+# Fonction pour calculer l'empreinte de la mise en page d'un profil (nom et en-têtes)
+# trelloserveur et ScrapPrix écrivent dans le même classeur : l'instantané laissé par l'un
+# ne décrit pas une feuille écrite par l'autre
+def profile_layout(profile):
+    return row_hash([profile.name] + list(profile.headers))
+
+
+# Fonction pour récupérer la feuille de la colonne, ou la dupliquer depuis le modèle
+# Les feuilles existantes et le modèle sont retrouvés dans le cache des métadonnées du classeur
+# (une seule lecture pour toutes les colonnes) ; retourne l'id et le titre de la feuille
+# La feuille n'est pas vidée ici : les anciennes lignes sont effacées dans le lot d'écriture,
+# après les nouvelles valeurs, pour qu'une erreur de quota ne laisse jamais une feuille vide
+def setup_sheet(column_name, sheet_url, template_sheet=TEMPLATE_SHEET):
+    try:
+        spreadsheet = call_google(lambda: clients.get_spreadsheet(sheet_url))
+        return get_metadata(spreadsheet).ensure_sheet(column_name, template_sheet)
+    except Exception as e:
+        print(f"Erreur lors de la configuration de la feuille : {str(e)}")
+        return None
+
+
+# Fonction pour écrire les cartes d'une colonne dans sa feuille, page par page
+# Les lignes de chaque page sont confiées au lot d'écriture (envoyé par morceaux) puis libérées :
+# seules les entrées compactes de l'instantané restent en mémoire, quelle que soit la taille de la liste
+# Retourne les informations d'instantané à enregistrer une fois le lot envoyé
+# Les prix extraits sont ajoutés à price_records (carte, colonne, prix) pour l'historique des prix
+def process_list(profile, writer, column_name, pages, sheet_url, incremental=False, template_sheet=TEMPLATE_SHEET,
+                 price_records=None):
+    # En mode incrémental, seules les différences avec l'instantané sont envoyées
+    snapshot = load_snapshot(writer.spreadsheet_id, column_name) if incremental else None
+    with metrics.timed('setup_sheet_seconds'):
+        sheet = setup_sheet(column_name, sheet_url, template_sheet)
+
+    if sheet:
+        data_row = START_ROW + 1  # Première ligne où les données seront insérées
+        sheet_id = sheet.id
+
+        if snapshot and (snapshot['sheet_id'] != sheet_id or snapshot['layout'] != profile_layout(profile)):
+            # La feuille a été recréée, ou écrite par un autre profil, depuis le dernier instantané :
+            # écriture complète (en-têtes compris)
+            snapshot = None
+        old_by_id = {entry['id']: entry for entry in snapshot['entries']} if snapshot else None
+
+        if not snapshot:
+            writer.set_values(sheet.title, f"B{START_ROW}", [profile.headers])
+
+        entries = []
+        totals = [0] * len(profile.price_columns)
+        for cards in pages:
+            # Analyser les prix de toute la page (chaque description distincte une seule fois)
+            with metrics.timed('price_extraction_seconds'):
+                price_infos = parse_prices([card['desc'] for card in cards])
+            metrics.inc('price_descriptions_total', len(cards))
+            if price_records is not None:
+                price_records.extend((card['id'], card['name'], column_name, info)
+                                     for card, info in zip(cards, price_infos))
+            page_entries = build_entries(cards, [profile.card_to_row(card, info)
+                                                 for card, info in zip(cards, price_infos)])
+            for idx, column in enumerate(profile.price_columns):
+                totals[idx] += sum(entry['row'][column] for entry in page_entries)
+            if not snapshot:
+                writer.set_values(sheet.title, f"B{data_row + len(entries)}",
+                                  [entry['row'] for entry in page_entries])
+            release_rows(page_entries, old_by_id)
+            entries.extend(page_entries)
+
+        if snapshot:
+            entries, (added, changed, removed) = apply_incremental_update(
+                writer, sheet.title, sheet_id, snapshot['entries'], entries, data_row)
+            print(f"Feuille '{column_name}' : {added} ajoutée(s), {changed} modifiée(s), {removed} supprimée(s)")
+
+        # Ajouter la ligne de total à la fin (sommes arrondies au centime : 0.1 + 0.2 donne 0.30000000000000004)
+        totals = [round(total, 2) for total in totals]
+        sum_row = data_row + len(entries)
+        writer.set_values(sheet.title, f"B{sum_row}", [profile.total_row(totals, data_row, sum_row)])
+
+        # Appliquer les bordures (de B à la dernière colonne de prix) et le format des prix en une requête
+        # groupée, et effacer les lignes restantes d'une exécution précédente sous le total
+        last_column = FIRST_COLUMN + max(profile.price_columns) + 1
+        extend_borders(writer, sheet_id, data_row, sum_row, FIRST_COLUMN, last_column,
+                       [number_format_request(sheet_id, data_row, sum_row,
+                                              FIRST_COLUMN + min(profile.price_columns), last_column),
+                        clear_rows_request(sheet_id, sum_row + 1)])
+
+        print(f"Feuille '{column_name}' préparée : {' - '.join(f'{total:.2f}€' for total in totals)}")
+        return column_name, sheet_id, entries
+    return None
+
+
+# Fonction pour synchroniser des colonnes Trello ({nom: id}) vers un classeur Google Sheets
+# Utilisée par les scripts, par le lanceur de tâches (run_jobs.py) pour d'autres tableaux et classeurs,
+# et par le serveur de webhooks (webhook_server.py), qui passe une session sans cache
+# Retourne un résumé : feuilles écrites, feuilles en échec, cartes, appels d'écriture Google Sheets
+def sync_lists(profile, selected_lists, sheet_url=None, incremental=False, template_sheet=TEMPLATE_SHEET,
+               session=None):
+    with metrics.timed('sync_seconds', incremental=incremental):
+        return _sync_lists(profile, selected_lists, sheet_url or profile.spreadsheet_url, incremental,
+                           template_sheet, session)
+
+
+def _sync_lists(profile, selected_lists, sheet_url, incremental, template_sheet, session):
+    settings = get_settings()
+    sheet_id = clients.spreadsheet_id_from_url(sheet_url)
+
+    # Récupérer la première page de cartes de toutes les colonnes choisies en parallèle,
+    # les pages suivantes sont lues au fil de l'écriture
+    # (import différé : asyncio n'est chargé que si une colonne est traitée)
+    from .trello_async import fetch_lists_cards, iter_list_cards, PAGE_SIZE
+    session = session or clients.get_trello_session()
+    first_pages = fetch_lists_cards(settings.api_key, settings.api_token, selected_lists, session=session,
+                                    page_size=PAGE_SIZE)
+
+    # Un seul lot d'écriture (valeurs, formules et bordures) pour toutes les colonnes,
+    # dont les valeurs partent par morceaux de taille fixe
+    writer = SheetWriter(clients.get_sheets_service(), sheet_id)
+    results = []
+    price_records = []
+    try:
+        for column_name, list_id in selected_lists.items():
+            pages = iter_list_cards(session, settings.api_key, settings.api_token, list_id, page_size=PAGE_SIZE,
+                                    first_page=first_pages.pop(column_name))
+            results.append(process_list(profile, writer, column_name, pages, sheet_url, incremental,
+                                        template_sheet, price_records))
+        writer.flush()
+    except Exception:
+        # Une partie des morceaux a pu être envoyée : les instantanés ne correspondent plus aux feuilles
+        for column_name in selected_lists:
+            delete_snapshot(sheet_id, column_name)
+        raise
+
+    # Enregistrer l'état écrit de chaque feuille pour la prochaine synchronisation incrémentale
+    written = [result for result in results if result]
+    for result in written:
+        save_snapshot(sheet_id, *result, layout=profile_layout(profile))
+
+    # Conserver les prix de cette exécution dans l'historique local
+    with metrics.timed('price_history_seconds'):
+        record_prices(price_records, script=profile.name, spreadsheet=sheet_id)
+
+    return {
+        'sheets': len(written),
+        'failed_sheets': len(results) - len(written),
+        'cards': sum(len(entries) for _, _, entries in written),
+        'google_write_calls': writer.api_calls
+    }
+
+
+# Fonction principale pour traiter les cartes et les mettre à jour dans Google Sheets
+# Retourne le résumé de sync_lists ; lève ListSelectionError si aucune colonne ne peut être traitée
+def process_and_update_sheet(profile, args):
+    existing_lists = get_existing_lists()
+    selected_lists = resolve_lists(existing_lists, args, profile.list_prompt)
+
+    summary = sync_lists(profile, selected_lists, incremental=args.incremental)
+    print(f"{summary['sheets']} feuille(s) mise(s) à jour avec succès.")
+    if summary['failed_sheets']:
+        print(f"{summary['failed_sheets']} feuille(s) en échec.")
+    print(f"Appels API d'écriture Google Sheets : {summary['google_write_calls']}")
+    return summary
+
+
+# Fonction pour lancer un profil en ligne de commande
+# Code de sortie non nul si les colonnes demandées sont introuvables ou si une feuille a échoué
+def run(profile, argv=None):
+    parser = build_parser(profile.description)
+    parser.add_argument('--incremental', action='store_true',
+                        help="N'envoyer que les lignes des cartes ajoutées, modifiées ou supprimées depuis la dernière exécution")
+    args = parser.parse_args(argv)
+    try:
+        summary = process_and_update_sheet(profile, args)
+    except ListSelectionError as e:
+        print(f"Erreur : {e}")
+        sys.exit(EXIT_SELECTION_ERROR)
+    finally:
+        metrics.write_metrics(args.metriques)
+    if summary['failed_sheets']:
+        sys.exit(EXIT_FAILED)
@@ -0,0 +1,158 @@
+# Synchronisation incrémentale entre une colonne Trello et sa feuille Google Sheets.
+# Un instantané local garde, pour chaque feuille, les cartes écrites (id, dateLastActivity,
+# empreinte des valeurs de la ligne) dans l'ordre des lignes. À l'exécution suivante, seules
+# les lignes des cartes ajoutées, modifiées ou supprimées sont envoyées.
+# L'instantané garde aussi l'empreinte de la mise en page (profil et en-têtes) qui a écrit la feuille :
+# un autre profil qui écrit dans le même classeur repart d'une écriture complète.
+# Seules ces lignes-là restent en mémoire : celles des cartes inchangées sont libérées
+# au fil des pages de cartes (release_rows).
+import hashlib
+import json
+import os
+
+from .clients import CACHE_DIR
+
+SNAPSHOT_DIR = os.path.join(CACHE_DIR, 'snapshots')
+
+
+# Fonction pour retrouver le fichier d'instantané d'une feuille
+def snapshot_path(spreadsheet_id, column_name):
+    safe_name = "".join(c if c.isalnum() or c in "-_" else "_" for c in column_name)
+    return os.path.join(SNAPSHOT_DIR, f"{spreadsheet_id}_{safe_name}.json")
+
+
+# Fonction pour charger l'instantané d'une feuille (None s'il n'existe pas)
+def load_snapshot(spreadsheet_id, column_name):
+    try:
+        with open(snapshot_path(spreadsheet_id, column_name)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+# Fonction pour enregistrer l'instantané après une écriture réussie (sans les valeurs des lignes)
+def save_snapshot(spreadsheet_id, column_name, sheet_id, entries, layout):
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    path = snapshot_path(spreadsheet_id, column_name)
+    entries = [{'id': entry['id'], 'dateLastActivity': entry['dateLastActivity'], 'hash': entry['hash']}
+               for entry in entries]
+    # Écriture atomique pour ne jamais laisser un instantané à moitié écrit
+    with open(path + '.tmp', 'w') as f:
+        json.dump({'sheet_id': sheet_id, 'layout': layout, 'entries': entries}, f)
+    os.replace(path + '.tmp', path)
+
+
+# Fonction pour oublier l'instantané d'une feuille (écriture interrompue : la prochaine sera complète)
+def delete_snapshot(spreadsheet_id, column_name):
+    try:
+        os.remove(snapshot_path(spreadsheet_id, column_name))
+    except FileNotFoundError:
+        pass
+
+
+# Fonction pour calculer l'empreinte des valeurs d'une ligne
+def row_hash(row):
+    return hashlib.sha1(json.dumps(row, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+# Fonction pour construire les entrées d'instantané à partir des cartes et de leurs lignes
+def build_entries(cards, rows):
+    return [{'id': card['id'], 'dateLastActivity': card.get('dateLastActivity'), 'hash': row_hash(row), 'row': row}
+            for card, row in zip(cards, rows)]
+
+
+# Fonction pour libérer les lignes qui n'ont plus besoin d'être envoyées
+# Sans instantané (old_by_id None), toutes les lignes ont déjà été écrites ;
+# sinon seules celles des cartes nouvelles ou modifiées sont gardées
+def release_rows(entries, old_by_id=None):
+    for entry in entries:
+        old = old_by_id.get(entry['id']) if old_by_id is not None else None
+        if old_by_id is None or (old is not None and not is_changed(old, entry)):
+            del entry['row']
+
+
+# Fonction pour savoir si la ligne d'une carte a changé depuis l'instantané
+def is_changed(old, entry):
+    return old['dateLastActivity'] != entry['dateLastActivity'] or old['hash'] != entry['hash']
+
+
+# Fonction pour comparer l'instantané aux cartes actuelles
+# Retourne (ajoutées, modifiées, ids supprimés)
+def diff_entries(old_entries, new_entries):
+    old_by_id = {entry['id']: entry for entry in old_entries}
+    new_ids = {entry['id'] for entry in new_entries}
+
+    inserted = []
+    updated = []
+    for entry in new_entries:
+        old = old_by_id.get(entry['id'])
+        if old is None:
+            inserted.append(entry)
+        elif is_changed(old, entry):
+            updated.append(entry)
+    deleted = [entry['id'] for entry in old_entries if entry['id'] not in new_ids]
+    return inserted, updated, deleted
+
+
+# Fonction pour regrouper des index triés en plages contiguës [début, fin)
+def contiguous_ranges(indexes):
+    ranges = []
+    for index in sorted(indexes):
+        if ranges and ranges[-1][1] == index:
+            ranges[-1][1] = index + 1
+        else:
+            ranges.append([index, index + 1])
+    return ranges
+
+
+# Fonction pour ajouter au lot les seules modifications nécessaires sur la feuille
+# data_row est la première ligne de données (numérotée comme dans la feuille).
+# Les cartes conservées gardent leur ligne, les nouvelles sont ajoutées à la fin du tableau.
+# Retourne les entrées dans l'ordre final des lignes et le nombre de cartes ajoutées/modifiées/supprimées.
+def apply_incremental_update(writer, sheet_title, sheet_id, old_entries, new_entries, data_row):
+    inserted, updated, deleted = diff_entries(old_entries, new_entries)
+    deleted_ids = set(deleted)
+
+    # Supprimer les lignes des cartes disparues, de bas en haut pour garder les index valides
+    deleted_positions = [idx for idx, entry in enumerate(old_entries) if entry['id'] in deleted_ids]
+    for start, end in reversed(contiguous_ranges(deleted_positions)):
+        writer.add_structure_request({
+            "deleteDimension": {
+                "range": {
+                    "sheetId": sheet_id,
+                    "dimension": "ROWS",
+                    "startIndex": data_row - 1 + start,  # Les index de Google Sheets commencent à 0
+                    "endIndex": data_row - 1 + end
+                }
+            }
+        })
+
+    new_by_id = {entry['id']: entry for entry in new_entries}
+    final_entries = [new_by_id[entry['id']] for entry in old_entries if entry['id'] not in deleted_ids]
+
+    # Mettre à jour en place les lignes des cartes modifiées
+    updated_ids = {entry['id'] for entry in updated}
+    updated_positions = [idx for idx, entry in enumerate(final_entries) if entry['id'] in updated_ids]
+    for start, end in contiguous_ranges(updated_positions):
+        writer.set_values(sheet_title, f"B{data_row + start}",
+                          [entry['row'] for entry in final_entries[start:end]])
+
+    # Insérer les nouvelles cartes juste avant la ligne de total (qui descend d'autant)
+    if inserted:
+        insert_at = data_row - 1 + len(final_entries)
+        writer.add_structure_request({
+            "insertDimension": {
+                "range": {
+                    "sheetId": sheet_id,
+                    "dimension": "ROWS",
+                    "startIndex": insert_at,
+                    "endIndex": insert_at + len(inserted)
+                },
+                "inheritFromBefore": bool(final_entries)
+            }
+        })
+        writer.set_values(sheet_title, f"B{data_row + len(final_entries)}",
+                          [entry['row'] for entry in inserted])
+        final_entries.extend(inserted)
+
+    return final_entries, (len(inserted), len(updated), len(deleted))
@@ -0,0 +1,280 @@
+# Couche de transport commune aux appels Trello et Google.
+# - nouvelles tentatives avec attente exponentielle et gigue (full jitter)
+# - respect de l'en-tête Retry-After
+# - disjoncteur par API : après plusieurs échecs consécutifs, les appels sont refusés
+#   pendant un moment au lieu de surcharger un service déjà en difficulté
+# - limite optionnelle de requêtes simultanées par API, partagée par tous les threads
+#   (lanceur de tâches : plusieurs tableaux et classeurs traités en parallèle)
+# Les erreurs définitives (404, 400, feuille introuvable...) ne sont pas réessayées, ni les requêtes
+# non idempotentes (POST, insertion de lignes) dont la réponse perdue peut cacher une écriture déjà faite :
+# elles ne sont rejouées que sur un refus de quota, qui garantit que rien n'a été appliqué.
+import contextlib
+import email.utils
+import random
+import threading
+import time
+from collections import namedtuple
+
+from . import metrics
+
+# Codes HTTP temporaires qui justifient une nouvelle tentative
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+# Raisons Google indiquant un dépassement de quota (renvoyées avec un code 403)
+RATE_LIMIT_REASONS = ('rateLimitExceeded', 'userRateLimitExceeded', 'quotaExceeded')
+
+RetryPolicy = namedtuple('RetryPolicy', ['max_attempts', 'base_delay', 'max_delay'])
+
+DEFAULT_POLICY = RetryPolicy(max_attempts=5, base_delay=0.5, max_delay=30.0)
+
+# Une seule tentative : la réponse (429 compris) est rendue telle quelle à l'appelant
+SINGLE_ATTEMPT = RetryPolicy(max_attempts=1, base_delay=0, max_delay=0)
+
+# Méthodes HTTP qui peuvent être rejouées sans risque de doublon
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'}
+
+# Délai maximum (connexion, lecture) d'une requête HTTP, en secondes
+DEFAULT_TIMEOUT = (10, 60)
+
+
+class TransportError(Exception):
+    pass
+
+
+class CircuitOpenError(TransportError):
+    pass
+
+
+# Disjoncteur : s'ouvre après failure_threshold échecs consécutifs, puis laisse passer
+# un appel d'essai après reset_timeout secondes (état semi-ouvert)
+class CircuitBreaker:
+    def __init__(self, name, failure_threshold=5, reset_timeout=30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.lock = threading.Lock()
+
+    def before_call(self):
+        with self.lock:
+            if self.opened_at is None:
+                return
+            remaining = self.opened_at + self.reset_timeout - time.monotonic()
+            if remaining > 0:
+                metrics.inc('circuit_open_total', api=self.name)
+                raise CircuitOpenError(
+                    f"API {self.name} indisponible ({self.failures} échecs), nouvel essai dans {remaining:.0f} s")
+            # Semi-ouvert : un seul appel d'essai, le disjoncteur se rouvre s'il échoue
+            self.opened_at = time.monotonic()
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+# Un disjoncteur par API, partagé par tous les clients d'une exécution
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name):
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name)
+        return _breakers[name]
+
+
+# Limites de requêtes simultanées par API (pas de limite par défaut)
+_limits = {}
+
+
+# Fonction pour limiter le nombre de requêtes simultanées vers une API (None : pas de limite)
+def set_concurrency_limit(name, limit):
+    _limits[name] = threading.BoundedSemaphore(limit) if limit else None
+
+
+# Fonction pour obtenir la place à occuper pendant une requête vers une API
+def concurrency_slot(name):
+    return _limits.get(name) or contextlib.nullcontext()
+
+
+# Fonction pour lire Retry-After (nombre de secondes ou date HTTP)
+def parse_retry_after(value):
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+# Fonction pour calculer l'attente avant la tentative suivante
+def backoff_delay(attempt, policy, retry_after=None):
+    if retry_after is not None:
+        return min(retry_after, policy.max_delay)
+    return random.uniform(0, min(policy.max_delay, policy.base_delay * 2 ** attempt))
+
+
+# Fonction pour retrouver le code HTTP d'un résultat ou d'une erreur (pour les mesures)
+def status_of(result=None, error=None):
+    if error is None:
+        return getattr(result, 'status_code', 'ok')
+    if hasattr(error, 'resp') and hasattr(error.resp, 'status'):
+        return int(error.resp.status)
+    if getattr(error, 'response', None) is not None and hasattr(error.response, 'status_code'):
+        return error.response.status_code
+    return type(error).__name__
+
+
+# Fonction pour appeler une fonction avec nouvelles tentatives et disjoncteur
+# classify(result=..., error=...) retourne (faut-il réessayer, délai Retry-After éventuel)
+# La limite de concurrence de l'API n'est occupée que pendant l'appel, pas pendant l'attente
+# Chaque tentative est mesurée (latence, code de retour), ainsi que les nouvelles tentatives et quotas
+def call_with_retry(function, classify, breaker=None, policy=DEFAULT_POLICY):
+    api = breaker.name if breaker else 'autre'
+    for attempt in range(policy.max_attempts):
+        last_attempt = attempt == policy.max_attempts - 1
+        if breaker:
+            breaker.before_call()
+        start = time.perf_counter()
+        try:
+            with concurrency_slot(breaker.name if breaker else None):
+                result = function()
+        except Exception as error:
+            status = status_of(error=error)
+            record_attempt(api, status, start)
+            retry, retry_after = classify(error=error)
+            if not retry:
+                raise
+            if breaker:
+                breaker.record_failure()
+            if last_attempt:
+                raise
+        else:
+            status = status_of(result=result)
+            record_attempt(api, status, start)
+            retry, retry_after = classify(result=result)
+            if not retry:
+                if breaker:
+                    breaker.record_success()
+                return result
+            if breaker:
+                breaker.record_failure()
+            if last_attempt:
+                return result
+        metrics.inc('api_retries_total', api=api, status=status)
+        if status in (429, 403):
+            metrics.inc('api_quota_events_total', api=api)
+        time.sleep(backoff_delay(attempt, policy, retry_after))
+
+
+def record_attempt(api, status, start):
+    metrics.observe('api_request_seconds', time.perf_counter() - start, api=api)
+    metrics.inc('api_requests_total', api=api, status=status)
+
+
+# Classification des réponses requests (Trello)
+def classify_http(result=None, error=None):
+    if error is not None:
+        import requests
+        return isinstance(error, (requests.ConnectionError, requests.Timeout)), None
+    if result.status_code in RETRYABLE_STATUS:
+        return True, parse_retry_after(result.headers.get('Retry-After'))
+    return False, None
+
+
+# Classification des erreurs Google (googleapiclient HttpError, gspread APIError, erreurs réseau)
+def classify_google(result=None, error=None):
+    if error is None:
+        return False, None
+
+    if hasattr(error, 'resp') and hasattr(error.resp, 'status'):
+        # googleapiclient.errors.HttpError
+        status = int(error.resp.status)
+        retry_after = error.resp.get('retry-after')
+        details = getattr(error, 'content', b'').decode('utf-8', 'replace')
+    elif getattr(error, 'response', None) is not None and hasattr(error.response, 'status_code'):
+        # gspread.exceptions.APIError
+        status = error.response.status_code
+        retry_after = error.response.headers.get('Retry-After')
+        details = error.response.text
+    else:
+        # Erreurs réseau (connexion coupée, délai dépassé) : exceptions Python pour googleapiclient (httplib2),
+        # exceptions de requests pour gspread
+        import requests
+        return isinstance(error, (ConnectionError, TimeoutError, requests.ConnectionError, requests.Timeout)), None
+
+    if status in RETRYABLE_STATUS or (status == 403 and any(r in details for r in RATE_LIMIT_REASONS)):
+        return True, parse_retry_after(retry_after)
+    return False, None
+
+
+# Classification des écritures Google non idempotentes (insertion/suppression de lignes) :
+# seuls les refus de quota (429, 403 de quota) sont réessayés, une erreur 5xx ou un délai dépassé
+# peut cacher une requête déjà appliquée
+def classify_google_quota(result=None, error=None):
+    retry, retry_after = classify_google(result, error)
+    if retry and status_of(error=error) in (429, 403):
+        return True, retry_after
+    return False, None
+
+
+# Fonction pour appeler l'API Google (gspread ou googleapiclient) avec nouvelles tentatives
+def call_google(function, policy=DEFAULT_POLICY, classify=classify_google):
+    return call_with_retry(function, classify, get_breaker('google'), policy)
+
+
+# Fonction pour exécuter une requête googleapiclient avec nouvelles tentatives
+def execute(request, policy=DEFAULT_POLICY, classify=classify_google):
+    return call_google(request.execute, policy, classify)
+
+
+# Session HTTP qui réessaie les erreurs temporaires (Trello)
+# Seules les méthodes idempotentes sont réessayées : un POST n'est envoyé qu'une fois et son 429
+# revient à l'appelant (bulk_cards suspend alors toutes ses requêtes avec son seau à jetons)
+# Chaque requête a un délai maximum (timeout), sauf si l'appelant en donne un autre
+class RetryingSession:
+    def __init__(self, session, breaker_name='trello', policy=DEFAULT_POLICY, timeout=DEFAULT_TIMEOUT):
+        self.session = session
+        self.breaker = get_breaker(breaker_name)
+        self.policy = policy
+        self.timeout = timeout
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        policy = self.policy if method.upper() in IDEMPOTENT_METHODS else SINGLE_ATTEMPT
+        response = call_with_retry(lambda: self.session.request(method, url, **kwargs),
+                                   classify_http, self.breaker, policy)
+        # Octets échangés (ligne de requête approximative, corps de la réponse)
+        params = kwargs.get('params') or {}
+        metrics.inc('api_bytes_sent_total', len(url) + sum(len(str(k)) + len(str(v)) + 2 for k, v in params.items()),
+                    api=self.breaker.name)
+        metrics.inc('api_bytes_received_total', len(response.content), api=self.breaker.name)
+        return response
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def put(self, url, **kwargs):
+        return self.request('PUT', url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request('DELETE', url, **kwargs)
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,123 @@
+# Client Trello asynchrone pour lire les cartes de plusieurs colonnes (--all, lanceur de tâches).
+# Les requêtes partent en parallèle (avec une limite de concurrence) sur une session
+# HTTP partagée qui garde ses connexions ouvertes (keep-alive) entre les appels.
+# Les colonnes sont lues une par une (lists/{id}/cards) et non en un seul appel boards/{id}/cards :
+# chaque colonne peut ainsi être lue par pages (mémoire bornée) et dans l'ordre de la colonne.
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from . import metrics
+from .clients import TRELLO_API_URL
+
+# Nombre maximum de requêtes Trello simultanées
+DEFAULT_CONCURRENCY = 8
+
+# Nombre de cartes par page (maximum accepté par Trello pour limit)
+PAGE_SIZE = 1000
+
+
+# Fonction pour créer une session HTTP avec un pool de connexions réutilisables
+def create_session(pool_size=DEFAULT_CONCURRENCY):
+    # Import différé : requests n'est chargé que lorsqu'un appel Trello est nécessaire
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+class AsyncTrelloClient:
+    def __init__(self, api_key, api_token, concurrency=DEFAULT_CONCURRENCY, session=None):
+        self.auth = {
+            'key': api_key,
+            'token': api_token
+        }
+        self.concurrency = concurrency
+        # Une session fournie par l'appelant reste ouverte à la fermeture du client
+        self.owns_session = session is None
+        self.session = session or create_session(concurrency)
+        self.semaphore = None
+        # Pool de threads dédié : celui d'asyncio par défaut est limité au nombre de CPU
+        self.executor = ThreadPoolExecutor(max_workers=concurrency)
+
+    # Exécuter un GET dans un thread, sans dépasser la limite de concurrence
+    async def get_json(self, path, params=None):
+        if self.semaphore is None:
+            # Le sémaphore doit être créé dans la boucle d'événements qui l'utilise
+            self.semaphore = asyncio.Semaphore(self.concurrency)
+        query = dict(self.auth)
+        if params:
+            query.update(params)
+        async with self.semaphore:
+            loop = asyncio.get_running_loop()
+            start = time.perf_counter()
+            response = await loop.run_in_executor(
+                self.executor, lambda: self.session.get(f"{TRELLO_API_URL}/{path}", params=query))
+            # Point d'accès sans les identifiants (ex : lists/cards)
+            metrics.observe('trello_fetch_seconds', time.perf_counter() - start,
+                            endpoint="/".join(path.split('/')[0::2]))
+        response.raise_for_status()
+        return response.json()
+
+    # Obtenir les cartes d'une colonne (params : limit/before pour n'en obtenir qu'une page)
+    async def get_cards_in_list(self, list_id, params=None):
+        return await self.get_json(f"lists/{list_id}/cards", params)
+
+    # Obtenir les cartes de plusieurs colonnes en parallèle ({nom: cartes})
+    async def fetch_lists(self, lists, params=None):
+        results = await asyncio.gather(*(self.get_cards_in_list(list_id, params) for list_id in lists.values()))
+        return dict(zip(lists.keys(), results))
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+        if self.owns_session:
+            self.session.close()
+
+
+# Fonction utilitaire synchrone pour récupérer les cartes de plusieurs colonnes ({nom: cartes})
+# Avec page_size, seule la première page de chaque colonne est récupérée (voir iter_list_cards)
+def fetch_lists_cards(api_key, api_token, lists, session=None, concurrency=DEFAULT_CONCURRENCY, page_size=None):
+    client = AsyncTrelloClient(api_key, api_token, concurrency, session=session)
+    try:
+        return asyncio.run(client.fetch_lists(lists, {'limit': page_size} if page_size else None))
+    finally:
+        client.close()
+
+
+# Fonction pour parcourir les cartes d'une colonne page par page (paramètres limit et before)
+# Les identifiants Trello croissent avec la date de création : la page suivante demande les cartes
+# créées avant la plus ancienne de la page courante. Elle est téléchargée pendant le traitement
+# de la page courante, et seules deux pages sont en mémoire à la fois.
+# Avec limit, Trello renvoie les cartes les plus récentes d'abord et non dans l'ordre de la colonne :
+# chaque page est remise dans l'ordre de la colonne (pos). Une colonne d'une seule page (jusqu'à
+# page_size cartes) garde donc exactement l'ordre de Trello ; au-delà, les cartes sont dans l'ordre
+# de la colonne à l'intérieur de chaque page, les pages allant des cartes les plus récentes aux plus anciennes.
+# first_page : première page déjà récupérée (par fetch_lists_cards avec page_size)
+def iter_list_cards(session, api_key, api_token, list_id, page_size=PAGE_SIZE, first_page=None):
+    def get_page(before):
+        params = {
+            'key': api_key,
+            'token': api_token,
+            'limit': page_size,
+            'before': before
+        }
+        with metrics.timed('trello_fetch_seconds', endpoint='lists/cards'):
+            response = session.get(f"{TRELLO_API_URL}/lists/{list_id}/cards", params=params)
+        response.raise_for_status()
+        return response.json()
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        page = first_page if first_page is not None else get_page(None)
+        while page:
+            metrics.inc('trello_pages_total')
+            metrics.inc('trello_cards_total', len(page))
+            # Une page incomplète est la dernière
+            next_page = None
+            if len(page) >= page_size:
+                next_page = executor.submit(get_page, min(card['id'] for card in page))
+            yield sorted(page, key=lambda card: card['pos'])
+            page = next_page.result() if next_page else None
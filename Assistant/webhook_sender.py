@@ -0,0 +1,69 @@
+# Envoi d'appels de webhook au format Trello vers un serveur local, pour tester webhook_server.py
+# sans Trello ni tunnel public. Les actions peuvent être envoyées en rafale pour vérifier
+# qu'elles sont regroupées en un seul lot d'écriture.
+# Utilisation : python webhook_sender.py http://localhost:8080/ --carte ID --colonne ID [--nom-colonne NOM]
+#               [--vers-colonne ID --vers-nom NOM] [--nombre 20] [--intervalle 0.05]
+#               [--secret SECRET --callback-url URL]
+import argparse
+import base64
+import hashlib
+import hmac
+import json
+import time
+import urllib.request
+
+
+# Fonction pour construire une action Trello (modification de carte, ou déplacement avec to_list)
+def build_action(card_id, list_id, list_name, to_list=None, action_type='updateCard'):
+    data = {'card': {'id': card_id}, 'board': {'id': 'tableau'}}
+    if to_list:
+        data['listBefore'] = {'id': list_id, 'name': list_name}
+        data['listAfter'] = {'id': to_list[0], 'name': to_list[1]}
+    else:
+        data['list'] = {'id': list_id, 'name': list_name}
+    return {'action': {'type': action_type, 'data': data}, 'model': {'id': 'tableau'}}
+
+
+# Fonction pour envoyer une action (signée comme Trello si un secret est donné)
+def send_action(url, payload, secret=None, callback_url=None):
+    body = json.dumps(payload).encode('utf-8')
+    headers = {'Content-Type': 'application/json'}
+    if secret:
+        digest = hmac.new(secret.encode('utf-8'), body + (callback_url or url).encode('utf-8'), hashlib.sha1).digest()
+        headers['X-Trello-Webhook'] = base64.b64encode(digest).decode('ascii')
+    request = urllib.request.Request(url, data=body, headers=headers, method='POST')
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read())
+
+
+# Fonction pour lire l'état du serveur (événements, lots, dernier lot)
+def get_status(url):
+    with urllib.request.urlopen(url) as response:
+        return json.loads(response.read())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Envoie des appels de webhook Trello à un serveur local.")
+    parser.add_argument('url')
+    parser.add_argument('--carte', required=True, help="ID de la carte modifiée")
+    parser.add_argument('--colonne', required=True, help="ID de la colonne de la carte")
+    parser.add_argument('--nom-colonne', default=None)
+    parser.add_argument('--vers-colonne', help="ID de la colonne d'arrivée (déplacement de carte)")
+    parser.add_argument('--vers-nom', default=None)
+    parser.add_argument('--type', default='updateCard')
+    parser.add_argument('--nombre', type=int, default=1, help="Nombre d'actions envoyées")
+    parser.add_argument('--intervalle', type=float, default=0.0, help="Secondes entre deux actions")
+    parser.add_argument('--secret')
+    parser.add_argument('--callback-url')
+    args = parser.parse_args()
+
+    to_list = (args.vers_colonne, args.vers_nom) if args.vers_colonne else None
+    payload = build_action(args.carte, args.colonne, args.nom_colonne, to_list, args.type)
+    for _ in range(args.nombre):
+        print(send_action(args.url, payload, args.secret, args.callback_url))
+        time.sleep(args.intervalle)
+    print(get_status(args.url))
+
+
+if __name__ == "__main__":
+    main()
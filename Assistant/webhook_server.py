@@ -0,0 +1,318 @@
+# Serveur HTTP local qui reçoit les webhooks Trello et met à jour Google Sheets au fil des changements.
+# Trello appelle l'URL de rappel (HEAD à l'enregistrement, puis POST pour chaque action sur le tableau).
+# Les événements ne déclenchent pas une écriture chacun : les colonnes touchées sont regroupées et
+# synchronisées ensemble, en mode incrémental, quand les événements se calment (debounce) ou au plus
+# tard après un délai maximum. Une rafale de modifications donne ainsi un seul lot d'écriture.
+# Utilisation : python webhook_server.py [LISTE ...] [--all] [--port 8080] [--callback-url https://...]
+# Test local sans Trello ni Google : python bench_sync.py --webhook, puis
+#   python webhook_sender.py http://localhost:8080/ --carte ... --colonne ...
+import base64
+import hashlib
+import hmac
+import importlib
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from trello_sheets import metrics
+from trello_sheets.boards import get_existing_lists
+from trello_sheets.cli import ListSelectionError, build_parser, select_lists
+from trello_sheets.clients import TRELLO_API_URL
+from trello_sheets.settings import get_settings
+from trello_sheets.sync import sync_lists
+
+DEFAULT_PORT = 8080
+
+# Attente après le dernier événement avant d'écrire, et attente maximale depuis le premier (secondes)
+DEFAULT_DEBOUNCE = 2.0
+DEFAULT_MAX_DELAY = 10.0
+
+
+# Fonction pour vérifier la signature X-Trello-Webhook (HMAC-SHA1 du corps suivi de l'URL de rappel)
+def verify_signature(secret, body, callback_url, signature):
+    digest = hmac.new(secret.encode('utf-8'), body + callback_url.encode('utf-8'), hashlib.sha1).digest()
+    return hmac.compare_digest(base64.b64encode(digest).decode('ascii'), signature or '')
+
+
+# Fonction pour retrouver les colonnes ({id: nom}) touchées par une action Trello
+# (déplacement d'une carte : colonne de départ et d'arrivée)
+def lists_from_action(action):
+    data = action.get('data') or {}
+    lists = {}
+    for key in ('list', 'listBefore', 'listAfter'):
+        if data.get(key, {}).get('id'):
+            lists[data[key]['id']] = data[key].get('name')
+    return lists
+
+
+# Regroupement des événements : les colonnes touchées s'accumulent jusqu'à ce qu'aucun événement
+# n'arrive pendant `debounce` secondes (ou `max_delay` secondes après le premier), puis
+# flush_function({id: nom}) est appelée une fois pour toutes ces colonnes
+class EventBatcher:
+    def __init__(self, flush_function, debounce=DEFAULT_DEBOUNCE, max_delay=DEFAULT_MAX_DELAY):
+        self.flush_function = flush_function
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.pending = {}
+        self.first_event_at = None
+        self.last_event_at = None
+        self.events = 0
+        self.batches = 0
+        self.last_report = None
+        self.stopped = False
+        self.condition = threading.Condition()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def add(self, lists):
+        with self.condition:
+            self.events += 1
+            now = time.monotonic()
+            if not self.pending:
+                self.first_event_at = now
+            self.last_event_at = now
+            self.pending.update(lists)
+            self.condition.notify()
+
+    # Délai avant d'envoyer le lot en attente (0 : il est prêt)
+    def time_to_flush(self):
+        now = time.monotonic()
+        return max(0.0, min(self.last_event_at + self.debounce, self.first_event_at + self.max_delay) - now)
+
+    def run(self):
+        while True:
+            with self.condition:
+                while not self.stopped and (not self.pending or self.time_to_flush() > 0):
+                    self.condition.wait(self.time_to_flush() if self.pending else None)
+                if not self.pending:
+                    return
+                batch, self.pending = self.pending, {}
+            self.flush(batch)
+
+    def flush(self, batch):
+        start = time.perf_counter()
+        try:
+            self.last_report = dict(self.flush_function(batch), status='ok')
+        except Exception as e:
+            self.last_report = {'status': 'erreur', 'error': str(e)}
+            print(f"Erreur lors de la synchronisation : {e}")
+        self.last_report['lists'] = sorted(name for name in batch.values())
+        self.last_report['seconds'] = round(time.perf_counter() - start, 3)
+        metrics.observe('webhook_batch_seconds', self.last_report['seconds'], status=self.last_report['status'])
+        metrics.inc('webhook_batch_lists_total', len(batch))
+        self.batches += 1
+        print(f"Lot {self.batches} : {', '.join(self.last_report['lists'])} ({self.last_report['status']}, "
+              f"{self.last_report['seconds']:.1f} s)")
+
+    # Arrêter le thread en envoyant le lot en attente
+    def stop(self):
+        with self.condition:
+            self.stopped = True
+            self.condition.notify()
+        self.thread.join()
+
+
+class WebhookHandler(BaseHTTPRequestHandler):
+    # Trello vérifie l'URL de rappel par un HEAD lors de l'enregistrement du webhook
+    def do_HEAD(self):
+        self.send_response(200)
+        self.end_headers()
+
+    # État du serveur (événements reçus, lots envoyés, dernier lot), ou mesures Prometheus sur /metrics
+    def do_GET(self):
+        if self.path == '/metrics':
+            content = metrics.export_prometheus().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+            return
+        batcher = self.server.batcher
+        self.send_json(200, {
+            'events': batcher.events,
+            'batches': batcher.batches,
+            'pending': sorted(name or list_id for list_id, name in batcher.pending.items()),
+            'last_batch': batcher.last_report
+        })
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if self.server.secret and not verify_signature(self.server.secret, body, self.server.callback_url,
+                                                       self.headers.get('X-Trello-Webhook')):
+            self.send_json(401, {'error': "signature invalide"})
+            return
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            self.send_json(400, {'error': "JSON invalide"})
+            return
+        # Trello envoie un objet {"action": ..., "model": ...}
+        if not isinstance(payload, dict) or not isinstance(payload.get('action') or {}, dict):
+            self.send_json(400, {'error': "objet JSON attendu"})
+            return
+        action = payload.get('action') or {}
+
+        lists = self.server.lists_for_action(action)
+        metrics.inc('webhook_events_total', queued=bool(lists))
+        if lists:
+            self.server.batcher.add(lists)
+        # Trello attend une réponse rapide : l'écriture se fait plus tard, par lot
+        self.send_json(200, {'queued': sorted(lists.values())})
+
+    def send_json(self, status, payload):
+        content = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    # Pas de journal par requête : seuls les lots envoyés sont affichés
+    def log_message(self, format, *args):
+        pass
+
+
+class WebhookServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, profile, session, board_lists, tracked_ids, sheet_url, secret=None,
+                 callback_url='', debounce=DEFAULT_DEBOUNCE, max_delay=DEFAULT_MAX_DELAY):
+        # La signature porte sur l'URL de rappel : sans elle, pas de vérification possible,
+        # et un serveur qui accepterait alors tous les appels ne doit pas démarrer
+        if secret and not callback_url:
+            raise ValueError("TRELLO_API_SECRET est défini mais l'URL de rappel manque (--callback-url) : "
+                             "la signature des appels ne peut pas être vérifiée")
+        # Avec une URL de rappel, le serveur est joignable depuis Internet : les appels non signés sont refusés
+        if callback_url and not secret:
+            raise ValueError("--callback-url enregistre un webhook public : TRELLO_API_SECRET est nécessaire "
+                             "pour vérifier la signature des appels")
+        super().__init__(address, WebhookHandler)
+        self.profile = profile
+        self.session = session
+        self.board_lists = dict(board_lists)  # {id: nom} de toutes les colonnes du tableau
+        self.tracked_ids = tracked_ids  # None : toutes les colonnes, y compris celles créées ensuite
+        self.sheet_url = sheet_url
+        self.secret = secret
+        self.callback_url = callback_url
+        self.batcher = EventBatcher(self.sync_batch, debounce, max_delay)
+
+    # Colonnes suivies touchées par une action (les noms des colonnes sont mis à jour au passage)
+    def lists_for_action(self, action):
+        lists = lists_from_action(action)
+        card = (action.get('data') or {}).get('card') or {}
+        if not lists and card.get('id'):
+            # Action sur une carte sans colonne dans les données (pièce jointe, étiquette...)
+            list_id = self.card_list_id(card['id'])
+            if list_id:
+                lists[list_id] = None
+        tracked = {}
+        for list_id, name in lists.items():
+            if name:
+                self.board_lists[list_id] = name
+            if self.tracked_ids is None or list_id in self.tracked_ids:
+                tracked[list_id] = self.board_lists.get(list_id)
+        return {list_id: name for list_id, name in tracked.items() if name}
+
+    def card_list_id(self, card_id):
+        settings = get_settings()
+        response = self.session.get(f"{TRELLO_API_URL}/cards/{card_id}",
+                                    params={'key': settings.api_key, 'token': settings.api_token,
+                                            'fields': 'idList'})
+        return response.json().get('idList') if response.status_code == 200 else None
+
+    # Synchroniser en un lot les colonnes touchées ({id: nom})
+    def sync_batch(self, lists):
+        selected = {name: list_id for list_id, name in lists.items()}
+        return sync_lists(self.profile, selected, self.sheet_url, incremental=True, session=self.session)
+
+    def serve(self):
+        self.batcher.start()
+        try:
+            self.serve_forever()
+        finally:
+            self.batcher.stop()
+            self.server_close()
+
+
+# Fonction pour enregistrer le webhook du tableau auprès de Trello (ou retrouver celui qui existe)
+def register_webhook(session, api_key, api_token, board_id, callback_url):
+    auth = {'key': api_key, 'token': api_token}
+    response = session.post(f"{TRELLO_API_URL}/webhooks", params=dict(
+        auth, callbackURL=callback_url, idModel=board_id, description="Synchronisation Google Sheets"))
+    if response.status_code == 200:
+        return response.json()
+    # Un webhook existe déjà pour ce jeton, ce tableau et cette URL
+    existing = session.get(f"{TRELLO_API_URL}/tokens/{api_token}/webhooks", params=auth)
+    existing.raise_for_status()
+    for webhook in existing.json():
+        if webhook['idModel'] == board_id and webhook['callbackURL'] == callback_url:
+            return webhook
+    raise RuntimeError(f"Enregistrement du webhook refusé : {response.text}")
+
+
+# Fonction pour créer une session Trello sans cache : chaque lot doit lire les cartes à jour
+def create_live_session():
+    from trello_sheets.trello_async import create_session
+    from trello_sheets.transport import RetryingSession
+    return RetryingSession(create_session())
+
+
+def main(argv=None):
+    parser = build_parser("Serveur de webhooks Trello : met à jour Google Sheets à chaque modification.")
+    parser.add_argument('--script', default='trelloserveur', choices=['trelloserveur', 'ScrapPrixTrelloGoogleSheet'])
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--callback-url', help="URL publique du serveur : le webhook est enregistré auprès de Trello")
+    parser.add_argument('--debounce', type=float, default=DEFAULT_DEBOUNCE,
+                        help="Secondes sans événement avant d'écrire le lot")
+    parser.add_argument('--max-delay', type=float, default=DEFAULT_MAX_DELAY,
+                        help="Secondes au plus entre le premier événement d'un lot et son écriture")
+    parser.add_argument('--sync-initiale', action='store_true',
+                        help="Synchroniser les colonnes suivies au démarrage")
+    args = parser.parse_args(argv)
+
+    profile = importlib.import_module(args.script).PROFILE
+    session = create_live_session()
+    settings = get_settings()
+    existing_lists = get_existing_lists(session=session)
+    # Sans colonne donnée, toutes les colonnes du tableau sont suivies
+    all_lists = args.all_lists or not args.listes
+    try:
+        tracked = select_lists(existing_lists, args.listes, all_lists)
+    except ListSelectionError as e:
+        parser.error(str(e))
+    tracked_ids = None if all_lists else set(tracked.values())
+
+    # Secret de l'application Trello (optionnel) pour vérifier la signature des appels
+    secret = os.getenv('TRELLO_API_SECRET')
+    try:
+        server = WebhookServer((args.host, args.port), profile, session,
+                               {list_id: name for name, list_id in existing_lists.items()}, tracked_ids,
+                               profile.spreadsheet_url, secret=secret, callback_url=args.callback_url or '',
+                               debounce=args.debounce, max_delay=args.max_delay)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.sync_initiale and tracked:
+        print(sync_lists(profile, tracked, incremental=True, session=session))
+    if args.callback_url:
+        webhook = register_webhook(session, settings.api_key, settings.api_token, settings.board_id,
+                                   args.callback_url)
+        print(f"Webhook Trello enregistré : {webhook['id']}")
+
+    print(f"Écoute sur http://{args.host}:{args.port}/ ({len(tracked)} colonne(s) suivie(s)), Ctrl+C pour arrêter")
+    try:
+        server.serve()
+    except KeyboardInterrupt:
+        print("Arrêt du serveur.")
+    finally:
+        metrics.write_metrics(args.metriques)
+
+
+if __name__ == "__main__":
+    main()